@@ -1,20 +1,685 @@
 import os
-from typing import Dict, Any, List, Optional
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Hashable, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from llm_pool import OllamaPool, OLLAMA_BASE_URLS
+from db import SQLITE_BUSY_TIMEOUT_MS
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+# How long Ollama keeps a model loaded after a request ("-1" keeps it forever)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Load every task's model on each backend during warm(), before the first request
+LLM_WARM_MODELS = os.getenv("LLM_WARM_MODELS", "true").lower() in ("1", "true", "yes")
+
+def _task_settings(task: str, num_predict: int, temperature: float) -> Dict[str, Any]:
+    prefix = task.upper()
+    return {
+        "model": os.getenv(f"LLM_MODEL_{prefix}", OLLAMA_MODEL),
+        "num_predict": int(os.getenv(f"LLM_NUM_PREDICT_{prefix}", str(num_predict))),
+        "temperature": float(os.getenv(f"LLM_TEMPERATURE_{prefix}", str(temperature)))
+    }
+
+# Model, output token limit and temperature per task, each overridable with
+# LLM_MODEL_<TASK>, LLM_NUM_PREDICT_<TASK> and LLM_TEMPERATURE_<TASK>
+# (e.g. LLM_MODEL_GENERATE_PLAYLIST_NAME=llama3.2:1b for a smaller model)
+LLM_TASKS = {
+    "generate_playlist_name": _task_settings("generate_playlist_name", 24, 0.9),
+    "analyze_mood": _task_settings("analyze_mood", 160, 0.7),
+    "fix_playlist": _task_settings("fix_playlist", 400, 0.5),
+    "generate_taste_summary": _task_settings("generate_taste_summary", 240, 0.7)
+}
+
+# Generations running against each Ollama backend at once (enforced by the
+# pool); the assistant's queue admits this many per backend in total and
+# holds further calls
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+# Calls allowed to wait for a slot; beyond this they get the fallback answer
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+# Seconds a queued call waits for a slot before giving up
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+
+# Memoization of LLM outputs, keyed by model and normalized prompt inputs
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+# SQLite file backing the in-memory cache (empty keeps it in memory only).
+# Kept apart from the app database so cache writes never take its write lock
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "llm_cache.db")
+LLM_CACHE_DB_MAX_ROWS = int(os.getenv("LLM_CACHE_DB_MAX_ROWS", "20000"))
+# Distinct outputs kept per key; above 1, hits pick one at random so
+# repeated requests still see some variety
+LLM_CACHE_VARIANTS = int(os.getenv("LLM_CACHE_VARIANTS", "1"))
+
+# Concurrent playlist-name requests are answered by one multi-item prompt.
+# A batch is sent when it holds LLM_BATCH_MAX_SIZE requests or
+# LLM_BATCH_WINDOW seconds after its first request, whichever comes first.
+LLM_BATCH_ENABLED = os.getenv("LLM_BATCH_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", "8"))
+LLM_BATCH_WINDOW = float(os.getenv("LLM_BATCH_WINDOW", "0.02"))
+
+# Seconds a request waits for the model before answering with the
+# deterministic fallback; the generation keeps running in the background
+# and fills the cache. Override per method with LLM_BUDGET_<METHOD>.
+LLM_BUDGETS = {
+    method: float(os.getenv(f"LLM_BUDGET_{method.upper()}", default))
+    for method, default in (
+        ("generate_playlist_name", "5"),
+        ("analyze_mood", "15"),
+        ("fix_playlist", "20"),
+        ("generate_taste_summary", "15")
+    )
+}
+# After LLM_BREAKER_FAILURES consecutive failures or blown budgets the LLM
+# is skipped for LLM_BREAKER_RESET seconds, then one trial call is let through
+LLM_BREAKER_ENABLED = os.getenv("LLM_BREAKER_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+# LangChain is imported on first use (or by warm()), not at module import:
+# it takes over a second to load and most workers start long before their
+# first AI request.
+_import_lock = threading.Lock()
+_llm_class: Optional[type] = None
+LANGCHAIN_AVAILABLE: Optional[bool] = None  # None until the import is attempted
 
-# LangChain imports
-try:
-    from langchain_ollama import OllamaLLM
-    from langchain.prompts import PromptTemplate
-    from langchain.chains import LLMChain
-    LANGCHAIN_AVAILABLE = True
-except ImportError:
-    LANGCHAIN_AVAILABLE = False
+def load_llm_class() -> Optional[type]:
+    """
+    Import the LangChain Ollama client class, once.
+    
+    Returns:
+        OllamaLLM, or None if langchain-ollama is not installed
+    """
+    global _llm_class, LANGCHAIN_AVAILABLE
+    if LANGCHAIN_AVAILABLE is None:
+        with _import_lock:
+            if LANGCHAIN_AVAILABLE is None:
+                try:
+                    from langchain_ollama import OllamaLLM
+                    _llm_class = OllamaLLM
+                    LANGCHAIN_AVAILABLE = True
+                except ImportError:
+                    LANGCHAIN_AVAILABLE = False
+    return _llm_class
+
+class LLMOverloadedError(Exception):
+    """Raised when the LLM queue is full or a queued call waited too long."""
+
+class LLMUnavailableError(Exception):
+    """Raised when the circuit breaker is open or a call exceeded its latency budget."""
+
+class LLMLimiter:
+    """
+    Bounds concurrent LLM generations with a waiting queue of limited size.
+    
+    Generations run on the event loop through the client's async API, so the
+    limit protects Ollama rather than the server: requests that do not use
+    the LLM are never held up by it.
+    """
+    
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, max_queue: int = LLM_MAX_QUEUE,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.active = 0
+        self.waiting = 0
+        self.counters = {
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "wait_seconds": 0.0
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of slot usage and queue counters."""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            **self.counters,
+            "wait_seconds": round(self.counters["wait_seconds"], 3)
+        }
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+            self.active = 0
+            self.waiting = 0
+        return self._semaphore
+    
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Hold one generation slot for the duration of the block.
+        
+        Raises:
+            LLMOverloadedError: If the queue is full or no slot frees up
+                within queue_timeout
+        """
+        semaphore = self._get_semaphore()
+        if semaphore.locked() and self.waiting >= self.max_queue:
+            self.counters["rejected"] += 1
+            raise LLMOverloadedError("LLM queue is full")
+        
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.counters["timed_out"] += 1
+            raise LLMOverloadedError("Timed out waiting for the LLM") from None
+        finally:
+            self.waiting -= 1
+        self.counters["wait_seconds"] += time.perf_counter() - start
+        
+        self.active += 1
+        try:
+            yield
+            self.counters["completed"] += 1
+        except BaseException:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            self.active -= 1
+            semaphore.release()
+
+class CircuitBreaker:
+    """
+    Stops calling the LLM after repeated failures.
+    
+    While closed, calls go through. After failure_threshold consecutive
+    failures the breaker opens and refuses calls for reset_timeout seconds.
+    It then lets a single trial call through (half-open): success closes the
+    breaker again, failure reopens it.
+    """
+    
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_timeout: float = LLM_BREAKER_RESET):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.counters = {
+            "successes": 0,
+            "failures": 0,
+            "opened": 0,
+            "short_circuited": 0
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of breaker state and counters."""
+        retry_in = None
+        if self.state == "open":
+            retry_in = round(max(0.0, self._opened_at + self.reset_timeout - time.monotonic()), 3)
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_in_seconds": retry_in,
+            **self.counters
+        }
+    
+    def allow(self) -> bool:
+        """Whether a call may go to the LLM now. Every allowed call must be
+        followed by record_success, record_failure or release."""
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                self.counters["short_circuited"] += 1
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._trial_running:
+                self.counters["short_circuited"] += 1
+                return False
+            self._trial_running = True
+        return True
+    
+    def record_success(self):
+        self.counters["successes"] += 1
+        self.consecutive_failures = 0
+        self._trial_running = False
+        self.state = "closed"
+    
+    def record_failure(self):
+        self.counters["failures"] += 1
+        self.consecutive_failures += 1
+        self._trial_running = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.counters["opened"] += 1
+            self.state = "open"
+            self._opened_at = time.monotonic()
+    
+    def release(self):
+        """End an allowed call that says nothing about the LLM's health."""
+        self._trial_running = False
+
+class LLMCache:
+    """
+    Memoizes LLM outputs per model and normalized prompt inputs.
+    
+    Entries live in an in-memory LRU backed by a SQLite table, so they
+    survive restarts. Entries expire after ttl seconds. With variants > 1
+    up to that many outputs are collected per key before lookups start
+    hitting, and each hit returns one of them at random. SQLite errors are
+    logged and treated as a miss (get) or a skipped store (put), never
+    surfaced to the caller.
+    """
+    
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: float = LLM_CACHE_TTL,
+                 db_path: Optional[str] = LLM_CACHE_DB, max_db_rows: int = LLM_CACHE_DB_MAX_ROWS,
+                 variants: int = LLM_CACHE_VARIANTS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path or None
+        self.max_db_rows = max_db_rows
+        self.variants = max(1, variants)
+        self._entries: "OrderedDict[str, List[Tuple[str, float]]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._stored = 0
+        self.method_counters: Dict[str, Dict[str, int]] = {}
+        self.counters = {
+            "evictions": 0,
+            "expired": 0,
+            "disk_loads": 0,
+            "db_errors": 0
+        }
+    
+    @staticmethod
+    def make_key(method: str, model: str, inputs: Dict[str, Any]) -> str:
+        """
+        Build a cache key from the method, model and normalized inputs.
+        
+        Args:
+            method: Assistant method the output belongs to
+            model: Model name
+            inputs: Normalized prompt inputs (JSON-serializable)
+        
+        Returns:
+            Hex digest key
+        """
+        canonical = json.dumps([method, model, inputs], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of cache size and per-method hit counters."""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "variants": self.variants,
+            "persistent": self.db_path is not None,
+            "methods": {
+                method: {
+                    **counters,
+                    "hit_rate": round(counters["hits"] / (counters["hits"] + counters["misses"]), 4)
+                    if counters["hits"] + counters["misses"] else 0.0
+                }
+                for method, counters in self.method_counters.items()
+            },
+            **self.counters
+        }
+    
+    def _count(self, method: str, counter: str):
+        counters = self.method_counters.setdefault(method, {"hits": 0, "misses": 0, "stored": 0})
+        counters[counter] += 1
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+            try:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+                db.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT NOT NULL,
+                    variant INTEGER NOT NULL,
+                    method TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    PRIMARY KEY (key, variant)
+                )
+                """)
+                db.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_stored_at ON llm_cache(stored_at)")
+                db.commit()
+            except sqlite3.Error:
+                # Try again from scratch on the next lookup
+                db.close()
+                raise
+            self._db = db
+        return self._db
+    
+    def _load(self, key: str) -> List[Tuple[str, float]]:
+        with self._db_lock:
+            rows = self._connect().execute(
+                "SELECT value, stored_at FROM llm_cache WHERE key = ? AND stored_at > ? ORDER BY variant",
+                (key, time.time() - self.ttl)
+            ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+    
+    def _save(self, key: str, variant: int, method: str, value: str, stored_at: float):
+        with self._db_lock:
+            db = self._connect()
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, variant, method, value, stored_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, variant, method, value, stored_at)
+                )
+                self._stored += 1
+                if self._stored % 500 == 0:
+                    db.execute("DELETE FROM llm_cache WHERE stored_at <= ?", (time.time() - self.ttl,))
+                    db.execute("""
+                    DELETE FROM llm_cache WHERE rowid IN (
+                        SELECT rowid FROM llm_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?
+                    )
+                    """, (self.max_db_rows,))
+                db.commit()
+            except sqlite3.Error:
+                db.rollback()
+                raise
+    
+    def _fresh(self, key: str) -> Optional[List[Tuple[str, float]]]:
+        values = self._entries.get(key)
+        if values is None:
+            return None
+        cutoff = time.time() - self.ttl
+        live = [value for value in values if value[1] > cutoff]
+        if len(live) < len(values):
+            self.counters["expired"] += len(values) - len(live)
+            if not live:
+                del self._entries[key]
+                return None
+            self._entries[key] = live
+        self._entries.move_to_end(key)
+        return live
+    
+    def _remember(self, key: str, values: List[Tuple[str, float]]):
+        self._entries[key] = values
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+    
+    async def get(self, method: str, key: str) -> Optional[str]:
+        """
+        Look up a cached output.
+        
+        Returns:
+            A cached output, or None on a miss or while fewer than
+            ``variants`` outputs have been collected for the key
+        """
+        values = self._fresh(key)
+        if values is None and self.db_path is not None:
+            try:
+                values = await asyncio.to_thread(self._load, key)
+            except sqlite3.Error as e:
+                logger.warning("LLM cache lookup failed, treating as a miss: %s", e)
+                self.counters["db_errors"] += 1
+                values = None
+            if values:
+                self.counters["disk_loads"] += 1
+                self._remember(key, values)
+        
+        if not values or len(values) < self.variants:
+            self._count(method, "misses")
+            return None
+        self._count(method, "hits")
+        return random.choice(values)[0]
+    
+    async def put(self, method: str, key: str, value: str):
+        """Store a freshly generated output as one of the key's variants."""
+        now = time.time()
+        values = list(self._fresh(key) or [])
+        if len(values) >= self.variants:
+            # Replace the oldest variant
+            variant = min(range(len(values)), key=lambda i: values[i][1])
+            values[variant] = (value, now)
+        else:
+            variant = len(values)
+            values.append((value, now))
+        self._remember(key, values)
+        self._count(method, "stored")
+        
+        if self.db_path is not None:
+            try:
+                await asyncio.to_thread(self._save, key, variant, method, value, now)
+            except sqlite3.Error as e:
+                logger.warning("LLM cache store failed, keeping the entry in memory only: %s", e)
+                self.counters["db_errors"] += 1
+    
+    def clear(self):
+        """Drop all in-memory entries (the SQLite copy is kept)."""
+        self._entries.clear()
+
+def _normalize(values: List[str], limit: int = 5) -> List[str]:
+    """Lower-case, trim and de-duplicate the first ``limit`` values."""
+    return list(dict.fromkeys(value.strip().lower() for value in values[:limit] if value))
+
+class LLMBatcher:
+    """
+    Groups concurrent calls into batches handled by one run_batch call.
+    
+    The first item of a batch opens a window of `window` seconds. The batch
+    runs when the window closes or max_size distinct items have arrived.
+    Identical items in one batch are run once. run_batch gets the distinct
+    items and returns one result per item, None where it has no answer.
+    """
+    
+    def __init__(self, run_batch: Callable[[List[Hashable]], Awaitable[List[Optional[Any]]]],
+                 max_size: int = LLM_BATCH_MAX_SIZE, window: float = LLM_BATCH_WINDOW):
+        self.run_batch = run_batch
+        self.max_size = max(1, max_size)
+        self.window = window
+        self._pending: "OrderedDict[Hashable, List[asyncio.Future]]" = OrderedDict()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self.counters = {
+            "batches": 0,
+            "items": 0,
+            "deduplicated": 0,
+            "unanswered": 0,
+            "failed_batches": 0,
+            "largest_batch": 0
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of batching counters."""
+        batches = self.counters["batches"]
+        return {
+            "max_size": self.max_size,
+            "window": self.window,
+            "pending": len(self._pending),
+            "mean_batch_size": round((self.counters["items"] - self.counters["deduplicated"]) / batches, 2)
+            if batches else 0.0,
+            **self.counters
+        }
+    
+    async def submit(self, item: Hashable) -> Optional[Any]:
+        """
+        Add an item to the current batch and wait for its result.
+        
+        Args:
+            item: Hashable description of the work
+        
+        Returns:
+            The item's result, or None if the batch had no answer for it
+        
+        Raises:
+            Exception: Whatever run_batch raised for the whole batch
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.counters["items"] += 1
+        if item in self._pending:
+            self.counters["deduplicated"] += 1
+            self._pending[item].append(future)
+        else:
+            self._pending[item] = [future]
+        
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+    
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, OrderedDict()
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, batch: "OrderedDict[Hashable, List[asyncio.Future]]"):
+        items = list(batch)
+        self.counters["batches"] += 1
+        self.counters["largest_batch"] = max(self.counters["largest_batch"], len(items))
+        try:
+            results = await self.run_batch(items)
+        except Exception as e:
+            self.counters["failed_batches"] += 1
+            for waiters in batch.values():
+                for future in waiters:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        
+        for item, result in zip(items, results):
+            if result is None:
+                self.counters["unanswered"] += 1
+            for future in batch[item]:
+                if not future.done():
+                    future.set_result(result)
+
+_NUMBERED_LINE = re.compile(r"^\s*(?:[-*]\s*)?(\d+)\s*[.):-]\s*(.+?)\s*$")
+
+def _parse_numbered(text: str, count: int) -> List[Optional[str]]:
+    """
+    Pull "<n>. answer" lines out of a multi-item response.
+    
+    Returns:
+        count answers in order, None for items without a usable line
+    """
+    answers: List[Optional[str]] = [None] * count
+    for line in text.splitlines():
+        match = _NUMBERED_LINE.match(line)
+        if not match:
+            continue
+        index = int(match.group(1)) - 1
+        answer = match.group(2).strip().strip("\"'*").strip()
+        if 0 <= index < count and answers[index] is None and answer:
+            answers[index] = answer
+    return answers
+
+class LLMStream:
+    """
+    Async iterator over text chunks of one generation.
+    
+    If the LLM is unavailable, the circuit breaker is open, or the model
+    fails or misses the task's latency budget before producing its first
+    chunk, the fallback answer is yielded as a single chunk instead. A
+    cached stream (method given, cache enabled) that misses the budget keeps
+    generating in the background to store its answer for the next request;
+    any other generation is cancelled. Once
+    iteration ends, ``text`` holds the full output and ``result`` the final
+    value (the text, or whatever ``finish`` builds from it).
+    """
+    
+    def __init__(self, assistant: "SpotifyAIAssistant", task: str, prompt: str, fallback: Callable[[], str],
+                 method: Optional[str] = None, inputs: Optional[Dict[str, Any]] = None,
+                 finish: Optional[Callable[[str, bool], Any]] = None):
+        self.assistant = assistant
+        self.task = task
+        self.prompt = prompt
+        self.fallback = fallback
+        self.method = method
+        self.inputs = inputs
+        self.finish = finish
+        self.text = ""
+        self.used_fallback = False
+        self.error: Optional[Exception] = None
+    
+    async def __aiter__(self) -> AsyncIterator[str]:
+        assistant = self.assistant
+        if not await assistant.get_llm():
+            self.used_fallback = True
+            self.text = self.fallback()
+            yield self.text
+            return
+        
+        # The generation runs in its own task feeding a queue, so missing
+        # the budget only abandons the wait, not the generation
+        chunks: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        
+        async def pump():
+            try:
+                async for chunk in assistant._stream(self.prompt, self.task, self.method, self.inputs):
+                    chunks.put_nowait(chunk)
+            finally:
+                chunks.put_nowait(None)
+        
+        generation = asyncio.ensure_future(pump())
+        finishing_late = False
+        try:
+            budget = assistant.budgets.get(self.task)
+            try:
+                chunk = await asyncio.wait_for(chunks.get(), budget)
+            except asyncio.TimeoutError:
+                assistant.budget_counters[self.task]["timeouts"] += 1
+                if self.method is not None and assistant.cache is not None:
+                    assistant._finish_late(self.task, generation)
+                    finishing_late = True
+                raise LLMUnavailableError(f"{self.task} exceeded its {budget:g}s budget") from None
+            while chunk is not None:
+                self.text += chunk
+                yield chunk
+                chunk = await chunks.get()
+            # Raises whatever ended the generation early
+            await generation
+        except Exception as e:
+            self.error = e
+        finally:
+            if not finishing_late and not generation.done():
+                generation.cancel()
+        
+        if self.error is not None and not self.text:
+            # Partial text already sent is kept rather than switching answers
+            self.used_fallback = True
+            self.text = self.fallback()
+            yield self.text
+    
+    @property
+    def result(self) -> Any:
+        """Final value once iteration has finished."""
+        if self.finish is not None:
+            return self.finish(self.text, self.used_fallback)
+        return self.text.strip()
 
 class SpotifyAIAssistant:
     """
@@ -23,16 +688,232 @@ class SpotifyAIAssistant:
     
     def __init__(self):
         self.model_name = OLLAMA_MODEL
-        self.base_url = OLLAMA_BASE_URL
+        self.tasks = {task: dict(settings) for task, settings in LLM_TASKS.items()}
+        self.base_urls = OLLAMA_BASE_URLS
+        self.base_url = self.base_urls[0]
+        self.pool: Optional[OllamaPool] = None
+        self._llm = None
+        self._llm_ready = False
+        self._llm_lock = threading.Lock()
+        self.limiter = LLMLimiter(max_concurrency=LLM_MAX_CONCURRENCY * len(self.base_urls))
+        self.cache = LLMCache() if LLM_CACHE_ENABLED else None
+        self.name_batcher = LLMBatcher(self._run_name_batch) if LLM_BATCH_ENABLED else None
+        self.breaker = CircuitBreaker() if LLM_BREAKER_ENABLED else None
+        self.budgets = dict(LLM_BUDGETS)
+        self.budget_counters = {method: {"timeouts": 0, "finished_late": 0} for method in self.budgets}
+        # Generations that outlived their budget, finishing in the background
+        self._late_tasks = set()
+    
+    @property
+    def llm(self):
+        """
+        The Ollama client, created on first access (None without LangChain).
         
-        if LANGCHAIN_AVAILABLE:
-            self.llm = OllamaLLM(
-                model=self.model_name,
-                base_url=self.base_url,
-                temperature=0.7
-            )
+        This is an OllamaPool over every configured backend, with one
+        LangChain client per backend and task settings.
+        """
+        if not self._llm_ready:
+            with self._llm_lock:
+                if not self._llm_ready:
+                    llm_class = load_llm_class()
+                    if llm_class is not None:
+                        self.pool = OllamaPool(self.base_urls, lambda url, **settings: llm_class(
+                            base_url=url,
+                            keep_alive=OLLAMA_KEEP_ALIVE,
+                            **{"model": self.model_name, "temperature": 0.7, **settings}
+                        ), max_concurrency=LLM_MAX_CONCURRENCY)
+                        self._llm = self.pool
+                    self._llm_ready = True
+        return self._llm
+    
+    @llm.setter
+    def llm(self, value):
+        self._llm = value
+        self._llm_ready = True
+    
+    async def get_llm(self):
+        """The Ollama client, loading LangChain on a worker thread if needed."""
+        if self._llm_ready:
+            return self._llm
+        llm = await asyncio.to_thread(lambda: self.llm)
+        if self.pool is not None:
+            self.pool.start()
+        return llm
+    
+    async def warm(self):
+        """
+        Load LangChain and build the client off the event loop, then load
+        every task's model on each backend so first requests skip model load.
+        """
+        await self.get_llm()
+        if self.pool is not None and LLM_WARM_MODELS:
+            models = sorted({settings["model"] for settings in self.tasks.values()})
+            await self.pool.warm(models, OLLAMA_KEEP_ALIVE)
+    
+    async def close(self):
+        """Stop background work (backend health checks); call on shutdown."""
+        if self.pool is not None:
+            await self.pool.stop()
+    
+    def _route(self, llm, task: Optional[str], **overrides) -> Dict[str, Any]:
+        """Task routing arguments for the pool; a client set directly gets none."""
+        if task is None or llm is not self.pool:
+            return {}
+        return {"task": task, "settings": {**self.tasks[task], **overrides}}
+    
+    def _model_for(self, task: str) -> str:
+        return self.tasks.get(task, {}).get("model", self.model_name)
+    
+    def task_stats(self) -> Dict[str, Any]:
+        """Settings of each task with its latency and token counters."""
+        counters = self.pool.task_stats() if self.pool is not None else {}
+        return {
+            task: {**settings, **counters.get(task, {})}
+            for task, settings in self.tasks.items()
+        }
+    
+    async def _invoke(self, prompt: str, task: Optional[str] = None, **overrides) -> str:
+        """
+        Run one generation without blocking the event loop.
+        
+        Uses the client's async API when it has one, otherwise runs the
+        blocking call on a worker thread. Waits for a slot from the limiter.
+        The outcome is reported to the circuit breaker once per generation,
+        however many callers share it (batching, cache warming): a failure,
+        or an answer later than the task's budget, counts against it.
+        
+        Args:
+            prompt: Prompt to send
+            task: Task whose model settings to use
+            **overrides: Settings replacing the task's for this call
+        
+        Raises:
+            LLMUnavailableError: If the circuit breaker is open
+        """
+        if not self._breaker_allows():
+            raise LLMUnavailableError("LLM circuit breaker is open")
+        
+        budget = self.budgets.get(task) if task else None
+        start = time.monotonic()
+        healthy = None
+        try:
+            llm = await self.get_llm()
+            route = self._route(llm, task, **overrides)
+            async with self.limiter.slot():
+                if hasattr(llm, "ainvoke"):
+                    result = await llm.ainvoke(prompt, **route)
+                else:
+                    result = await asyncio.to_thread(lambda: llm.invoke(prompt, **route))
+            healthy = not budget or time.monotonic() - start <= budget
+            return result
+        except LLMOverloadedError:
+            raise
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            self._record_health(healthy)
+    
+    async def _invoke_cached(self, method: str, inputs: Dict[str, Any], prompt: str,
+                             generate: Optional[Callable[[], Awaitable[str]]] = None) -> str:
+        """
+        Run a generation through the memoization cache.
+        
+        Args:
+            method: Name the output is cached and counted under
+            inputs: Normalized inputs that determine the prompt
+            prompt: Prompt to send on a cache miss
+            generate: Produces the output on a cache miss instead of sending
+                prompt on its own (used for batching)
+        
+        Returns:
+            Stripped LLM output
+        """
+        key = None
+        if self.cache is not None:
+            key = LLMCache.make_key(method, self._model_for(method), inputs)
+            cached = await self.cache.get(method, key)
+            if cached is not None:
+                return cached
+        
+        async def run() -> str:
+            if generate is not None:
+                result = (await generate()).strip()
+            else:
+                result = (await self._invoke(prompt, method)).strip()
+            if key is not None and result:
+                await self.cache.put(method, key, result)
+            return result
+        
+        return await self._within_budget(method, run(), finish_late=key is not None)
+    
+    async def _within_budget(self, method: str, generation: Awaitable[str], finish_late: bool = False) -> str:
+        """
+        Await a generation for at most the method's latency budget.
+        
+        On timeout LLMUnavailableError is raised for the caller to fall
+        back. The circuit breaker is fed by the generation itself (see
+        _invoke), not by each caller waiting.
+        
+        Args:
+            method: Method whose budget applies
+            generation: The generation to await
+            finish_late: Keep the generation running in the background when
+                the caller stops waiting, because its answer will be cached;
+                otherwise it is cancelled so it stops holding an LLM slot
+        
+        Raises:
+            LLMUnavailableError: If the breaker is open or the budget ran out
+        """
+        task = asyncio.ensure_future(generation)
+        budget = self.budgets.get(method)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), budget)
+        except asyncio.TimeoutError:
+            self.budget_counters[method]["timeouts"] += 1
+            self._abandon(method, task, finish_late)
+            raise LLMUnavailableError(f"{method} exceeded its {budget:g}s budget") from None
+        except asyncio.CancelledError:
+            self._abandon(method, task, finish_late)
+            raise
+    
+    def _abandon(self, method: str, task: asyncio.Future, finish_late: bool):
+        if finish_late:
+            self._finish_late(method, task)
         else:
-            self.llm = None
+            task.cancel()
+    
+    def _finish_late(self, method: str, task: asyncio.Future):
+        self._late_tasks.add(task)
+        
+        def _done(done: asyncio.Future):
+            self._late_tasks.discard(done)
+            if not done.cancelled() and done.exception() is None:
+                self.budget_counters[method]["finished_late"] += 1
+        
+        task.add_done_callback(_done)
+    
+    def _breaker_allows(self) -> bool:
+        return self.breaker is None or self.breaker.allow()
+    
+    def _record_health(self, healthy: Optional[bool]):
+        """Report a call outcome to the breaker: True/False, or None if it
+        says nothing about the LLM (queue full, caller went away)."""
+        if self.breaker is None:
+            return
+        if healthy is None:
+            self.breaker.release()
+        elif healthy:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+    
+    def budget_stats(self) -> Dict[str, Any]:
+        """Latency budgets and how often each was exceeded."""
+        return {
+            method: {"budget_seconds": budget, **self.budget_counters[method]}
+            for method, budget in self.budgets.items()
+        }
     
     async def generate_playlist_name(self, genres: List[str], mood: Optional[str] = None) -> str:
         """
@@ -45,21 +926,25 @@ class SpotifyAIAssistant:
         Returns:
             Generated playlist name
         """
-        if not self.llm:
+        if not await self.get_llm():
             return self._fallback_playlist_name(genres, mood)
         
-        genres_str = ", ".join(genres[:5])
-        mood_str = f" with a {mood} vibe" if mood else ""
+        prompt = self._playlist_name_prompt(genres, mood)
+        inputs = {
+            "genres": sorted(_normalize(genres)),
+            "mood": mood.strip().lower() if mood else None
+        }
         
-        prompt = f"""Generate a creative and catchy Spotify playlist name for a playlist with these genres: {genres_str}{mood_str}.
-The name should be short (2-5 words), creative, and relevant to the genres.
-Only respond with the playlist name, nothing else."""
+        generate = None
+        if self.name_batcher is not None:
+            async def generate() -> str:
+                return await self.name_batcher.submit((tuple(genres[:5]), mood)) or ""
         
         try:
-            result = self.llm.invoke(prompt)
-            return result.strip()
+            name = await self._invoke_cached("generate_playlist_name", inputs, prompt, generate)
         except Exception:
             return self._fallback_playlist_name(genres, mood)
+        return name or self._fallback_playlist_name(genres, mood)
     
     async def analyze_mood(self, top_tracks: List[Dict[str, Any]], top_artists: List[Dict[str, Any]]) -> str:
         """
@@ -72,22 +957,13 @@ Only respond with the playlist name, nothing else."""
         Returns:
             Mood analysis as string
         """
-        if not self.llm:
+        if not await self.get_llm():
             return self._fallback_mood_analysis(top_tracks, top_artists)
         
-        track_names = ", ".join([t.get("name", "") for t in top_tracks[:5]])
-        artist_names = ", ".join([a.get("name", "") for a in top_artists[:5]])
-        genres = ", ".join(list(set([g for a in top_artists for g in a.get("genres", [])][:5])))
-        
-        prompt = f"""Analyze the following user's music taste and describe their listening mood in 2-3 sentences:
-Top tracks: {track_names}
-Top artists: {artist_names}
-Genres: {genres}
-
-Be creative and insightful about their mood and music preferences."""
+        prompt = self._mood_prompt(top_tracks, top_artists)
         
         try:
-            result = self.llm.invoke(prompt)
+            result = await self._within_budget("analyze_mood", self._invoke(prompt, "analyze_mood"))
             return result.strip()
         except Exception:
             return self._fallback_mood_analysis(top_tracks, top_artists)
@@ -103,30 +979,14 @@ Be creative and insightful about their mood and music preferences."""
         Returns:
             Dictionary with suggestions and recommendations
         """
-        if not self.llm:
+        if not await self.get_llm():
             return self._fallback_playlist_fix(playlist_name, tracks)
         
-        track_count = len(tracks)
-        track_names = ", ".join([t.get("name", "") for t in tracks[:10]])
-        
-        prompt = f"""I have a Spotify playlist called "{playlist_name}" with {track_count} tracks.
-Some example tracks: {track_names}
-
-Analyze this playlist and provide:
-1. What the theme/mood of the playlist is
-2. 2-3 suggestions to improve it
-3. Whether the tracks flow well together
-
-Keep response concise and actionable."""
+        prompt = self._fix_prompt(playlist_name, tracks)
         
         try:
-            analysis = self.llm.invoke(prompt)
-            return {
-                "playlist": playlist_name,
-                "track_count": track_count,
-                "analysis": analysis.strip(),
-                "suggestions": self._extract_suggestions(analysis)
-            }
+            analysis = await self._within_budget("fix_playlist", self._invoke(prompt, "fix_playlist"))
+            return self._playlist_fix_result(playlist_name, tracks, analysis)
         except Exception:
             return self._fallback_playlist_fix(playlist_name, tracks)
     
@@ -144,25 +1004,213 @@ Keep response concise and actionable."""
         Returns:
             Taste summary as string
         """
-        if not self.llm:
+        if not await self.get_llm():
             return self._fallback_taste_summary(top_tracks, top_artists, top_genres)
         
+        prompt = self._summary_prompt(top_tracks, top_artists, top_genres)
+        inputs = self._summary_inputs(top_tracks, top_artists, top_genres)
+        try:
+            return await self._invoke_cached("generate_taste_summary", inputs, prompt)
+        except Exception:
+            return self._fallback_taste_summary(top_tracks, top_artists, top_genres)
+    
+    def stream_mood(self, top_tracks: List[Dict[str, Any]], top_artists: List[Dict[str, Any]]) -> "LLMStream":
+        """
+        Streaming variant of analyze_mood.
+        
+        Returns:
+            LLMStream yielding the mood analysis as it is generated
+        """
+        return LLMStream(
+            self,
+            "analyze_mood",
+            self._mood_prompt(top_tracks, top_artists),
+            lambda: self._fallback_mood_analysis(top_tracks, top_artists)
+        )
+    
+    def stream_fix_playlist(self, playlist_name: str, tracks: List[Dict[str, Any]]) -> "LLMStream":
+        """
+        Streaming variant of fix_playlist.
+        
+        Returns:
+            LLMStream yielding the analysis text; its result is the same
+            dict fix_playlist returns
+        """
+        return LLMStream(
+            self,
+            "fix_playlist",
+            self._fix_prompt(playlist_name, tracks),
+            lambda: self._fallback_playlist_fix(playlist_name, tracks)["analysis"],
+            finish=lambda text, fallback: (
+                self._fallback_playlist_fix(playlist_name, tracks) if fallback
+                else self._playlist_fix_result(playlist_name, tracks, text)
+            )
+        )
+    
+    def stream_taste_summary(self, top_tracks: List[Dict[str, Any]], top_artists: List[Dict[str, Any]],
+                             top_genres: List[str]) -> "LLMStream":
+        """
+        Streaming variant of generate_taste_summary (shares its cache).
+        
+        Returns:
+            LLMStream yielding the summary as it is generated
+        """
+        return LLMStream(
+            self,
+            "generate_taste_summary",
+            self._summary_prompt(top_tracks, top_artists, top_genres),
+            lambda: self._fallback_taste_summary(top_tracks, top_artists, top_genres),
+            method="generate_taste_summary",
+            inputs=self._summary_inputs(top_tracks, top_artists, top_genres)
+        )
+    
+    async def _stream(self, prompt: str, task: str, method: Optional[str] = None,
+                      inputs: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Yield generated text chunks with the task's model settings, serving
+        and filling the cache when a method name is given. A first chunk
+        arriving after the task's budget counts as a breaker failure.
+        """
+        key = None
+        if self.cache is not None and method is not None:
+            key = LLMCache.make_key(method, self._model_for(method), inputs)
+            cached = await self.cache.get(method, key)
+            if cached is not None:
+                yield cached
+                return
+        
+        if not self._breaker_allows():
+            raise LLMUnavailableError("LLM circuit breaker is open")
+        
+        budget = self.budgets.get(task)
+        deadline = time.monotonic() + budget if budget else None
+        parts = []
+        healthy = None
+        try:
+            llm = await self.get_llm()
+            route = self._route(llm, task)
+            async with self.limiter.slot():
+                if hasattr(llm, "astream"):
+                    async for chunk in llm.astream(prompt, **route):
+                        if chunk:
+                            if not parts and deadline is not None and time.monotonic() > deadline:
+                                # Answered, but too late for the caller
+                                healthy = False
+                            parts.append(chunk)
+                            yield chunk
+                else:
+                    text = await asyncio.to_thread(lambda: llm.invoke(prompt, **route))
+                    if deadline is not None and time.monotonic() > deadline:
+                        healthy = False
+                    parts.append(text)
+                    yield text
+            if healthy is None:
+                healthy = True
+        except LLMOverloadedError:
+            raise
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            self._record_health(healthy)
+        
+        result = "".join(parts).strip()
+        if key is not None and result:
+            await self.cache.put(method, key, result)
+    
+    async def _run_name_batch(self, items: List[Tuple[Tuple[str, ...], Optional[str]]]) -> List[Optional[str]]:
+        """
+        Name several playlists with one generation.
+        
+        A batch of one is sent with the regular single-name prompt.
+        
+        Args:
+            items: (genres, mood) per playlist
+        
+        Returns:
+            One name per item, None where the response had no usable line
+        """
+        if len(items) == 1:
+            genres, mood = items[0]
+            prompt = self._playlist_name_prompt(list(genres), mood)
+            return [(await self._invoke(prompt, "generate_playlist_name")).strip() or None]
+        
+        lines = []
+        for number, (genres, mood) in enumerate(items, 1):
+            mood_str = f"; mood: {mood}" if mood else ""
+            lines.append(f"{number}. Genres: {', '.join(genres)}{mood_str}")
+        prompt = f"""Generate a creative and catchy Spotify playlist name for each of these {len(items)} playlists:
+{chr(10).join(lines)}
+
+Each name should be short (2-5 words), creative, and relevant to its genres and mood.
+Respond with exactly {len(items)} lines in the form "<number>. <playlist name>", nothing else."""
+        
+        # Room for one name per item
+        num_predict = self.tasks["generate_playlist_name"]["num_predict"] * len(items)
+        text = await self._invoke(prompt, "generate_playlist_name", num_predict=num_predict)
+        return _parse_numbered(text, len(items))
+    
+    def _playlist_name_prompt(self, genres: List[str], mood: Optional[str] = None) -> str:
+        genres_str = ", ".join(genres[:5])
+        mood_str = f" with a {mood} vibe" if mood else ""
+        
+        return f"""Generate a creative and catchy Spotify playlist name for a playlist with these genres: {genres_str}{mood_str}.
+The name should be short (2-5 words), creative, and relevant to the genres.
+Only respond with the playlist name, nothing else."""
+    
+    def _mood_prompt(self, top_tracks: List[Dict[str, Any]], top_artists: List[Dict[str, Any]]) -> str:
+        track_names = ", ".join([t.get("name", "") for t in top_tracks[:5]])
+        artist_names = ", ".join([a.get("name", "") for a in top_artists[:5]])
+        genres = ", ".join(list(set([g for a in top_artists for g in a.get("genres", [])][:5])))
+        
+        return f"""Analyze the following user's music taste and describe their listening mood in 2-3 sentences:
+Top tracks: {track_names}
+Top artists: {artist_names}
+Genres: {genres}
+
+Be creative and insightful about their mood and music preferences."""
+    
+    def _fix_prompt(self, playlist_name: str, tracks: List[Dict[str, Any]]) -> str:
+        track_names = ", ".join([t.get("name", "") for t in tracks[:10]])
+        
+        return f"""I have a Spotify playlist called "{playlist_name}" with {len(tracks)} tracks.
+Some example tracks: {track_names}
+
+Analyze this playlist and provide:
+1. What the theme/mood of the playlist is
+2. 2-3 suggestions to improve it
+3. Whether the tracks flow well together
+
+Keep response concise and actionable."""
+    
+    def _summary_prompt(self, top_tracks: List[Dict[str, Any]], top_artists: List[Dict[str, Any]],
+                        top_genres: List[str]) -> str:
         track_names = ", ".join([t.get("name", "") for t in top_tracks[:5]])
         artist_names = ", ".join([a.get("name", "") for a in top_artists[:5]])
         genres_str = ", ".join(top_genres[:5])
         
-        prompt = f"""Write a fun and insightful 3-4 sentence summary of someone's music taste based on:
+        return f"""Write a fun and insightful 3-4 sentence summary of someone's music taste based on:
 Top 5 tracks: {track_names}
 Top 5 artists: {artist_names}
 Top genres: {genres_str}
 
 Make it personal and engaging, like you're describing their musical personality."""
-        
-        try:
-            result = self.llm.invoke(prompt)
-            return result.strip()
-        except Exception:
-            return self._fallback_taste_summary(top_tracks, top_artists, top_genres)
+    
+    def _summary_inputs(self, top_tracks: List[Dict[str, Any]], top_artists: List[Dict[str, Any]],
+                        top_genres: List[str]) -> Dict[str, Any]:
+        return {
+            "tracks": _normalize([t.get("name", "") for t in top_tracks]),
+            "artists": _normalize([a.get("name", "") for a in top_artists]),
+            "genres": _normalize(top_genres)
+        }
+    
+    def _playlist_fix_result(self, playlist_name: str, tracks: List[Dict[str, Any]], analysis: str) -> Dict[str, Any]:
+        return {
+            "playlist": playlist_name,
+            "track_count": len(tracks),
+            "analysis": analysis.strip(),
+            "suggestions": self._extract_suggestions(analysis)
+        }
     
     def _fallback_playlist_name(self, genres: List[str], mood: Optional[str] = None) -> str:
         """Fallback playlist name generation."""
@@ -0,0 +1,110 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+import db
+
+load_dotenv()
+
+DB_READ_WORKERS = int(os.getenv("DB_READ_WORKERS", "4"))
+
+# Reads run on a small pool, each thread with its own pooled connection.
+# Request writes go through a single thread so they never contend for
+# SQLite's write lock with each other. Maintenance (stats compaction) has
+# its own thread and connection so a long pass never queues request writes
+# behind it.
+_read_executor: Optional[ThreadPoolExecutor] = None
+_write_executor: Optional[ThreadPoolExecutor] = None
+_maintenance_executor: Optional[ThreadPoolExecutor] = None
+
+def _executors():
+    global _read_executor, _write_executor, _maintenance_executor
+    if _read_executor is None:
+        _read_executor = ThreadPoolExecutor(max_workers=DB_READ_WORKERS, thread_name_prefix="db-read")
+    if _write_executor is None:
+        _write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+    if _maintenance_executor is None:
+        _maintenance_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-maintenance")
+    return _read_executor, _write_executor, _maintenance_executor
+
+async def _read(fn: Callable[..., Any], *args: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executors()[0], functools.partial(fn, *args))
+
+async def _write(fn: Callable[..., Any], *args: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executors()[1], functools.partial(fn, *args))
+
+async def _maintain(fn: Callable[..., Any], *args: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executors()[2], functools.partial(fn, *args))
+
+async def init_db():
+    """Initialize database with required tables."""
+    await _write(db.init_db)
+
+async def get_user(user_id: str) -> Optional[Dict[str, Any]]:
+    """Get user by ID."""
+    return await _read(db.get_user, user_id)
+
+async def get_user_by_spotify_id(spotify_id: str) -> Optional[Dict[str, Any]]:
+    """Get user by Spotify ID."""
+    return await _read(db.get_user_by_spotify_id, spotify_id)
+
+async def get_users_expiring_before(timestamp: float) -> List[Dict[str, Any]]:
+    """Get users with a refresh token whose access token expires before timestamp."""
+    return await _read(db.get_users_expiring_before, timestamp)
+
+async def create_or_update_user(user_data: Dict[str, Any]) -> str:
+    """Create or update user in database."""
+    return await _write(db.create_or_update_user, user_data)
+
+async def cache_user_stats(user_id: str, stats: Dict[str, Any]):
+    """Cache user statistics."""
+    await _write(db.cache_user_stats, user_id, stats)
+
+async def get_cached_stats(user_id: str) -> Optional[Dict[str, Any]]:
+    """Get cached user statistics."""
+    return await _read(db.get_cached_stats, user_id)
+
+async def upsert_catalog(tracks: List[Dict[str, Any]], artists: List[Dict[str, Any]]):
+    """Add tracks and artists to the shared catalog."""
+    await _write(db.upsert_catalog, tracks, artists)
+
+async def get_tracks(track_ids: List[str]) -> List[Dict[str, Any]]:
+    """Get catalog tracks in the order of track_ids."""
+    return await _read(db.get_tracks, track_ids)
+
+async def get_artists(artist_ids: List[str]) -> List[Dict[str, Any]]:
+    """Get catalog artists in the order of artist_ids."""
+    return await _read(db.get_artists, artist_ids)
+
+async def get_artists_by_genre(genre: str, limit: int = 50) -> List[Dict[str, Any]]:
+    """Get catalog artists tagged with a genre, most popular first."""
+    return await _read(db.get_artists_by_genre, genre, limit)
+
+async def compact_user_stats_batch(after_user: str, now: datetime) -> Tuple[Optional[str], int]:
+    """Apply the user_stats retention policy to the next batch of users."""
+    return await _maintain(db.compact_user_stats_batch, after_user, now)
+
+async def purge_user_invalidations() -> int:
+    """Delete old user_invalidations rows."""
+    return await _maintain(db.purge_user_invalidations)
+
+async def vacuum_free_pages(max_pages: int = db.STATS_VACUUM_PAGES) -> int:
+    """Return up to max_pages free pages to the filesystem."""
+    return await _maintain(db.vacuum_free_pages, max_pages)
+
+def shutdown():
+    """Wait for queued database work to finish and stop the worker threads."""
+    global _read_executor, _write_executor, _maintenance_executor
+    for executor in (_write_executor, _maintenance_executor, _read_executor):
+        if executor is not None:
+            executor.shutdown(wait=True)
+    _read_executor = None
+    _write_executor = None
+    _maintenance_executor = None
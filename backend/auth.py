@@ -5,9 +5,10 @@ import base64
 import time
 from typing import Dict, Tuple
 from urllib.parse import urlencode
-import httpx
 from dotenv import load_dotenv
 
+from http_client import get_client
+
 load_dotenv()
 
 SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID")
@@ -15,7 +16,7 @@ SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
 SPOTIFY_REDIRECT_URI = os.getenv("SPOTIFY_REDIRECT_URI", "http://127.0.0.1:3000/callback")
 
 SPOTIFY_AUTH_URL = "https://accounts.spotify.com/authorize"
-SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
+SPOTIFY_TOKEN_URL = os.getenv("SPOTIFY_TOKEN_URL", "https://accounts.spotify.com/api/token")
 
 # Store state and PKCE codes for validation
 _auth_states: Dict[str, dict] = {}
@@ -93,10 +94,10 @@ async def exchange_code_for_tokens(code: str, state: str) -> Dict[str, str]:
         "code_verifier": auth_data["code_verifier"]
     }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(SPOTIFY_TOKEN_URL, data=data)
-        response.raise_for_status()
-        tokens = response.json()
+    client = get_client()
+    response = await client.post(SPOTIFY_TOKEN_URL, data=data)
+    response.raise_for_status()
+    tokens = response.json()
     
     return {
         "access_token": tokens["access_token"],
@@ -113,7 +114,8 @@ async def refresh_access_token(refresh_token: str) -> Dict[str, str]:
         refresh_token: Valid refresh token
         
     Returns:
-        Dictionary with new access_token and expires_in
+        Dictionary with new access_token, expires_in and, if Spotify
+        rotated it, a new refresh_token
     """
     data = {
         "client_id": SPOTIFY_CLIENT_ID,
@@ -122,13 +124,14 @@ async def refresh_access_token(refresh_token: str) -> Dict[str, str]:
         "refresh_token": refresh_token
     }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(SPOTIFY_TOKEN_URL, data=data)
-        response.raise_for_status()
-        tokens = response.json()
+    client = get_client()
+    response = await client.post(SPOTIFY_TOKEN_URL, data=data)
+    response.raise_for_status()
+    tokens = response.json()
     
     return {
         "access_token": tokens["access_token"],
+        "refresh_token": tokens.get("refresh_token"),
         "expires_in": tokens.get("expires_in", 3600),
         "expires_at": time.time() + tokens.get("expires_in", 3600)
     }
@@ -0,0 +1,124 @@
+"""
+Storage benchmark: JSON blob snapshots vs the normalized catalog.
+
+Writes the same stats snapshots twice into scratch databases. The "blobs"
+layout inserts the full track and artist dicts into every user_stats row,
+as cache_user_stats originally did. The "catalog" layout goes through
+db.cache_user_stats, which stores shared tracks/artists once and only ID
+lists per snapshot. Tracks and artists are drawn from a popularity-skewed
+pool, so popular items recur across users like they do in practice.
+
+Usage (from backend/):
+    python benchmarks/bench_catalog.py [--users 500] [--snapshots 10]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db
+
+POOL_TRACKS = 5000
+POOL_ARTISTS = 1500
+GENRES = [f"genre {i}" for i in range(300)]
+
+def make_pool(rng: random.Random):
+    artists = [{"id": f"artist{i:06d}", "name": f"Artist {i}", "genres": rng.sample(GENRES, 3),
+                "popularity": rng.randint(0, 100), "uri": f"spotify:artist:artist{i:06d}"}
+               for i in range(POOL_ARTISTS)]
+    tracks = []
+    for i in range(POOL_TRACKS):
+        credited = rng.sample(artists, rng.randint(1, 2))
+        tracks.append({"id": f"track{i:06d}", "name": f"Track {i}",
+                       "artists": [a["name"] for a in credited], "artist_ids": [a["id"] for a in credited],
+                       "album": f"Album {i // 10}", "popularity": rng.randint(0, 100),
+                       "uri": f"spotify:track:track{i:06d}"})
+    return tracks, artists
+
+def skewed_sample(rng: random.Random, pool, k: int):
+    """Sample k distinct items, favouring the front of the pool."""
+    picked = {}
+    while len(picked) < k:
+        index = min(len(pool) - 1, int(rng.paretovariate(1.2)) - 1)
+        picked.setdefault(index, pool[index])
+    return list(picked.values())
+
+def snapshots(users: int, count: int, seed: int = 7):
+    rng = random.Random(seed)
+    tracks, artists = make_pool(rng)
+    for snapshot in range(count):
+        for u in range(users):
+            top_tracks = skewed_sample(rng, tracks, 20)
+            top_artists = skewed_sample(rng, artists, 20)
+            yield f"user{u}", {
+                "top_tracks": top_tracks,
+                "top_artists": top_artists,
+                "top_genres": sorted({g for a in top_artists for g in a["genres"]})[:10],
+                "listening_stats": {"total_tracks": 20, "avg_popularity": 50}
+            }
+
+def write_blobs(conn: sqlite3.Connection, user_id: str, stats):
+    with conn:
+        conn.execute("""
+        INSERT INTO user_stats (user_id, top_tracks, top_artists, top_genres, listening_stats)
+        VALUES (?, ?, ?, ?, ?)
+        """, (user_id, json.dumps(stats["top_tracks"]), json.dumps(stats["top_artists"]),
+              json.dumps(stats["top_genres"]), json.dumps(stats["listening_stats"])))
+
+def file_size(conn: sqlite3.Connection, path: str) -> int:
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(path)
+
+def row_count(conn: sqlite3.Connection) -> int:
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    return sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables)
+
+def run(path: str, layout: str, users: int, count: int):
+    db.DATABASE_FILE = path
+    db.init_db()
+    conn = db.get_connection()
+    start = time.perf_counter()
+    for user_id, stats in snapshots(users, count):
+        if layout == "blobs":
+            write_blobs(conn, user_id, stats)
+        else:
+            db.cache_user_stats(user_id, stats)
+    db.write_queue.flush()
+    elapsed = time.perf_counter() - start
+    result = {
+        "bytes": file_size(conn, path),
+        "rows": row_count(conn),
+        "seconds": elapsed
+    }
+    db.close_connections()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON blob snapshots vs normalized catalog")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--snapshots", type=int, default=10)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="spotifai-catalogbench-")
+    results = {
+        layout: run(os.path.join(scratch, f"{layout}.db"), layout, args.users, args.snapshots)
+        for layout in ("blobs", "catalog")
+    }
+
+    blobs, catalog = results["blobs"], results["catalog"]
+    print(f"{args.users} users x {args.snapshots} snapshots")
+    print(f"{'layout':<10} {'db MB':>8} {'rows':>8} {'seconds':>8}")
+    for layout, result in results.items():
+        print(f"{layout:<10} {result['bytes'] / 1e6:>8.2f} {result['rows']:>8} {result['seconds']:>8.2f}")
+    print(f"storage reduction: {blobs['bytes'] / catalog['bytes']:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Microbenchmark: per-call sqlite3.connect vs the pooled connections in db.py.
+
+The "per-call" column reproduces the original access pattern (open a new
+connection in the default rollback-journal mode, run one statement, commit,
+close). The "pooled" column calls the db.py functions, which reuse one
+WAL-mode connection per thread and group-commit writes through the
+write-behind queue (timings include the final flush). Each mode gets its
+own scratch database.
+
+Usage (from backend/):
+    python benchmarks/bench_db.py [--iterations 2000]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db
+
+STATS = {
+    "top_tracks": [{"id": f"t{i}", "name": f"Track {i}", "artists": ["A"], "album": "B",
+                    "popularity": 50, "uri": f"spotify:track:t{i}"} for i in range(20)],
+    "top_artists": [{"id": f"a{i}", "name": f"Artist {i}", "genres": ["pop"],
+                     "popularity": 50, "uri": f"spotify:artist:a{i}"} for i in range(20)],
+    "top_genres": ["pop", "rock"],
+    "listening_stats": {"total_tracks": 20, "avg_popularity": 50}
+}
+
+def user(i: int):
+    return {"id": f"user{i}", "spotify_id": f"user{i}", "access_token": "token", "refresh_token": "refresh",
+            "token_expires_at": time.time() + 3600, "display_name": f"User {i}", "email": "", "followers": 0,
+            "profile_url": "", "image_url": None, "plan_type": "free"}
+
+# --- original access pattern -------------------------------------------------
+
+def legacy_query(path, sql, params, write=False):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    result = None if write else cursor.fetchone()
+    if write:
+        conn.commit()
+    conn.close()
+    return dict(result) if result else None
+
+def legacy_ops(path):
+    upsert = """INSERT OR REPLACE INTO users (id, spotify_id, access_token, refresh_token, token_expires_at,
+        display_name, email, followers, profile_url, image_url, plan_type, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)"""
+    fields = ["id", "spotify_id", "access_token", "refresh_token", "token_expires_at", "display_name",
+              "email", "followers", "profile_url", "image_url", "plan_type"]
+    return {
+        "get_user": lambda i: legacy_query(path, "SELECT * FROM users WHERE id = ?", (f"user{i % 100}",)),
+        "get_user_by_spotify_id": lambda i: legacy_query(
+            path, "SELECT * FROM users WHERE spotify_id = ?", (f"user{i % 100}",)),
+        "get_cached_stats": lambda i: legacy_query(
+            path, "SELECT * FROM user_stats WHERE user_id = ? ORDER BY cached_at DESC LIMIT 1", (f"user{i % 100}",)),
+        "create_or_update_user": lambda i: legacy_query(
+            path, upsert, tuple(user(i % 100)[f] for f in fields), write=True),
+        "cache_user_stats": lambda i: legacy_query(
+            path, "INSERT INTO user_stats (user_id, top_tracks, top_artists, top_genres, listening_stats) "
+                  "VALUES (?, ?, ?, ?, ?)",
+            (f"user{i % 100}", json.dumps(STATS["top_tracks"]), json.dumps(STATS["top_artists"]),
+             json.dumps(STATS["top_genres"]), json.dumps(STATS["listening_stats"])), write=True),
+    }
+
+# --- pooled access through db.py ----------------------------------------------
+
+def pooled_ops():
+    return {
+        "get_user": lambda i: db.get_user(f"user{i % 100}"),
+        "get_user_by_spotify_id": lambda i: db.get_user_by_spotify_id(f"user{i % 100}"),
+        "get_cached_stats": lambda i: db.get_cached_stats(f"user{i % 100}"),
+        "create_or_update_user": lambda i: db.create_or_update_user(user(i % 100)),
+        "cache_user_stats": lambda i: db.cache_user_stats(f"user{i % 100}", STATS),
+    }
+
+def prepare(path: str):
+    """Create the schema and seed 100 users in a scratch database."""
+    db.DATABASE_FILE = path
+    db.init_db()
+    for i in range(100):
+        db.create_or_update_user(user(i))
+        db.cache_user_stats(f"user{i}", STATS)
+    db.write_queue.flush()
+    db.close_connections()
+
+def timed(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    # Queued writes only count once they are committed
+    db.write_queue.flush()
+    return (time.perf_counter() - start) / iterations
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call connect vs pooled SQLite access")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="spotifai-dbbench-")
+    legacy_path = os.path.join(scratch, "legacy.db")
+    pooled_path = os.path.join(scratch, "pooled.db")
+
+    prepare(legacy_path)
+    # The original code never enabled WAL; put the legacy copy back in the default journal mode
+    conn = sqlite3.connect(legacy_path)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.close()
+    prepare(pooled_path)
+
+    legacy = legacy_ops(legacy_path)
+    db.DATABASE_FILE = pooled_path
+    pooled = pooled_ops()
+
+    print(f"{'function':<24} {'per-call us':>12} {'pooled us':>10} {'speedup':>8}")
+    for name in legacy:
+        legacy_s = timed(legacy[name], args.iterations)
+        pooled_s = timed(pooled[name], args.iterations)
+        print(f"{name:<24} {legacy_s * 1e6:>12.1f} {pooled_s * 1e6:>10.1f} {legacy_s / pooled_s:>7.1f}x")
+
+    db.close_connections()
+
+if __name__ == "__main__":
+    main()
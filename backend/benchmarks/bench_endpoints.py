@@ -0,0 +1,114 @@
+"""
+Per-endpoint latency benchmark for the API handlers in main.py.
+
+Spotify, database and LLM calls are replaced by fakes with fixed latencies
+so the numbers reflect how the handlers schedule their upstream calls, not
+network noise. For each endpoint the script prints the serial critical path
+(sum of all upstream latencies, i.e. awaiting them one at a time) next to
+the measured latency.
+
+Usage (from backend/):
+    python benchmarks/bench_endpoints.py [--runs 20] [--spotify-ms 120] [--llm-ms 300]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+import main
+
+FAKE_USER = {
+    "id": "bench-user",
+    "spotify_id": "bench-user",
+    "access_token": "bench-token",
+    "refresh_token": "bench-refresh",
+    "token_expires_at": time.time() + 3600,
+    "display_name": "Bench User",
+    "email": "bench@example.com",
+    "followers": 0,
+    "profile_url": "",
+    "image_url": None,
+    "plan_type": "premium"
+}
+
+def _artists(n):
+    return [{"id": f"a{i}", "name": f"Artist {i}", "genres": [f"genre{i % 7}", "pop"],
+             "popularity": 50, "uri": f"spotify:artist:a{i}"} for i in range(n)]
+
+def _tracks(n):
+    return [{"id": f"t{i}", "name": f"Track {i}", "artists": [f"Artist {i}"], "album": "Album",
+             "popularity": 50, "uri": f"spotify:track:t{i}"} for i in range(n)]
+
+def install_fakes(spotify_s: float, llm_s: float):
+    """Patch the names main.py imported with latency-simulating fakes."""
+    async def top_tracks(token, limit=20, time_range="medium_term", user_key=None):
+        await asyncio.sleep(spotify_s)
+        return _tracks(limit)
+
+    async def top_artists(token, limit=20, time_range="medium_term", user_key=None):
+        await asyncio.sleep(spotify_s)
+        return _artists(limit)
+
+    async def recommendations(token, seed_artists=None, seed_genres=None, limit=20, user_key=None):
+        await asyncio.sleep(spotify_s)
+        return _tracks(limit)
+
+    async def llm(*args, **kwargs):
+        await asyncio.sleep(llm_s)
+        return "benchmark output"
+
+    async def get_user(user_id):
+        return dict(FAKE_USER, id=user_id)
+
+    async def cache_user_stats(user_id, stats):
+        return None
+
+    main.get_user = get_user
+    main.cache_user_stats = cache_user_stats
+    main.get_user_top_tracks = top_tracks
+    main.get_user_top_artists = top_artists
+    main.get_recommendations = recommendations
+    main.ai_assistant.generate_playlist_name = llm
+    main.ai_assistant.analyze_mood = llm
+    main.ai_assistant.generate_taste_summary = llm
+
+def endpoints(spotify_s: float, llm_s: float):
+    """(name, method, path, json body, serial critical path in seconds)"""
+    body = {"user_id": "bench-user", "prompt": "focus"}
+    return [
+        ("GET /user/profile", "GET", "/user/profile?user_id=bench-user&refresh=true", None, 2 * spotify_s),
+        ("POST /blend", "POST", "/blend", {"user_id1": "u1", "user_id2": "u2"}, 3 * spotify_s),
+        ("POST /ai/playlist", "POST", "/ai/playlist", body, 2 * spotify_s + llm_s),
+        ("POST /ai/mood", "POST", "/ai/mood", body, 2 * spotify_s + llm_s),
+        ("POST /ai/summary", "POST", "/ai/summary", body, 2 * spotify_s + llm_s),
+    ]
+
+async def run(runs: int, spotify_s: float, llm_s: float):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'endpoint':<20} {'serial ms':>10} {'p50 ms':>10} {'mean ms':>10} {'speedup':>8}")
+        for name, method, path, body, serial in endpoints(spotify_s, llm_s):
+            samples = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                response = await client.request(method, path, json=body)
+                samples.append(time.perf_counter() - start)
+                response.raise_for_status()
+            p50 = statistics.median(samples)
+            print(f"{name:<20} {serial * 1000:>10.1f} {p50 * 1000:>10.1f} "
+                  f"{statistics.mean(samples) * 1000:>10.1f} {serial / p50:>7.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--spotify-ms", type=float, default=120)
+    parser.add_argument("--llm-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    install_fakes(args.spotify_ms / 1000, args.llm_ms / 1000)
+    asyncio.run(run(args.runs, args.spotify_ms / 1000, args.llm_ms / 1000))
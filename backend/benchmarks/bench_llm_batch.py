@@ -0,0 +1,106 @@
+"""
+Playlist-name throughput: one prompt per request vs micro-batched prompts.
+
+Runs the mock Ollama server in-process and fires concurrent
+generate_playlist_name calls with distinct genres at an assistant with
+batching off, then at one with batching on. The memoization cache is
+disabled so every call reaches the LLM. Reports throughput, latency,
+the number of /api/generate calls Ollama served and how many names fell
+back to the canned generator.
+
+Usage (from backend/):
+    python benchmarks/bench_llm_batch.py [--requests 64] [--concurrency 1,8,32]
+        [--batch-size 8] [--window 0.02] [--ollama-latency-ms 200]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import mock_server
+from load_test import free_port, percentile, start_server
+
+GENRES = ["rock", "pop", "jazz", "techno", "house", "folk", "metal", "soul", "blues", "ambient",
+          "punk", "disco", "reggae", "funk", "trap", "indie"]
+MOODS = [None, "chill", "energetic", "melancholic"]
+
+def request_args(i: int):
+    genres = [GENRES[(i + k * 3) % len(GENRES)] for k in range(3)]
+    return genres, MOODS[i % len(MOODS)] if i % 5 else f"mood {i}"
+
+async def run_level(assistant, concurrency: int, total: int):
+    latencies = []
+    fallbacks = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal fallbacks
+        for i in counter:
+            genres, mood = request_args(i)
+            start = time.perf_counter()
+            name = await assistant.generate_playlist_name(genres, mood)
+            latencies.append(time.perf_counter() - start)
+            if not name.startswith("Midnight"):
+                fallbacks += 1
+
+    calls_before = mock_server.request_counts.get("POST /api/generate", 0)
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput": total / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "ollama_calls": mock_server.request_counts.get("POST /api/generate", 0) - calls_before,
+        "fallbacks": fallbacks
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Playlist-name throughput with and without micro-batching")
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--window", type=float, default=0.02)
+    parser.add_argument("--ollama-latency-ms", type=float, default=200.0)
+    parser.add_argument("--ollama-tokens-per-sec", type=float, default=80.0)
+    args = parser.parse_args()
+
+    mock_server.config.ollama_latency_ms = args.ollama_latency_ms
+    mock_server.config.ollama_tokens_per_sec = args.ollama_tokens_per_sec
+    port = free_port()
+    start_server(mock_server.app, port)
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{port}"
+
+    import ai
+
+    def assistant(batched: bool):
+        instance = ai.SpotifyAIAssistant()
+        instance.cache = None
+        instance.name_batcher = (ai.LLMBatcher(instance._run_name_batch, max_size=args.batch_size,
+                                               window=args.window) if batched else None)
+        return instance
+
+    if ai.load_llm_class() is None:
+        print("langchain-ollama is not installed; every call would use the fallback")
+        return
+
+    levels = [int(level) for level in args.concurrency.split(",") if level]
+    print(f"{args.requests} requests per level, batch size {args.batch_size}, window {args.window}s, "
+          f"Ollama latency {args.ollama_latency_ms:.0f} ms")
+    print(f"{'mode':<10} {'conc':>5} {'names/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'ollama':>7} {'fallback':>9}")
+    for level in levels:
+        for mode in ("one-by-one", "batched"):
+            instance = assistant(mode == "batched")
+            result = asyncio.run(run_level(instance, level, args.requests))
+            print(f"{mode:<10} {level:>5} {result['throughput']:>9.1f} {result['p50_ms']:>9.1f} "
+                  f"{result['p95_ms']:>9.1f} {result['ollama_calls']:>7} {result['fallbacks']:>9}")
+
+if __name__ == "__main__":
+    main()
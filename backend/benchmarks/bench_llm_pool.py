@@ -0,0 +1,156 @@
+"""
+Ollama backend pool: throughput over several fake Ollama servers and
+behaviour when one of them dies.
+
+Starts one mock_server.py process per backend, each serving a limited
+number of generations at once (--parallel) with its own latency. Then:
+
+1. Runs concurrent analyze_mood calls against the first backend only and
+   against the whole pool, printing throughput and how the pool spread
+   requests (least outstanding requests, ties to lower latency).
+2. With --kill, stops one backend while the pool is under load, shows it
+   being ejected, restarts it and shows a health check re-admitting it.
+
+The memoization cache, batcher and circuit breaker are disabled so every
+call reaches a backend.
+
+Usage (from backend/):
+    python benchmarks/bench_llm_pool.py [--latencies 200,200,400] [--parallel 2]
+        [--requests 60] [--concurrency 12] [--kill]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BACKEND_DIR / "benchmarks"))
+
+import http_client
+from load_test import free_port
+
+TOP_TRACKS = [{"name": f"Track {i}"} for i in range(10)]
+TOP_ARTISTS = [{"name": f"Artist {i}", "genres": ["pop", f"genre {i}"]} for i in range(10)]
+
+def start_mock(port: int, latency_ms: float, parallel: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "benchmarks/mock_server.py", "--port", str(port),
+         "--ollama-latency-ms", str(latency_ms), "--ollama-parallel", str(parallel)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/tags", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError(f"mock Ollama on port {port} did not start")
+
+def make_assistant(ai, urls):
+    assistant = ai.SpotifyAIAssistant()
+    assistant.base_urls = urls
+    assistant.limiter = ai.LLMLimiter(max_concurrency=ai.LLM_MAX_CONCURRENCY * len(urls), max_queue=10000,
+                                      queue_timeout=600)
+    assistant.cache = None
+    assistant.name_batcher = None
+    assistant.breaker = None
+    assistant.budgets = {method: None for method in assistant.budgets}
+    return assistant
+
+async def drive(assistant, total: int, concurrency: int):
+    counter = iter(range(total))
+    fallbacks = 0
+
+    async def worker():
+        nonlocal fallbacks
+        for _ in counter:
+            mood = await assistant.analyze_mood(TOP_TRACKS, TOP_ARTISTS)
+            if not mood.startswith("word"):
+                fallbacks += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return total / (time.perf_counter() - start), fallbacks
+
+def print_backends(pool):
+    print(f"  {'backend':<24} {'healthy':>8} {'requests':>9} {'failures':>9} {'ejections':>10} "
+          f"{'ewma ms':>8} {'p95 ms':>8}")
+    for backend in pool.stats()["backends"]:
+        print(f"  {backend['url']:<24} {str(backend['healthy']):>8} {backend['requests']:>9} "
+              f"{backend['failures']:>9} {backend['ejections']:>10} {backend['ewma_ms'] or 0:>8.1f} "
+              f"{backend['p95_ms'] or 0:>8.1f}")
+
+async def kill_and_recover(ai, urls, processes, ports, args):
+    # Health checks use the shared HTTP client; start fresh on this event loop
+    http_client.set_client(None)
+    assistant = make_assistant(ai, urls)
+    await assistant.get_llm()
+    pool = assistant.pool
+    pool.health_interval = 0.5
+
+    victim = len(processes) - 1
+    load = asyncio.ensure_future(drive(assistant, args.requests, args.concurrency))
+    await asyncio.sleep(0.3)
+    processes[victim].terminate()
+    processes[victim].wait()
+    rps, fallbacks = await load
+    print(f"\nbackend {urls[victim]} stopped under load: {rps:.1f} req/s, {fallbacks} fallbacks, "
+          f"{pool.counters['retries']} retried on another backend")
+    print_backends(pool)
+
+    processes[victim] = start_mock(ports[victim], args.latencies[victim], args.parallel)
+    await asyncio.sleep(pool.health_interval * 2)
+    await drive(assistant, args.requests, args.concurrency)
+    print(f"\nbackend restarted, readmissions: {pool.counters['readmissions']}")
+    print_backends(pool)
+    await assistant.close()
+    await http_client.close_client()
+
+def main():
+    parser = argparse.ArgumentParser(description="Ollama backend pool over several fake servers")
+    parser.add_argument("--latencies", default="200,200,400", help="Per-backend model latency in ms")
+    parser.add_argument("--parallel", type=int, default=2, help="Generations each backend serves at once")
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=12)
+    parser.add_argument("--kill", action="store_true", help="Stop and restart a backend under load")
+    args = parser.parse_args()
+    args.latencies = [float(ms) for ms in args.latencies.split(",") if ms]
+
+    ports = [free_port() for _ in args.latencies]
+    urls = [f"http://127.0.0.1:{port}" for port in ports]
+    processes = [start_mock(port, ms, args.parallel) for port, ms in zip(ports, args.latencies)]
+    os.environ["OLLAMA_BASE_URLS"] = ",".join(urls)
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", str(args.parallel))
+
+    import ai
+
+    try:
+        if ai.load_llm_class() is None:
+            print("langchain-ollama is not installed; every call would use the fallback")
+            return
+
+        print(f"{args.requests} analyze_mood calls at concurrency {args.concurrency}, "
+              f"{args.parallel} generations per backend at once")
+        for label, subset in (("single backend", urls[:1]), (f"pool of {len(urls)}", urls)):
+            assistant = make_assistant(ai, subset)
+            rps, fallbacks = asyncio.run(drive(assistant, args.requests, args.concurrency))
+            print(f"\n{label}: {rps:.1f} req/s, {fallbacks} fallbacks")
+            print_backends(assistant.pool)
+
+        if args.kill:
+            asyncio.run(kill_and_recover(ai, urls, processes, ports, args))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Startup benchmark: import time of main.py and time to first request.
+
+Each measurement runs in a fresh interpreter so module caches from earlier
+runs do not hide import costs. "import main" times the module import alone.
+"first request" spawns uvicorn and polls /health, timing from process
+start to the first 200. "langchain_ollama" times the LLM stack import on its
+own, which main.py no longer pays at import time.
+
+Usage (from backend/):
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def env() -> dict:
+    scratch = tempfile.mkdtemp(prefix="spotifai-startup-")
+    return dict(os.environ, DATABASE_FILE=os.path.join(scratch, "startup.db"))
+
+def time_import(module: str) -> float:
+    """Seconds to import a module in a fresh interpreter."""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env(),
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+def time_first_request(timeout: float = 60) -> float:
+    """Seconds from spawning uvicorn until /health answers 200."""
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError("backend did not answer /health in time")
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time to first request")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    measurements = {
+        "import main": lambda: time_import("main"),
+        "first request": time_first_request,
+        "langchain_ollama": lambda: time_import("langchain_ollama"),
+    }
+
+    print(f"{'measurement':<18} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for name, measure in measurements.items():
+        try:
+            samples = [measure() for _ in range(args.runs)]
+        except subprocess.CalledProcessError:
+            print(f"{name:<18} {'n/a':>10}")
+            continue
+        print(f"{name:<18} {statistics.median(samples) * 1000:>10.1f} "
+              f"{min(samples) * 1000:>8.1f} {max(samples) * 1000:>8.1f}")
+
+if __name__ == "__main__":
+    main()
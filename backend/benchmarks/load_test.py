@@ -0,0 +1,224 @@
+"""
+End-to-end load test for every FastAPI route in main.py.
+
+Starts the mock Spotify/Ollama server and the real backend (both under
+uvicorn, in background threads), seeds users into a throwaway SQLite file,
+then drives each route at the requested concurrency levels and reports
+throughput, p50/p95/p99 latency and p50/p95 time to first byte. TTFB is
+what the /stream routes improve: compare /ai/mood with /ai/mood/stream.
+
+Usage (from backend/):
+    python benchmarks/load_test.py --concurrency 1,8,32 --requests 200
+    python benchmarks/load_test.py --routes /user/profile,/ai/mood --json results.json
+    python benchmarks/load_test.py --routes /ai/summary,/ai/summary/stream --concurrency 1,4
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import httpx
+import uvicorn
+
+import mock_server
+
+USERS = 20
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(app, port: int) -> uvicorn.Server:
+    """Run an ASGI app under uvicorn in a daemon thread."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError(f"server on port {port} did not start")
+        time.sleep(0.02)
+    return server
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def seed_users(db) -> None:
+    db.init_db()
+    for i in range(USERS):
+        db.create_or_update_user({
+            "id": f"load-user-{i}",
+            "spotify_id": f"load-user-{i}",
+            "access_token": f"mock-token-{i}",
+            "refresh_token": f"mock-refresh-{i}",
+            "token_expires_at": time.time() + 3600,
+            "display_name": f"Load User {i}",
+            "email": f"load{i}@example.com",
+            "followers": 0,
+            "profile_url": "",
+            "image_url": None,
+            "plan_type": "premium"
+        })
+
+RouteSpec = Tuple[str, str, Callable[[int], str], Optional[Callable[[int], Any]]]
+
+def routes() -> List[RouteSpec]:
+    """(name, method, path(i), json body(i)) for every route in main.py."""
+    user = lambda i: f"load-user-{i % USERS}"
+    ai_body = lambda prompt: (lambda i: {"user_id": user(i), "prompt": prompt, "context": {"mood": "chill"}})
+    return [
+        ("/health", "GET", lambda i: "/health", None),
+        ("/auth/login", "GET", lambda i: "/auth/login", None),
+        ("/auth/callback", "GET", None, None),  # needs a fresh state, see run_request
+        ("/auth/refresh", "POST", lambda i: "/auth/refresh", lambda i: {"refresh_token": f"mock-refresh-{i}"}),
+        ("/user/profile", "GET", lambda i: f"/user/profile?user_id={user(i)}", None),
+        ("/user/profile?refresh", "GET", lambda i: f"/user/profile?user_id={user(i)}&refresh=true", None),
+        ("/playlists", "GET", lambda i: f"/playlists?user_id={user(i)}", None),
+        ("/playlists/create", "POST", lambda i: f"/playlists/create?user_id={user(i)}",
+         lambda i: {"name": f"Load {i}", "description": "load test", "public": False}),
+        ("/playlists/{id}/tracks", "GET", lambda i: f"/playlists/pl{i % 10}/tracks?user_id={user(i)}", None),
+        ("/playlists/{id}/add-tracks", "POST", lambda i: f"/playlists/load-pl{i}/add-tracks?user_id={user(i)}",
+         lambda i: {"track_uris": [f"spotify:track:track{n}" for n in range(250)]}),
+        ("/blend", "POST", lambda i: "/blend", lambda i: {"user_id1": user(i), "user_id2": user(i + 1)}),
+        ("/ai/playlist", "POST", lambda i: "/ai/playlist", ai_body("focus playlist")),
+        ("/ai/mood", "POST", lambda i: "/ai/mood", ai_body("")),
+        ("/ai/fix", "POST", lambda i: "/ai/fix", lambda i: {"user_id": user(i), "prompt": f"Playlist {i % 10}"}),
+        ("/ai/summary", "POST", lambda i: "/ai/summary", ai_body("")),
+        ("/ai/mood/stream", "POST", lambda i: "/ai/mood/stream", ai_body("")),
+        ("/ai/fix/stream", "POST", lambda i: "/ai/fix/stream",
+         lambda i: {"user_id": user(i), "prompt": f"Playlist {i % 10}"}),
+        ("/ai/summary/stream", "POST", lambda i: "/ai/summary/stream", ai_body("")),
+    ]
+
+async def run_request(client: httpx.AsyncClient, spec: RouteSpec, i: int) -> Tuple[float, float, bool]:
+    """Issue one request; returns (latency seconds, time to first byte seconds, ok)."""
+    name, method, path, body = spec
+    if name == "/auth/callback":
+        login = (await client.get("/auth/login")).json()
+        path = lambda _: f"/auth/callback?code=load{i}&state={login['state']}"
+
+    start = time.perf_counter()
+    ttfb = None
+    async with client.stream(method, path(i), json=body(i) if body else None) as response:
+        async for _ in response.aiter_raw():
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+    latency = time.perf_counter() - start
+    return latency, latency if ttfb is None else ttfb, response.status_code < 400
+
+async def run_level(client: httpx.AsyncClient, spec: RouteSpec, concurrency: int, total: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    ttfbs: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            try:
+                latency, ttfb, ok = await run_request(client, spec, i)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(latency)
+            ttfbs.append(ttfb)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "route": spec[0],
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "ttfb_p50_ms": round(percentile(ttfbs, 50) * 1000, 2),
+        "ttfb_p95_ms": round(percentile(ttfbs, 95) * 1000, 2)
+    }
+
+async def run(base_url: str, levels: List[int], total: int, selected: Optional[List[str]]) -> List[Dict[str, Any]]:
+    results = []
+    limits = httpx.Limits(max_connections=max(levels) * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        print(f"{'route':<28} {'conc':>5} {'reqs':>6} {'err':>5} {'rps':>9} "
+              f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ttfb p50':>9} {'ttfb p95':>9}")
+        for spec in routes():
+            if selected and spec[0] not in selected:
+                continue
+            for level in levels:
+                result = await run_level(client, spec, level, total)
+                results.append(result)
+                print(f"{result['route']:<28} {level:>5} {total:>6} {result['errors']:>5} "
+                      f"{result['throughput_rps']:>9.1f} {result['p50_ms']:>9.1f} "
+                      f"{result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} "
+                      f"{result['ttfb_p50_ms']:>9.1f} {result['ttfb_p95_ms']:>9.1f}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test every backend route against the mock server")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per route per level")
+    parser.add_argument("--routes", default="", help="Comma-separated subset of routes to run")
+    parser.add_argument("--latency-ms", type=float, default=mock_server.config.latency_ms)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--ollama-latency-ms", type=float, default=mock_server.config.ollama_latency_ms)
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args()
+
+    mock_server.config.latency_ms = args.latency_ms
+    mock_server.config.rate_limit_rate = args.rate_limit_rate
+    mock_server.config.ollama_latency_ms = args.ollama_latency_ms
+
+    mock_port = free_port()
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    db_dir = tempfile.mkdtemp(prefix="spotifai-load-")
+
+    # Must be set before the backend modules are imported
+    os.environ["SPOTIFY_API_BASE"] = f"{mock_url}/v1"
+    os.environ["SPOTIFY_TOKEN_URL"] = f"{mock_url}/api/token"
+    os.environ["OLLAMA_BASE_URL"] = mock_url
+    os.environ["DATABASE_FILE"] = os.path.join(db_dir, "load.db")
+    os.environ.setdefault("SPOTIFY_RATE_LIMIT_RPS", "100000")
+    os.environ.setdefault("SPOTIFY_RATE_LIMIT_BURST", "100000")
+
+    import db
+    import main as backend
+
+    seed_users(db)
+    start_server(mock_server.app, mock_port)
+    backend_port = free_port()
+    start_server(backend.app, backend_port)
+
+    levels = [int(level) for level in args.concurrency.split(",") if level]
+    selected = [route for route in args.routes.split(",") if route] or None
+    results = asyncio.run(run(f"http://127.0.0.1:{backend_port}", levels, args.requests, selected))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"mock_latency_ms": args.latency_ms, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
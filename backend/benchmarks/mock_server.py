@@ -0,0 +1,404 @@
+"""
+Local stand-in for the Spotify Web API, the Spotify token endpoint and Ollama.
+
+Serves deterministic, realistically shaped payloads so the backend can be
+benchmarked without real credentials. Latency, page-size caps and 429
+injection are configurable.
+
+Point the backend at it with:
+    SPOTIFY_API_BASE=http://127.0.0.1:8900/v1
+    SPOTIFY_TOKEN_URL=http://127.0.0.1:8900/api/token
+    OLLAMA_BASE_URL=http://127.0.0.1:8900
+
+Usage (from backend/):
+    python benchmarks/mock_server.py --port 8900 --latency-ms 80 --rate-limit-rate 0.01
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+class MockConfig:
+    """Knobs for the mock server; mutate before serving or between runs."""
+
+    def __init__(self):
+        self.latency_ms = 50.0
+        self.jitter_ms = 10.0
+        self.playlist_count = 120
+        self.playlist_tracks = 1000
+        self.playlists_page_cap = 50
+        self.tracks_page_cap = 100
+        self.rate_limit_rate = 0.0
+        self.retry_after = 1
+        self.ollama_latency_ms = 200.0
+        self.ollama_tokens_per_sec = 80.0
+        self.ollama_failure_rate = 0.0
+        # Generations one mock Ollama runs at once (0 = unlimited), like
+        # OLLAMA_NUM_PARALLEL on a real server
+        self.ollama_parallel = 0
+
+config = MockConfig()
+
+# Counters per route, handy for asserting call counts in benchmarks
+request_counts: Dict[str, int] = {}
+added_tracks: Dict[str, List[str]] = {}
+
+app = FastAPI(title="Mock Spotify + Ollama")
+
+async def _simulate(route: str) -> Optional[Response]:
+    """Apply latency and maybe answer 429 instead of the real payload."""
+    request_counts[route] = request_counts.get(route, 0) + 1
+    delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+    await asyncio.sleep(max(0.0, delay) / 1000)
+    if config.rate_limit_rate and random.random() < config.rate_limit_rate:
+        return JSONResponse(
+            {"error": {"status": 429, "message": "API rate limit exceeded"}},
+            status_code=429,
+            headers={"Retry-After": str(config.retry_after)}
+        )
+    return None
+
+def _etag_response(request: Request, payload: Any) -> Response:
+    """Serve JSON with an ETag and honor If-None-Match like Spotify does."""
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.md5(body).hexdigest() + '"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+def _page_url(request: Request, offset: int, limit: int, total: int) -> Optional[str]:
+    if offset + limit >= total:
+        return None
+    return str(request.url.include_query_params(offset=offset + limit, limit=limit))
+
+def _artist(i: int) -> Dict[str, Any]:
+    genres = ["indie pop", "synthwave", "lo-fi", "alt rock", "jazz rap", "dream pop", "house"]
+    return {
+        "id": f"artist{i}",
+        "name": f"Artist {i}",
+        "type": "artist",
+        "uri": f"spotify:artist:artist{i}",
+        "genres": [genres[i % len(genres)], genres[(i * 3 + 1) % len(genres)]],
+        "popularity": 40 + i % 60,
+        "followers": {"href": None, "total": 1000 * (i + 1)},
+        "images": [{"url": f"https://i.scdn.co/image/{i}", "height": 640, "width": 640}],
+        "external_urls": {"spotify": f"https://open.spotify.com/artist/artist{i}"}
+    }
+
+def _track(i: int) -> Dict[str, Any]:
+    return {
+        "id": f"track{i}",
+        "name": f"Track {i}",
+        "type": "track",
+        "uri": f"spotify:track:track{i}",
+        "popularity": 30 + i % 70,
+        "duration_ms": 180000 + i % 60000,
+        "explicit": False,
+        "artists": [{"id": f"artist{i % 97}", "name": f"Artist {i % 97}", "uri": f"spotify:artist:artist{i % 97}"}],
+        "album": {
+            "id": f"album{i // 10}",
+            "name": f"Album {i // 10}",
+            "images": [{"url": f"https://i.scdn.co/image/a{i // 10}", "height": 640, "width": 640}] * 3,
+            "available_markets": ["US", "GB", "DE", "FR", "SE", "BR", "JP", "AU"] * 20
+        },
+        "available_markets": ["US", "GB", "DE", "FR", "SE", "BR", "JP", "AU"] * 20,
+        "external_urls": {"spotify": f"https://open.spotify.com/track/track{i}"}
+    }
+
+def _project_playlist_item(item: Dict[str, Any], fields: Optional[str]) -> Dict[str, Any]:
+    """Crude support for the fields filters used by the backend."""
+    if not fields or "items(track(" not in fields:
+        return item
+    track = item["track"]
+    if fields.startswith("items(track(uri))"):
+        return {"track": {"uri": track["uri"]}}
+    return {"track": {
+        "id": track["id"],
+        "name": track["name"],
+        "uri": track["uri"],
+        "artists": [{"name": a["name"]} for a in track["artists"]]
+    }}
+
+# ============================================================================
+# SPOTIFY ACCOUNTS
+# ============================================================================
+
+@app.post("/api/token")
+async def token(request: Request):
+    limited = await _simulate("POST /api/token")
+    if limited:
+        return limited
+    # Parsed by hand so the mock does not need python-multipart
+    form = {k: v[0] for k, v in parse_qs((await request.body()).decode("utf-8")).items()}
+    payload = {
+        "access_token": "mock-access-" + hashlib.sha1(str(time.time()).encode()).hexdigest()[:12],
+        "token_type": "Bearer",
+        "expires_in": 3600,
+        "scope": "user-read-private user-top-read"
+    }
+    if form.get("grant_type") == "authorization_code":
+        payload["refresh_token"] = "mock-refresh-" + str(form.get("code", "x"))
+    return payload
+
+# ============================================================================
+# SPOTIFY WEB API
+# ============================================================================
+
+@app.get("/v1/me")
+async def me(request: Request):
+    limited = await _simulate("GET /v1/me")
+    if limited:
+        return limited
+    token = request.headers.get("authorization", "anon")
+    user_id = "mock-" + hashlib.sha1(token.encode()).hexdigest()[:8]
+    return _etag_response(request, {
+        "id": user_id,
+        "display_name": f"Mock User {user_id[-4:]}",
+        "email": f"{user_id}@example.com",
+        "followers": {"href": None, "total": 42},
+        "external_urls": {"spotify": f"https://open.spotify.com/user/{user_id}"},
+        "images": [{"url": "https://i.scdn.co/image/me", "height": 300, "width": 300}],
+        "product": "premium"
+    })
+
+@app.get("/v1/me/top/{kind}")
+async def top(kind: str, request: Request, limit: int = 20, offset: int = 0, time_range: str = "medium_term"):
+    limited = await _simulate(f"GET /v1/me/top/{kind}")
+    if limited:
+        return limited
+    limit = min(limit, 50)
+    total = 50
+    make = _artist if kind == "artists" else _track
+    items = [make(i) for i in range(offset, min(offset + limit, total))]
+    return _etag_response(request, {
+        "items": items, "total": total, "limit": limit, "offset": offset,
+        "next": _page_url(request, offset, limit, total), "previous": None
+    })
+
+@app.get("/v1/me/playlists")
+async def my_playlists(request: Request, limit: int = 20, offset: int = 0):
+    limited = await _simulate("GET /v1/me/playlists")
+    if limited:
+        return limited
+    limit = min(limit, config.playlists_page_cap)
+    total = config.playlist_count
+    items = [{
+        "id": f"pl{i}",
+        "name": f"Playlist {i}",
+        "description": f"Mock playlist number {i}",
+        "public": i % 2 == 0,
+        "uri": f"spotify:playlist:pl{i}",
+        "tracks": {"href": "", "total": config.playlist_tracks},
+        "images": [{"url": f"https://i.scdn.co/image/pl{i}"}]
+    } for i in range(offset, min(offset + limit, total))]
+    return _etag_response(request, {
+        "items": items, "total": total, "limit": limit, "offset": offset,
+        "next": _page_url(request, offset, limit, total), "previous": None
+    })
+
+@app.get("/v1/playlists/{playlist_id}")
+async def playlist(playlist_id: str, request: Request):
+    limited = await _simulate("GET /v1/playlists/{id}")
+    if limited:
+        return limited
+    total = len(added_tracks[playlist_id]) if playlist_id in added_tracks else config.playlist_tracks
+    return _etag_response(request, {
+        "id": playlist_id,
+        "name": f"Playlist {playlist_id}",
+        "tracks": {"total": total}
+    })
+
+@app.get("/v1/playlists/{playlist_id}/tracks")
+async def playlist_tracks(playlist_id: str, request: Request, limit: int = 100, offset: int = 0,
+                          fields: Optional[str] = None):
+    limited = await _simulate("GET /v1/playlists/{id}/tracks")
+    if limited:
+        return limited
+    limit = min(limit, config.tracks_page_cap)
+    # Playlists created or written to through the mock hold real URIs;
+    # everything else is a generated playlist of playlist_tracks tracks
+    stored = added_tracks.get(playlist_id)
+    total = len(stored) if stored is not None else config.playlist_tracks
+
+    def track_at(i: int) -> Dict[str, Any]:
+        if stored is None:
+            return _track(i)
+        return {**_track(i), "id": stored[i].rsplit(":", 1)[-1], "uri": stored[i]}
+
+    items = [
+        _project_playlist_item({"added_at": "2024-01-01T00:00:00Z", "track": track_at(i)}, fields)
+        for i in range(offset, min(offset + limit, total))
+    ]
+    return _etag_response(request, {
+        "items": items, "total": total, "limit": limit, "offset": offset,
+        "next": _page_url(request, offset, limit, total), "previous": None
+    })
+
+@app.post("/v1/users/{user_id}/playlists")
+async def create_playlist(user_id: str, request: Request):
+    limited = await _simulate("POST /v1/users/{id}/playlists")
+    if limited:
+        return limited
+    body = await request.json()
+    playlist_id = "new" + hashlib.sha1(f"{user_id}{time.time()}{random.random()}".encode()).hexdigest()[:10]
+    added_tracks[playlist_id] = []
+    return JSONResponse({
+        "id": playlist_id,
+        "name": body.get("name", ""),
+        "description": body.get("description", ""),
+        "public": body.get("public", False),
+        "uri": f"spotify:playlist:{playlist_id}"
+    }, status_code=201)
+
+@app.post("/v1/playlists/{playlist_id}/tracks")
+async def add_tracks(playlist_id: str, request: Request):
+    limited = await _simulate("POST /v1/playlists/{id}/tracks")
+    if limited:
+        return limited
+    body = await request.json()
+    uris = body.get("uris", [])
+    if len(uris) > 100:
+        return JSONResponse({"error": {"status": 400, "message": "Too many ids"}}, status_code=400)
+    existing = added_tracks.setdefault(playlist_id, [])
+    position = body.get("position")
+    if position is None:
+        existing.extend(uris)
+    elif position > len(existing):
+        return JSONResponse({"error": {"status": 400, "message": "Index out of bounds"}}, status_code=400)
+    else:
+        existing[position:position] = uris
+    return JSONResponse({"snapshot_id": hashlib.sha1(str(len(existing)).encode()).hexdigest()}, status_code=201)
+
+@app.get("/v1/recommendations")
+async def recommendations(request: Request, limit: int = 20):
+    limited = await _simulate("GET /v1/recommendations")
+    if limited:
+        return limited
+    limit = min(limit, 100)
+    return {"tracks": [_track(1000 + i) for i in range(limit)], "seeds": []}
+
+# ============================================================================
+# OLLAMA
+# ============================================================================
+
+def _ollama_words(prompt: str) -> List[str]:
+    digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+    items = re.findall(r"^(\d+)\. Genres:(.*)$", prompt, re.MULTILINE)
+    if items:
+        # Multi-item playlist-name prompt: one numbered name per item
+        words = []
+        for number, item in items:
+            item_digest = hashlib.sha1(item.encode("utf-8")).hexdigest()
+            words += [f"{number}. ", "Midnight ", "Neon ", item_digest[:4].title() + "\n"]
+        return words
+    if "playlist name" in prompt.lower():
+        return ["Midnight ", "Neon ", digest[:4].title()]
+    return [f"word{int(digest[i:i + 2], 16)} " for i in range(0, 40, 2)]
+
+_ollama_semaphore: Optional[asyncio.Semaphore] = None
+
+def _ollama_capacity() -> Optional[asyncio.Semaphore]:
+    global _ollama_semaphore
+    if not config.ollama_parallel:
+        return None
+    if _ollama_semaphore is None:
+        _ollama_semaphore = asyncio.Semaphore(config.ollama_parallel)
+    return _ollama_semaphore
+
+@app.get("/api/tags")
+async def ollama_tags():
+    return {"models": [{"name": "llama3.2:latest", "model": "llama3.2:latest"}]}
+
+@app.post("/api/generate")
+async def ollama_generate(request: Request):
+    request_counts["POST /api/generate"] = request_counts.get("POST /api/generate", 0) + 1
+    body = await request.json()
+    prompt = body.get("prompt", "")
+    model = body.get("model", "llama3.2")
+    words = _ollama_words(prompt)
+    num_predict = (body.get("options") or {}).get("num_predict")
+    if num_predict and num_predict > 0:
+        words = words[:num_predict]
+
+    if config.ollama_failure_rate and random.random() < config.ollama_failure_rate:
+        return JSONResponse({"error": "model overloaded"}, status_code=503)
+
+    token_delay = 1 / config.ollama_tokens_per_sec if config.ollama_tokens_per_sec else 0
+
+    def chunk(text: str, done: bool) -> str:
+        payload = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                   "response": text, "done": done}
+        if done:
+            payload.update({"done_reason": "stop", "prompt_eval_count": len(prompt.split()),
+                            "eval_count": len(words), "total_duration": 0})
+        return json.dumps(payload) + "\n"
+
+    # The slot is held for the whole generation, including a streamed body
+    capacity = _ollama_capacity()
+    if capacity is not None:
+        await capacity.acquire()
+
+    def release():
+        if capacity is not None:
+            capacity.release()
+
+    handed_over = False
+    try:
+        await asyncio.sleep(config.ollama_latency_ms / 1000)
+
+        if not body.get("stream", True):
+            await asyncio.sleep(token_delay * len(words))
+            return json.loads(chunk("".join(words), True))
+
+        async def stream():
+            try:
+                for word in words:
+                    await asyncio.sleep(token_delay)
+                    yield chunk(word, False)
+                yield chunk("", True)
+            finally:
+                release()
+
+        handed_over = True
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+    finally:
+        if not handed_over:
+            release()
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Spotify + Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=config.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=config.jitter_ms)
+    parser.add_argument("--playlist-count", type=int, default=config.playlist_count)
+    parser.add_argument("--playlist-tracks", type=int, default=config.playlist_tracks)
+    parser.add_argument("--playlists-page-cap", type=int, default=config.playlists_page_cap)
+    parser.add_argument("--tracks-page-cap", type=int, default=config.tracks_page_cap)
+    parser.add_argument("--rate-limit-rate", type=float, default=config.rate_limit_rate,
+                        help="Fraction of Spotify requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=config.retry_after)
+    parser.add_argument("--ollama-latency-ms", type=float, default=config.ollama_latency_ms)
+    parser.add_argument("--ollama-tokens-per-sec", type=float, default=config.ollama_tokens_per_sec)
+    parser.add_argument("--ollama-failure-rate", type=float, default=config.ollama_failure_rate)
+    parser.add_argument("--ollama-parallel", type=int, default=config.ollama_parallel,
+                        help="Generations served at once (0 = unlimited)")
+    args = parser.parse_args()
+
+    for name, value in vars(args).items():
+        if hasattr(config, name):
+            setattr(config, name, value)
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
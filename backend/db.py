@@ -1,15 +1,114 @@
 import sqlite3
 import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, Callable
 
-DATABASE_FILE = "spotify_ai.db"
+from user_cache import user_cache, USER_CACHE_INVALIDATION, PROCESS_ID
+
+DATABASE_FILE = os.getenv("DATABASE_FILE", "spotify_ai.db")
+
+# Connection tuning
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000"))
+SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "128"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# user_stats retention: besides each user's latest row, keep one row per day
+# for this many days and one row per week for this many weeks
+STATS_RETENTION_DAYS = int(os.getenv("STATS_RETENTION_DAYS", "7"))
+STATS_RETENTION_WEEKS = int(os.getenv("STATS_RETENTION_WEEKS", "12"))
+# Rows deleted per transaction, so compaction never holds the write lock long
+STATS_COMPACT_BATCH_SIZE = int(os.getenv("STATS_COMPACT_BATCH_SIZE", "5000"))
+# Users whose snapshots are ranked per query, so a pass never loads the
+# whole table at once
+STATS_COMPACT_USER_BATCH = int(os.getenv("STATS_COMPACT_USER_BATCH", "500"))
+# Free pages returned to the filesystem per compaction run (0 = all); the
+# rest is released by later runs
+STATS_VACUUM_PAGES = int(os.getenv("STATS_VACUUM_PAGES", "2000"))
+
+# Write-behind: user upserts and stats snapshots are queued and committed
+# in batches by a background thread instead of one transaction per call
+DB_WRITE_BEHIND = os.getenv("DB_WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "200"))
+DB_WRITE_FLUSH_INTERVAL = float(os.getenv("DB_WRITE_FLUSH_INTERVAL", "0.05"))
+DB_WRITE_QUEUE_MAX = int(os.getenv("DB_WRITE_QUEUE_MAX", "5000"))
+# How long a writer waits for room in a full queue before giving up
+DB_WRITE_QUEUE_TIMEOUT = float(os.getenv("DB_WRITE_QUEUE_TIMEOUT", "5"))
+# Backoff between retries of a batch that hit a locked/busy database,
+# doubling up to the maximum, and how long a batch is retried before it is
+# dropped
+DB_WRITE_RETRY_BACKOFF = float(os.getenv("DB_WRITE_RETRY_BACKOFF", "0.05"))
+DB_WRITE_RETRY_MAX_BACKOFF = float(os.getenv("DB_WRITE_RETRY_MAX_BACKOFF", "2"))
+DB_WRITE_RETRY_TIMEOUT = float(os.getenv("DB_WRITE_RETRY_TIMEOUT", "30"))
+# Seconds shutdown waits for queued writes to be committed
+DB_WRITE_CLOSE_TIMEOUT = float(os.getenv("DB_WRITE_CLOSE_TIMEOUT", "10"))
+
+logger = logging.getLogger(__name__)
+
+# One long-lived connection per thread
+_local = threading.local()
+_connections: List[sqlite3.Connection] = []
+_connections_lock = threading.Lock()
+_generation = 0
+
+def _connect() -> sqlite3.Connection:
+    """Open a connection with WAL and the tuned pragmas applied."""
+    conn = sqlite3.connect(
+        DATABASE_FILE,
+        timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=SQLITE_STATEMENT_CACHE,
+        # Each connection is only used by the thread that opened it, but
+        # close_connections() may run on another thread at shutdown
+        check_same_thread=False
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Get this thread's pooled connection, opening it on first use.
+    
+    Connections are reused across calls so prepared statements stay in
+    sqlite3's statement cache and pragmas are applied once.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != DATABASE_FILE or _local.generation != _generation:
+        conn = _connect()
+        _local.conn = conn
+        _local.path = DATABASE_FILE
+        _local.generation = _generation
+        with _connections_lock:
+            _connections.append(conn)
+    return conn
+
+def close_connections():
+    """Close every pooled connection (call on shutdown)."""
+    global _generation
+    with _connections_lock:
+        _generation += 1
+        for conn in _connections:
+            conn.close()
+        _connections.clear()
 
 def init_db():
     """Initialize database with required tables."""
-    conn = sqlite3.connect(DATABASE_FILE)
+    conn = get_connection()
     cursor = conn.cursor()
     
+    # Only takes effect on a new database; existing files are converted
+    # once by _migrate_incremental_vacuum() below
+    cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS users (
         id TEXT PRIMARY KEY,
@@ -36,11 +135,19 @@ def init_db():
         top_artists TEXT,
         top_genres TEXT,
         listening_stats TEXT,
+        track_ids TEXT,
+        artist_ids TEXT,
         cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         FOREIGN KEY(user_id) REFERENCES users(id)
     )
     """)
     
+    # Snapshots written before the catalog existed only have JSON blobs
+    columns = {row["name"] for row in cursor.execute("PRAGMA table_info(user_stats)")}
+    for column in ("track_ids", "artist_ids"):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE user_stats ADD COLUMN {column} TEXT")
+    
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS playlists (
         id TEXT PRIMARY KEY,
@@ -55,106 +162,1000 @@ def init_db():
     )
     """)
     
+    # Shared catalog, keyed by Spotify ID; user_stats rows reference it
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS tracks (
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        album TEXT,
+        popularity INTEGER,
+        uri TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS artists (
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        popularity INTEGER,
+        uri TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS genres (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL
+    )
+    """)
+    
+    # Track credits keep the artist name because simplified track objects
+    # may reference artists that are not in the artists table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS track_artists (
+        track_id TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        artist_id TEXT,
+        artist_name TEXT,
+        PRIMARY KEY (track_id, position),
+        FOREIGN KEY(track_id) REFERENCES tracks(id)
+    ) WITHOUT ROWID
+    """)
+    
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS artist_genres (
+        artist_id TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        genre_id INTEGER NOT NULL,
+        PRIMARY KEY (artist_id, position),
+        FOREIGN KEY(artist_id) REFERENCES artists(id),
+        FOREIGN KEY(genre_id) REFERENCES genres(id)
+    ) WITHOUT ROWID
+    """)
+    
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_track_artists_artist_id
+    ON track_artists(artist_id)
+    """)
+    
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_artist_genres_genre_id
+    ON artist_genres(genre_id)
+    """)
+    
+    # Change feed other processes poll to evict users from their caches
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_invalidations (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        origin TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )
+    """)
+    
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_users_token_expires_at
+    ON users(token_expires_at)
+    """)
+    
+    # Latest-row lookups seek straight to a user's newest entry; the rowid
+    # is part of every index, so the lookup is answered from the index alone
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_user_stats_user_cached_at
+    ON user_stats(user_id, cached_at)
+    """)
+    
     conn.commit()
-    conn.close()
+    _migrate_incremental_vacuum(conn)
+
+def _migrate_incremental_vacuum(conn: sqlite3.Connection):
+    """
+    Switch a database created without incremental auto-vacuum over to it.
+    
+    The switch needs one full VACUUM, which rewrites the whole file, so it
+    runs once here at startup, before any traffic, instead of on the
+    compaction path. Afterwards vacuum_free_pages() only releases free
+    pages incrementally.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return
+    logger.info("Converting %s to incremental auto-vacuum (one-off VACUUM)", DATABASE_FILE)
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+
+def _user_changes(since: Optional[int]) -> Tuple[int, List[str]]:
+    """Newest user_invalidations seq and users changed by other processes after since."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM user_invalidations")
+    newest = cursor.fetchone()[0]
+    if since is None or newest <= since:
+        return newest, []
+    
+    cursor.execute("""
+    SELECT DISTINCT user_id FROM user_invalidations
+    WHERE seq > ? AND seq <= ? AND origin != ?
+    """, (since, newest, PROCESS_ID))
+    return newest, [row["user_id"] for row in cursor.fetchall()]
+
+def _cached_user(lookup: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    if user_cache is None:
+        return None
+    if USER_CACHE_INVALIDATION:
+        user_cache.sync(_user_changes)
+    return lookup()
 
 def get_user(user_id: str) -> Optional[Dict[str, Any]]:
     """Get user by ID."""
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row
+    cached = _cached_user(lambda: user_cache.get(user_id))
+    if cached is not None:
+        return cached
+    
+    # Snapshot the queued upsert before reading: if its batch commits in
+    # between, the SELECT already sees it
+    pending = write_queue.pending_user(user_id)
+    
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
     result = cursor.fetchone()
-    conn.close()
     
-    return dict(result) if result else None
+    user = write_queue.overlay_user(user_id, dict(result) if result else None, pending)
+    if user is not None and user_cache is not None:
+        user_cache.add(user)
+    return user
 
 def get_user_by_spotify_id(spotify_id: str) -> Optional[Dict[str, Any]]:
     """Get user by Spotify ID."""
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row
+    cached = _cached_user(lambda: user_cache.get_by_spotify_id(spotify_id))
+    if cached is not None:
+        return cached
+    
+    pending = write_queue.pending_users()
+    for user_id, user_data in pending.items():
+        if user_data.get("spotify_id") == spotify_id:
+            return get_user(user_id)
+    
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute("SELECT * FROM users WHERE spotify_id = ?", (spotify_id,))
     result = cursor.fetchone()
-    conn.close()
     
-    return dict(result) if result else None
+    user = write_queue.overlay_user(result["id"], dict(result), pending.get(result["id"])) if result else None
+    if user is not None and user_cache is not None:
+        user_cache.add(user)
+    return user
 
-def create_or_update_user(user_data: Dict[str, Any]) -> str:
-    """Create or update user in database."""
-    conn = sqlite3.connect(DATABASE_FILE)
+def get_users_expiring_before(timestamp: float) -> List[Dict[str, Any]]:
+    """Get users with a refresh token whose access token expires before timestamp."""
+    pending = write_queue.pending_users()
+    
+    conn = get_connection()
     cursor = conn.cursor()
     
-    user_id = user_data.get("id", user_data.get("spotify_id"))
+    cursor.execute("""
+    SELECT * FROM users
+    WHERE token_expires_at IS NOT NULL AND token_expires_at < ?
+    AND refresh_token IS NOT NULL AND refresh_token != ''
+    """, (timestamp,))
+    users = {row["id"]: dict(row) for row in cursor.fetchall()}
     
+    # Queued upserts win over what is stored, whether or not they still match
+    for user_id, user_data in pending.items():
+        user = write_queue.overlay_user(user_id, users.get(user_id), user_data)
+        expires_at = user.get("token_expires_at") if user else None
+        if expires_at is not None and expires_at < timestamp and user.get("refresh_token"):
+            users[user_id] = user
+        else:
+            users.pop(user_id, None)
+    
+    return list(users.values())
+
+USER_COLUMNS = (
+    "spotify_id", "access_token", "refresh_token", "token_expires_at", "display_name",
+    "email", "followers", "profile_url", "image_url", "plan_type"
+)
+
+def _write_user(cursor: sqlite3.Cursor, user_id: str, user_data: Dict[str, Any]):
     cursor.execute("""
     INSERT OR REPLACE INTO users 
     (id, spotify_id, access_token, refresh_token, token_expires_at, 
      display_name, email, followers, profile_url, image_url, plan_type, updated_at)
     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-    """, (
-        user_id,
-        user_data.get("spotify_id"),
-        user_data.get("access_token"),
-        user_data.get("refresh_token"),
-        user_data.get("token_expires_at"),
-        user_data.get("display_name"),
-        user_data.get("email"),
-        user_data.get("followers"),
-        user_data.get("profile_url"),
-        user_data.get("image_url"),
-        user_data.get("plan_type")
-    ))
+    """, (user_id, *(user_data.get(column) for column in USER_COLUMNS)))
+    if USER_CACHE_INVALIDATION:
+        cursor.execute("""
+        INSERT INTO user_invalidations (user_id, origin, created_at) VALUES (?, ?, ?)
+        """, (user_id, PROCESS_ID, time.time()))
+
+def create_or_update_user(user_data: Dict[str, Any]) -> str:
+    """
+    Create or update user in database.
     
-    conn.commit()
-    conn.close()
+    With write-behind enabled the row is queued and committed with the next
+    batch; reads through this module see it immediately. The user cache is
+    only updated once the write is accepted.
+    """
+    user_id = user_data.get("id", user_data.get("spotify_id"))
+    try:
+        if DB_WRITE_BEHIND:
+            write_queue.submit("user", user_id, dict(user_data))
+        else:
+            conn = get_connection()
+            cursor = conn.cursor()
+            
+            # The connection is shared, so commit on success and roll back on error
+            with conn:
+                _write_user(cursor, user_id, user_data)
+    except Exception:
+        # Whatever the cache held may no longer match the database
+        if user_cache is not None:
+            user_cache.invalidate(user_id)
+        raise
     
+    if user_cache is not None:
+        user_cache.write_through(user_id, {column: user_data.get(column) for column in USER_COLUMNS})
     return user_id
 
-def cache_user_stats(user_id: str, stats: Dict[str, Any]):
-    """Cache user statistics."""
-    conn = sqlite3.connect(DATABASE_FILE)
+def _changed_rows(cursor: sqlite3.Cursor, table: str, rows: Dict[str, tuple], columns: str) -> List[tuple]:
+    """Rows that are missing from a catalog table or differ from what is stored."""
+    placeholders = ",".join("?" * len(rows))
+    cursor.execute(f"SELECT id, {columns} FROM {table} WHERE id IN ({placeholders})", list(rows))
+    stored = {row[0]: tuple(row) for row in cursor.fetchall()}
+    return [row for item_id, row in rows.items() if stored.get(item_id) != row]
+
+def _upsert_tracks(cursor: sqlite3.Cursor, tracks: List[Dict[str, Any]]):
+    """Insert new or changed catalog tracks; unchanged tracks are not rewritten."""
+    if not tracks:
+        return
+    rows = {
+        track["id"]: (track["id"], track.get("name"), track.get("album"), track.get("popularity"), track.get("uri"))
+        for track in tracks
+    }
+    changed = _changed_rows(cursor, "tracks", rows, "name, album, popularity, uri")
+    cursor.executemany("""
+    INSERT INTO tracks (id, name, album, popularity, uri)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        name = excluded.name,
+        album = excluded.album,
+        popularity = excluded.popularity,
+        uri = excluded.uri,
+        updated_at = CURRENT_TIMESTAMP
+    """, changed)
+    
+    credits = {
+        track["id"]: [
+            (artist_id, artist_name)
+            for artist_id, artist_name in zip(
+                track.get("artist_ids") or [None] * len(track.get("artists", [])),
+                track.get("artists", [])
+            )
+        ]
+        for track in tracks
+    }
+    placeholders = ",".join("?" * len(credits))
+    cursor.execute(f"""
+    SELECT track_id, artist_id, artist_name FROM track_artists
+    WHERE track_id IN ({placeholders})
+    ORDER BY track_id, position
+    """, list(credits))
+    stored: Dict[str, List[tuple]] = {}
+    for row in cursor.fetchall():
+        stored.setdefault(row["track_id"], []).append((row["artist_id"], row["artist_name"]))
+    
+    stale = [track_id for track_id, credit in credits.items() if stored.get(track_id, []) != credit]
+    cursor.executemany("DELETE FROM track_artists WHERE track_id = ?", [(track_id,) for track_id in stale])
+    cursor.executemany("""
+    INSERT INTO track_artists (track_id, position, artist_id, artist_name) VALUES (?, ?, ?, ?)
+    """, [
+        (track_id, position, artist_id, artist_name)
+        for track_id in stale
+        for position, (artist_id, artist_name) in enumerate(credits[track_id])
+    ])
+
+def _upsert_artists(cursor: sqlite3.Cursor, artists: List[Dict[str, Any]]):
+    """Insert new or changed catalog artists and their genres."""
+    if not artists:
+        return
+    rows = {
+        artist["id"]: (artist["id"], artist.get("name"), artist.get("popularity"), artist.get("uri"))
+        for artist in artists
+    }
+    changed = _changed_rows(cursor, "artists", rows, "name, popularity, uri")
+    cursor.executemany("""
+    INSERT INTO artists (id, name, popularity, uri)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        name = excluded.name,
+        popularity = excluded.popularity,
+        uri = excluded.uri,
+        updated_at = CURRENT_TIMESTAMP
+    """, changed)
+    
+    genres = {artist["id"]: list(artist.get("genres", [])) for artist in artists}
+    placeholders = ",".join("?" * len(genres))
+    cursor.execute(f"""
+    SELECT artist_genres.artist_id, genres.name FROM artist_genres
+    JOIN genres ON genres.id = artist_genres.genre_id
+    WHERE artist_genres.artist_id IN ({placeholders})
+    ORDER BY artist_genres.artist_id, artist_genres.position
+    """, list(genres))
+    stored: Dict[str, List[str]] = {}
+    for row in cursor.fetchall():
+        stored.setdefault(row["artist_id"], []).append(row["name"])
+    
+    stale = [artist_id for artist_id, names in genres.items() if stored.get(artist_id, []) != names]
+    if not stale:
+        return
+    
+    genre_names = {name for artist_id in stale for name in genres[artist_id]}
+    cursor.executemany("INSERT OR IGNORE INTO genres (name) VALUES (?)", [(name,) for name in genre_names])
+    genre_ids = {}
+    if genre_names:
+        placeholders = ",".join("?" * len(genre_names))
+        cursor.execute(f"SELECT id, name FROM genres WHERE name IN ({placeholders})", list(genre_names))
+        genre_ids = {row["name"]: row["id"] for row in cursor.fetchall()}
+    
+    cursor.executemany("DELETE FROM artist_genres WHERE artist_id = ?", [(artist_id,) for artist_id in stale])
+    cursor.executemany("""
+    INSERT OR IGNORE INTO artist_genres (artist_id, position, genre_id) VALUES (?, ?, ?)
+    """, [
+        (artist_id, position, genre_ids[name])
+        for artist_id in stale
+        for position, name in enumerate(genres[artist_id])
+    ])
+
+def upsert_catalog(tracks: List[Dict[str, Any]], artists: List[Dict[str, Any]]):
+    """
+    Add tracks and artists to the shared catalog.
+    
+    Rows that are already stored unchanged are not rewritten.
+    
+    Args:
+        tracks: Track dicts as returned by get_user_top_tracks
+        artists: Artist dicts as returned by get_user_top_artists
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    with conn:
+        _upsert_tracks(cursor, [track for track in tracks if track.get("id")])
+        _upsert_artists(cursor, [artist for artist in artists if artist.get("id")])
+
+def get_tracks(track_ids: List[str]) -> List[Dict[str, Any]]:
+    """
+    Get catalog tracks in the order of track_ids.
+    
+    Args:
+        track_ids: Spotify track IDs
+    
+    Returns:
+        Track dicts in the same shape as get_user_top_tracks; IDs missing
+        from the catalog are skipped
+    """
+    if not track_ids:
+        return []
+    conn = get_connection()
     cursor = conn.cursor()
+    unique_ids = list(dict.fromkeys(track_ids))
+    placeholders = ",".join("?" * len(unique_ids))
     
+    cursor.execute(f"SELECT * FROM tracks WHERE id IN ({placeholders})", unique_ids)
+    rows = {row["id"]: row for row in cursor.fetchall()}
+    
+    cursor.execute(f"""
+    SELECT track_id, artist_id, artist_name FROM track_artists
+    WHERE track_id IN ({placeholders})
+    ORDER BY track_id, position
+    """, unique_ids)
+    credits: Dict[str, List[sqlite3.Row]] = {}
+    for row in cursor.fetchall():
+        credits.setdefault(row["track_id"], []).append(row)
+    
+    return [
+        {
+            "id": track_id,
+            "name": rows[track_id]["name"],
+            "artists": [credit["artist_name"] for credit in credits.get(track_id, [])],
+            "artist_ids": [credit["artist_id"] for credit in credits.get(track_id, [])],
+            "album": rows[track_id]["album"],
+            "popularity": rows[track_id]["popularity"],
+            "uri": rows[track_id]["uri"]
+        }
+        for track_id in track_ids if track_id in rows
+    ]
+
+def get_artists(artist_ids: List[str]) -> List[Dict[str, Any]]:
+    """
+    Get catalog artists in the order of artist_ids.
+    
+    Args:
+        artist_ids: Spotify artist IDs
+    
+    Returns:
+        Artist dicts in the same shape as get_user_top_artists; IDs missing
+        from the catalog are skipped
+    """
+    if not artist_ids:
+        return []
+    conn = get_connection()
+    cursor = conn.cursor()
+    unique_ids = list(dict.fromkeys(artist_ids))
+    placeholders = ",".join("?" * len(unique_ids))
+    
+    cursor.execute(f"SELECT * FROM artists WHERE id IN ({placeholders})", unique_ids)
+    rows = {row["id"]: row for row in cursor.fetchall()}
+    
+    cursor.execute(f"""
+    SELECT artist_genres.artist_id, genres.name FROM artist_genres
+    JOIN genres ON genres.id = artist_genres.genre_id
+    WHERE artist_genres.artist_id IN ({placeholders})
+    ORDER BY artist_genres.artist_id, artist_genres.position
+    """, unique_ids)
+    genres: Dict[str, List[str]] = {}
+    for row in cursor.fetchall():
+        genres.setdefault(row["artist_id"], []).append(row["name"])
+    
+    return [
+        {
+            "id": artist_id,
+            "name": rows[artist_id]["name"],
+            "genres": genres.get(artist_id, []),
+            "popularity": rows[artist_id]["popularity"],
+            "uri": rows[artist_id]["uri"]
+        }
+        for artist_id in artist_ids if artist_id in rows
+    ]
+
+def get_artists_by_genre(genre: str, limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Get catalog artists tagged with a genre, most popular first.
+    
+    Args:
+        genre: Genre name
+        limit: Maximum number of artists
+    
+    Returns:
+        Artist dicts in the same shape as get_user_top_artists
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+    SELECT artists.id FROM artists
+    JOIN artist_genres ON artist_genres.artist_id = artists.id
+    JOIN genres ON genres.id = artist_genres.genre_id
+    WHERE genres.name = ?
+    ORDER BY artists.popularity DESC LIMIT ?
+    """, (genre, limit))
+    
+    return get_artists([row["id"] for row in cursor.fetchall()])
+
+def _catalog_ids(items: List[Dict[str, Any]]) -> Optional[List[str]]:
+    """IDs of catalog items, or None if any item cannot be stored in the catalog."""
+    ids = [item.get("id") for item in items]
+    return ids if all(ids) else None
+
+def _write_stats(cursor: sqlite3.Cursor, user_id: str, stats: Dict[str, Any], cached_at: Optional[str] = None):
     import json
+    top_tracks = stats.get("top_tracks", [])
+    top_artists = stats.get("top_artists", [])
+    track_ids = _catalog_ids(top_tracks)
+    artist_ids = _catalog_ids(top_artists)
+    
+    if track_ids is not None:
+        _upsert_tracks(cursor, top_tracks)
+    if artist_ids is not None:
+        _upsert_artists(cursor, top_artists)
     cursor.execute("""
-    INSERT INTO user_stats (user_id, top_tracks, top_artists, top_genres, listening_stats)
-    VALUES (?, ?, ?, ?, ?)
+    INSERT INTO user_stats
+    (user_id, top_tracks, top_artists, top_genres, listening_stats, track_ids, artist_ids, cached_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
     """, (
         user_id,
-        json.dumps(stats.get("top_tracks", [])),
-        json.dumps(stats.get("top_artists", [])),
+        None if track_ids is not None else json.dumps(top_tracks),
+        None if artist_ids is not None else json.dumps(top_artists),
         json.dumps(stats.get("top_genres", [])),
-        json.dumps(stats.get("listening_stats", {}))
+        json.dumps(stats.get("listening_stats", {})),
+        json.dumps(track_ids) if track_ids is not None else None,
+        json.dumps(artist_ids) if artist_ids is not None else None,
+        cached_at
     ))
+
+def cache_user_stats(user_id: str, stats: Dict[str, Any]):
+    """
+    Cache user statistics.
     
-    conn.commit()
-    conn.close()
+    Tracks and artists go into the shared catalog and the snapshot only
+    stores their IDs in order. Lists containing items without a Spotify ID
+    are stored inline as JSON instead. With write-behind enabled the
+    snapshot is queued and committed with the next batch.
+    """
+    if DB_WRITE_BEHIND:
+        write_queue.submit("stats", user_id, dict(stats))
+        return
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    with conn:
+        _write_stats(cursor, user_id, stats)
 
 def get_cached_stats(user_id: str) -> Optional[Dict[str, Any]]:
     """Get cached user statistics."""
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row
+    pending = write_queue.pending_stats(user_id)
+    if pending is not None:
+        return pending
+    
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute("""
     SELECT * FROM user_stats 
-    WHERE user_id = ? 
-    ORDER BY cached_at DESC LIMIT 1
+    WHERE id = (
+        SELECT id FROM user_stats
+        WHERE user_id = ?
+        ORDER BY cached_at DESC, id DESC LIMIT 1
+    )
     """, (user_id,))
     
     result = cursor.fetchone()
-    conn.close()
     
     if result:
         import json
+        if result["track_ids"] is not None:
+            top_tracks = get_tracks(json.loads(result["track_ids"]))
+        else:
+            top_tracks = json.loads(result["top_tracks"])
+        if result["artist_ids"] is not None:
+            top_artists = get_artists(json.loads(result["artist_ids"]))
+        else:
+            top_artists = json.loads(result["top_artists"])
         return {
-            "top_tracks": json.loads(result["top_tracks"]),
-            "top_artists": json.loads(result["top_artists"]),
+            "top_tracks": top_tracks,
+            "top_artists": top_artists,
             "top_genres": json.loads(result["top_genres"]),
-            "listening_stats": json.loads(result["listening_stats"])
+            "listening_stats": json.loads(result["listening_stats"]),
+            "cached_at": result["cached_at"]
         }
     
     return None
+
+def compact_user_stats_batch(after_user: str = "", now: Optional[datetime] = None) -> Tuple[Optional[str], int]:
+    """
+    Apply the user_stats retention policy to the next batch of users.
+    
+    Each user keeps their latest row, the last row of each day within
+    STATS_RETENTION_DAYS and the last row of each week within
+    STATS_RETENTION_WEEKS. The next STATS_COMPACT_USER_BATCH users after
+    after_user with more than one snapshot are ranked through the
+    (user_id, cached_at) index and their expired rows deleted,
+    STATS_COMPACT_BATCH_SIZE rows per transaction.
+    
+    Args:
+        after_user: Last user ID of the previous batch ("" to start)
+        now: Reference time for the retention windows (UTC, default now)
+    
+    Returns:
+        (last user ID of this batch, or None once every user is done;
+        rows deleted)
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    reference = (now or datetime.utcnow()).strftime("%Y-%m-%d %H:%M:%S")
+    
+    cursor.execute("""
+    SELECT user_id FROM user_stats
+    WHERE user_id > ?
+    GROUP BY user_id
+    HAVING COUNT(*) > 1
+    ORDER BY user_id
+    LIMIT ?
+    """, (after_user, STATS_COMPACT_USER_BATCH))
+    user_ids = [row[0] for row in cursor.fetchall()]
+    if not user_ids:
+        return None, 0
+    
+    placeholders = ",".join("?" * len(user_ids))
+    cursor.execute(f"""
+    SELECT id FROM (
+        SELECT id, cached_at,
+            ROW_NUMBER() OVER (
+                PARTITION BY user_id ORDER BY cached_at DESC, id DESC
+            ) AS latest_rank,
+            ROW_NUMBER() OVER (
+                PARTITION BY user_id, date(cached_at) ORDER BY cached_at DESC, id DESC
+            ) AS day_rank,
+            ROW_NUMBER() OVER (
+                PARTITION BY user_id, strftime('%Y-%W', cached_at) ORDER BY cached_at DESC, id DESC
+            ) AS week_rank
+        FROM user_stats
+        WHERE user_id IN ({placeholders})
+    )
+    WHERE latest_rank > 1
+    AND NOT (day_rank = 1 AND cached_at >= datetime(?, ?))
+    AND NOT (week_rank = 1 AND cached_at >= datetime(?, ?))
+    """, (
+        *user_ids,
+        reference, f"-{STATS_RETENTION_DAYS} days",
+        reference, f"-{STATS_RETENTION_WEEKS * 7} days"
+    ))
+    stale_ids = [row[0] for row in cursor.fetchall()]
+    
+    for start in range(0, len(stale_ids), STATS_COMPACT_BATCH_SIZE):
+        batch = stale_ids[start:start + STATS_COMPACT_BATCH_SIZE]
+        with conn:
+            cursor.execute(f"DELETE FROM user_stats WHERE id IN ({','.join('?' * len(batch))})", batch)
+    return user_ids[-1], len(stale_ids)
+
+def purge_user_invalidations() -> int:
+    """
+    Delete user_invalidations rows older than an hour.
+    
+    Returns:
+        Rows deleted
+    """
+    conn = get_connection()
+    # Processes poll the change feed every few seconds, so an hour of
+    # history is plenty
+    with conn:
+        cursor = conn.execute("DELETE FROM user_invalidations WHERE created_at < ?", (time.time() - 3600,))
+    return cursor.rowcount
+
+def vacuum_free_pages(max_pages: int = STATS_VACUUM_PAGES) -> int:
+    """
+    Return free pages to the filesystem with an incremental vacuum.
+    
+    A no-op until init_db() has switched the file to incremental mode.
+    
+    Args:
+        max_pages: Most pages to release (0 = all of them)
+    
+    Returns:
+        Pages released
+    """
+    conn = get_connection()
+    freelist_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    # executescript steps the pragma to completion; execute() stops after
+    # the first page because the pragma returns no rows
+    if max_pages > 0:
+        conn.executescript(f"PRAGMA incremental_vacuum({max_pages});")
+    else:
+        conn.executescript("PRAGMA incremental_vacuum;")
+    freelist_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return max(0, freelist_before - freelist_after)
+
+def compact_user_stats(now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Run a whole compaction pass in one call: every user batch, the
+    user_invalidations purge and one incremental vacuum.
+    
+    Blocks the calling thread for the whole pass; the app runs the steps as
+    separate jobs instead (see maintenance.StatsCompactor).
+    
+    Args:
+        now: Reference time for the retention windows (UTC, default now)
+    
+    Returns:
+        Dict with rows deleted and pages vacuumed
+    """
+    now = now or datetime.utcnow()
+    rows_deleted = 0
+    last_user: Optional[str] = ""
+    while last_user is not None:
+        last_user, deleted = compact_user_stats_batch(last_user, now)
+        rows_deleted += deleted
+    purge_user_invalidations()
+    return {
+        "rows_deleted": rows_deleted,
+        "pages_vacuumed": vacuum_free_pages()
+    }
+
+class WriteQueueFullError(Exception):
+    """Raised when the write-behind queue stays full for DB_WRITE_QUEUE_TIMEOUT."""
+
+class WriteBehindQueue:
+    """
+    Group commit for user upserts and stats snapshots.
+    
+    Writes are queued and a background thread commits them in batches of
+    up to batch_size, waiting at most interval after the first queued write.
+    Queued rows are kept in an overlay that the read functions consult, so
+    callers read their own writes before the batch is committed; catalog
+    lookups (get_tracks, get_artists) only see rows once it is. Repeated
+    upserts of the same user within a batch are written once.
+    """
+    
+    def __init__(
+        self,
+        batch_size: int = DB_WRITE_BATCH_SIZE,
+        interval: float = DB_WRITE_FLUSH_INTERVAL,
+        max_pending: int = DB_WRITE_QUEUE_MAX,
+        put_timeout: float = DB_WRITE_QUEUE_TIMEOUT
+    ):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.put_timeout = put_timeout
+        self._queue: "queue.Queue[Optional[Tuple[str, str, Dict[str, Any]]]]" = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._users: Dict[str, Dict[str, Any]] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._recent_flushes: deque = deque(maxlen=256)
+        self.counters = {
+            "queued": 0,
+            "written": 0,
+            "coalesced": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "failed_commits": 0,
+            "retries": 0,
+            "dropped": 0,
+            "rejected": 0,
+            "max_batch_size": 0,
+            "flush_seconds": 0.0,
+            "max_flush_seconds": 0.0
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth, batch sizes and flush latency."""
+        recent = sorted(seconds for seconds, _ in self._recent_flushes)
+        batches = self.counters["batches"]
+        return {
+            "enabled": DB_WRITE_BEHIND,
+            "pending": self._queue.qsize(),
+            "avg_batch_size": round(self.counters["written"] / batches, 2) if batches else 0.0,
+            "p50_flush_ms": round(recent[len(recent) // 2] * 1000, 3) if recent else 0.0,
+            "p95_flush_ms": round(recent[int(len(recent) * 0.95)] * 1000, 3) if recent else 0.0,
+            **self.counters,
+            "flush_seconds": round(self.counters["flush_seconds"], 6),
+            "max_flush_seconds": round(self.counters["max_flush_seconds"], 6)
+        }
+    
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+            self._thread.start()
+    
+    def submit(self, kind: str, key: str, payload: Dict[str, Any]):
+        """
+        Queue a write, blocking while the queue is full.
+        
+        Args:
+            kind: "user" or "stats"
+            key: User ID the write belongs to
+            payload: User data or stats dict
+        
+        Raises:
+            WriteQueueFullError: If no room frees up within put_timeout
+        """
+        overlay = self._users if kind == "user" else self._stats
+        if kind == "stats":
+            payload["cached_at"] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        
+        with self._lock:
+            self._ensure_thread()
+            previous = overlay.get(key)
+            overlay[key] = payload
+        try:
+            self._queue.put((kind, key, payload), timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                if overlay.get(key) is payload:
+                    if previous is None:
+                        del overlay[key]
+                    else:
+                        overlay[key] = previous
+            self.counters["rejected"] += 1
+            raise WriteQueueFullError("Database write queue is full")
+        self.counters["queued"] += 1
+    
+    @staticmethod
+    def overlay_user(user_id: str, stored: Optional[Dict[str, Any]],
+                     pending: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Apply a queued upsert on top of the stored row.
+        
+        ``pending`` must be taken (pending_user/pending_users) before the
+        row is read, so a batch committed in between cannot leave the read
+        with neither the queued nor the committed version.
+        """
+        if pending is None:
+            return stored
+        user = dict(stored or {})
+        user["id"] = user_id
+        user.update({column: pending.get(column) for column in USER_COLUMNS})
+        return user
+    
+    def pending_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """The latest queued upsert for user_id, if any."""
+        with self._lock:
+            return self._users.get(user_id)
+    
+    def pending_users(self) -> Dict[str, Dict[str, Any]]:
+        """Snapshot of queued user upserts by user ID."""
+        with self._lock:
+            return dict(self._users)
+    
+    def pending_stats(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """The latest queued stats snapshot for user_id, if any."""
+        with self._lock:
+            pending = self._stats.get(user_id)
+        return dict(pending) if pending is not None else None
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            
+            self._flush(batch)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                self._queue.task_done()
+                return
+    
+    def _flush(self, batch: List[Tuple[str, str, Dict[str, Any]]]):
+        # The last upsert of a user in the batch is the one that counts
+        latest_users = {key: payload for kind, key, payload in batch if kind == "user"}
+        writes = [
+            (kind, key, payload) for kind, key, payload in batch
+            if kind == "stats" or latest_users[key] is payload
+        ]
+        self.counters["coalesced"] += len(batch) - len(writes)
+        
+        start = time.perf_counter()
+        dropped = []
+        remaining = list(writes)
+        try:
+            if self._commit(remaining):
+                remaining = []
+            else:
+                logger.warning("Write-behind batch of %d rejected, retrying writes one by one", len(writes))
+                self.counters["failed_batches"] += 1
+                while remaining:
+                    write = remaining[0]
+                    if not self._commit([write]):
+                        logger.error("Dropping queued %s write for user %s", write[0], write[1])
+                        dropped.append(write)
+                    remaining.pop(0)
+        except sqlite3.Error as e:
+            logger.error("Dropping %d queued writes, the database cannot take them: %s", len(remaining), e)
+            self.counters["failed_commits"] += 1
+            dropped.extend(remaining)
+        self._drop(dropped)
+        elapsed = time.perf_counter() - start
+        
+        # Only now is every write either committed or dropped for good
+        with self._lock:
+            for kind, key, payload in batch:
+                overlay = self._users if kind == "user" else self._stats
+                if overlay.get(key) is payload:
+                    del overlay[key]
+        
+        self.counters["batches"] += 1
+        self.counters["written"] += len(writes) - len(dropped)
+        self.counters["max_batch_size"] = max(self.counters["max_batch_size"], len(writes))
+        self.counters["flush_seconds"] += elapsed
+        self.counters["max_flush_seconds"] = max(self.counters["max_flush_seconds"], elapsed)
+        self._recent_flushes.append((elapsed, len(writes)))
+    
+    def _drop(self, writes: List[Tuple[str, str, Dict[str, Any]]]):
+        self.counters["dropped"] += len(writes)
+        if user_cache is None:
+            return
+        with self._lock:
+            for kind, key, payload in writes:
+                # The cache was written through with this row; unless a newer
+                # upsert is queued, it now holds data that was never saved
+                if kind == "user" and self._users.get(key) is payload:
+                    user_cache.invalidate(key)
+    
+    def _commit(self, writes: List[Tuple[str, str, Dict[str, Any]]]) -> bool:
+        """
+        Commit writes in one transaction, retrying while the database is busy.
+        
+        Lock and busy errors (another connection holding the write lock,
+        e.g. compaction or the LLM cache) are retried with backoff for up to
+        DB_WRITE_RETRY_TIMEOUT seconds, so writes are not lost to ordinary
+        contention.
+        
+        Returns:
+            True once committed, False if the writes themselves are rejected
+            (constraint or schema errors)
+        
+        Raises:
+            sqlite3.Error: If the database stays locked past the retry
+                timeout or fails otherwise (disk full, I/O error, corruption)
+        """
+        conn = get_connection()
+        cursor = conn.cursor()
+        delay = DB_WRITE_RETRY_BACKOFF
+        deadline = time.monotonic() + DB_WRITE_RETRY_TIMEOUT
+        while True:
+            try:
+                with conn:
+                    for write in writes:
+                        self._apply(cursor, *write)
+                return True
+            except sqlite3.Error as e:
+                if _is_rejected_write(e):
+                    logger.warning("Write-behind commit of %d writes rejected: %s", len(writes), e)
+                    return False
+                if not _is_busy(e) or time.monotonic() + delay > deadline:
+                    raise
+                logger.warning("Write-behind commit failed (%s), retrying in %.2fs", e, delay)
+                self.counters["retries"] += 1
+                time.sleep(delay)
+                delay = min(delay * 2, DB_WRITE_RETRY_MAX_BACKOFF)
+    
+    @staticmethod
+    def _apply(cursor: sqlite3.Cursor, kind: str, key: str, payload: Dict[str, Any]):
+        if kind == "user":
+            _write_user(cursor, key, payload)
+        else:
+            _write_stats(cursor, key, payload, payload.get("cached_at"))
+    
+    def flush(self):
+        """Block until every queued write has been committed."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+    
+    def close(self, timeout: float = DB_WRITE_CLOSE_TIMEOUT):
+        """
+        Commit queued writes and stop the background thread (call on shutdown).
+        
+        Waits at most timeout seconds; writes still queued after that are
+        abandoned and logged.
+        """
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            thread.join(timeout)
+            if thread.is_alive():
+                with self._lock:
+                    abandoned = len(self._users) + len(self._stats)
+                logger.error("Write-behind thread did not finish within %gs; abandoning %d uncommitted writes",
+                             timeout, abandoned)
+
+def _is_busy(error: sqlite3.Error) -> bool:
+    """True if another connection holds the lock and a retry may succeed."""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+def _is_rejected_write(error: sqlite3.Error) -> bool:
+    """True if retrying cannot help: the data or the schema is at fault."""
+    if isinstance(error, (sqlite3.IntegrityError, sqlite3.InterfaceError,
+                          sqlite3.ProgrammingError, sqlite3.DataError)):
+        return True
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and (
+        message.startswith("no such") or "has no column" in message
+    )
+
+write_queue = WriteBehindQueue()
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+from typing import Any, Dict, Optional
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+HTTP_ENABLE_HTTP2 = os.getenv("HTTP_ENABLE_HTTP2", "false").lower() in ("1", "true", "yes")
+
+# HTTP/2 needs the optional h2 package (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# orjson decodes large payloads several times faster than the stdlib
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+_client: Optional[httpx.AsyncClient] = None
+
+# Per-endpoint payload counters: calls, bytes received, seconds spent decoding
+payload_stats: Dict[str, Dict[str, float]] = {}
+
+def create_client() -> httpx.AsyncClient:
+    """
+    Build an AsyncClient configured for long-lived, pooled connections.
+
+    Returns:
+        New httpx.AsyncClient with keep-alive, pool limits and timeouts applied
+    """
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+    timeout = httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=timeout,
+        http2=HTTP_ENABLE_HTTP2 and HTTP2_AVAILABLE
+    )
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Get the application-wide HTTP client.
+
+    The client is normally opened by the FastAPI lifespan hook; scripts that
+    call the Spotify helpers directly get one created on first use.
+
+    Returns:
+        Shared httpx.AsyncClient
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+def set_client(client: Optional[httpx.AsyncClient]) -> None:
+    """
+    Replace the shared client, e.g. with one using a mock transport in tests.
+
+    Args:
+        client: Client to use for all outgoing calls, or None to reset
+    """
+    global _client
+    _client = client
+
+async def open_client() -> httpx.AsyncClient:
+    """Open the shared client at application startup."""
+    return get_client()
+
+async def close_client() -> None:
+    """Close the shared client and release pooled connections."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+def loads(content: Any) -> Any:
+    """
+    Decode a JSON document, using orjson when it is installed.
+
+    Args:
+        content: bytes or str
+
+    Returns:
+        Decoded JSON value
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(content)
+    return json.loads(content)
+
+def decode_response(response: httpx.Response, endpoint: str) -> Any:
+    """
+    Decode a JSON response body and record its size and parse time.
+
+    Args:
+        response: Response with a JSON body
+        endpoint: Label the counters are recorded under
+
+    Returns:
+        Decoded JSON value
+    """
+    content = response.content
+    start = time.perf_counter()
+    data = loads(content)
+    elapsed = time.perf_counter() - start
+
+    stats = payload_stats.setdefault(endpoint, {"calls": 0, "bytes": 0, "parse_seconds": 0.0})
+    stats["calls"] += 1
+    stats["bytes"] += len(content)
+    stats["parse_seconds"] += elapsed
+    return data
+
+def get_payload_stats() -> Dict[str, Any]:
+    """Payload counters per endpoint, with averages."""
+    return {
+        "decoder": "orjson" if ORJSON_AVAILABLE else "json",
+        "endpoints": {
+            endpoint: {
+                **stats,
+                "parse_seconds": round(stats["parse_seconds"], 6),
+                "avg_bytes": int(stats["bytes"] / stats["calls"]) if stats["calls"] else 0
+            }
+            for endpoint, stats in payload_stats.items()
+        }
+    }
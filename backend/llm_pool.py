@@ -0,0 +1,544 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from http_client import get_client
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated Ollama servers to spread generations over
+OLLAMA_BASE_URLS = [
+    url.strip().rstrip("/")
+    for url in os.getenv("OLLAMA_BASE_URLS", os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")).split(",")
+    if url.strip()
+]
+# A backend is ejected after this many consecutive failed generations, or
+# this many consecutive failed health checks
+LLM_POOL_EJECT_FAILURES = int(os.getenv("LLM_POOL_EJECT_FAILURES", "3"))
+# Seconds an ejected backend sits out before it is tried again
+LLM_POOL_EJECT_SECONDS = float(os.getenv("LLM_POOL_EJECT_SECONDS", "30"))
+# How often every backend's /api/tags is polled, and how long a poll may take
+LLM_POOL_HEALTH_INTERVAL = float(os.getenv("LLM_POOL_HEALTH_INTERVAL", "10"))
+LLM_POOL_HEALTH_TIMEOUT = float(os.getenv("LLM_POOL_HEALTH_TIMEOUT", "2"))
+# Seconds a model load during warm-up may take
+LLM_POOL_WARM_TIMEOUT = float(os.getenv("LLM_POOL_WARM_TIMEOUT", "120"))
+# Seconds a generation may run before the same prompt is also sent to a
+# backend with a free slot (0 disables hedging); once a task has enough
+# history its p95 latency is used instead if that is longer
+LLM_POOL_HEDGE_AFTER = float(os.getenv("LLM_POOL_HEDGE_AFTER", "2"))
+
+class NoBackendError(Exception):
+    """Raised when the pool has no Ollama backend configured."""
+
+def _percentile_ms(ordered: List[float], pct: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))] * 1000, 1)
+
+class TaskStats:
+    """Latency and token counts of one kind of generation."""
+
+    def __init__(self, latency_window: int = 200):
+        self._latencies = deque(maxlen=latency_window)
+        self.counters = {
+            "requests": 0,
+            "failures": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "seconds": 0.0
+        }
+
+    def record(self, seconds: float, usage: Dict[str, int]):
+        self.counters["requests"] += 1
+        self.counters["seconds"] += seconds
+        self.counters["prompt_tokens"] += usage["prompt_tokens"]
+        self.counters["completion_tokens"] += usage["completion_tokens"]
+        self._latencies.append(seconds)
+
+    def record_failure(self):
+        self.counters["requests"] += 1
+        self.counters["failures"] += 1
+
+    def percentile(self, pct: float, min_samples: int = 20) -> Optional[float]:
+        """Latency percentile in seconds, or None with too little history."""
+        if len(self._latencies) < min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+    def stats(self) -> Dict[str, Any]:
+        ordered = sorted(self._latencies)
+        succeeded = self.counters["requests"] - self.counters["failures"]
+        seconds = self.counters["seconds"]
+        return {
+            **self.counters,
+            "seconds": round(seconds, 3),
+            "p50_ms": _percentile_ms(ordered, 50),
+            "p95_ms": _percentile_ms(ordered, 95),
+            "mean_completion_tokens": round(self.counters["completion_tokens"] / succeeded, 1) if succeeded else 0.0,
+            "completion_tokens_per_sec": round(self.counters["completion_tokens"] / seconds, 1) if seconds else 0.0
+        }
+
+class OllamaBackend:
+    """One Ollama server: its clients, load and health."""
+
+    def __init__(self, url: str, make_client: Callable[..., Any], latency_window: int = 200):
+        self.url = url
+        self._make_client = make_client
+        self._clients: Dict[Tuple, Any] = {}
+        self.warmed: Dict[str, Any] = {}
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.consecutive_failed_checks = 0
+        self.ejected_until = 0.0
+        self.warming = False
+        self.ewma_latency: Optional[float] = None
+        self._latencies = deque(maxlen=latency_window)
+        self.counters = {
+            "requests": 0,
+            "failures": 0,
+            "ejections": 0,
+            "health_checks_failed": 0
+        }
+
+    @property
+    def healthy(self) -> bool:
+        return not self.warming and self.ejected_until <= time.monotonic()
+
+    def client_for(self, settings: Optional[Dict[str, Any]] = None) -> Any:
+        """Client for this backend with the given model settings, built once per combination."""
+        key = tuple(sorted((settings or {}).items()))
+        client = self._clients.get(key)
+        if client is None:
+            client = self._clients[key] = self._make_client(self.url, **(settings or {}))
+        return client
+
+    def record_success(self, seconds: float):
+        # Ejection is only lifted by a health check or by running out, so a
+        # request that was already in flight cannot flip the backend back in
+        self.consecutive_failures = 0
+        self._latencies.append(seconds)
+        if self.ewma_latency is None:
+            self.ewma_latency = seconds
+        else:
+            self.ewma_latency = 0.8 * self.ewma_latency + 0.2 * seconds
+
+    def record_failure(self, eject_after: int, eject_seconds: float) -> bool:
+        """Count a failed generation; returns True if it got the backend ejected."""
+        self.counters["failures"] += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= eject_after and self.healthy:
+            self.eject(eject_seconds)
+            return True
+        return False
+
+    def record_failed_check(self, eject_after: int, eject_seconds: float) -> bool:
+        """Count a failed health check; returns True if it got the backend ejected."""
+        self.counters["health_checks_failed"] += 1
+        self.consecutive_failed_checks += 1
+        if self.consecutive_failed_checks >= eject_after and self.healthy:
+            self.eject(eject_seconds)
+            return True
+        return False
+
+    def eject(self, seconds: float):
+        self.ejected_until = time.monotonic() + seconds
+        self.counters["ejections"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        ordered = sorted(self._latencies)
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "warming": self.warming,
+            "consecutive_failures": self.consecutive_failures,
+            "consecutive_failed_checks": self.consecutive_failed_checks,
+            "ewma_ms": round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            "p50_ms": _percentile_ms(ordered, 50),
+            "p95_ms": _percentile_ms(ordered, 95),
+            "warmed": self.warmed,
+            **self.counters
+        }
+
+class OllamaPool:
+    """
+    Spreads generations over several Ollama servers.
+
+    Each call goes to the healthy backend with the fewest requests in
+    flight, ties going to the lower recent latency. With max_concurrency
+    set, a backend never runs more than that many generations at once;
+    further calls wait for a slot on any healthy backend. Backends are
+    ejected after eject_after consecutive failed generations or health
+    checks and re-admitted once a health check passes and its models are
+    loaded again, or once the ejection period runs out. If every backend
+    is ejected, calls are spread over all of them rather than refused. An
+    ainvoke still running after the hedge delay is duplicated on another
+    backend with a free slot; the first answer wins and the other
+    generation is cancelled.
+
+    Exposes ainvoke/astream/invoke, so it can stand in for a single
+    LangChain client. Calls may name a task (counted separately in
+    task_stats) and model settings (model, num_predict, temperature...);
+    each backend keeps one client per distinct settings.
+    """
+
+    def __init__(self, urls: List[str], make_client: Callable[..., Any],
+                 max_concurrency: Optional[int] = None,
+                 eject_after: int = LLM_POOL_EJECT_FAILURES, eject_seconds: float = LLM_POOL_EJECT_SECONDS,
+                 health_interval: float = LLM_POOL_HEALTH_INTERVAL,
+                 health_timeout: float = LLM_POOL_HEALTH_TIMEOUT,
+                 hedge_after: float = LLM_POOL_HEDGE_AFTER):
+        if not urls:
+            raise NoBackendError("No Ollama backend configured")
+        self.backends = [OllamaBackend(url, make_client) for url in urls]
+        self.max_concurrency = max_concurrency
+        self._waiters: deque = deque()
+        self.eject_after = max(1, eject_after)
+        self.eject_seconds = eject_seconds
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.hedge_after = hedge_after
+        self._task: Optional[asyncio.Task] = None
+        self._readmitting: set = set()
+        self.tasks: Dict[str, TaskStats] = {}
+        self.warm_models: List[str] = []
+        self.keep_alive: Optional[str] = None
+        self.counters = {
+            "retries": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "readmissions": 0,
+            "all_ejected": 0
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool counters and per-backend load, health and latency."""
+        return {
+            "healthy_backends": sum(1 for backend in self.backends if backend.healthy),
+            "max_concurrency": self.max_concurrency,
+            "waiting": len(self._waiters),
+            "health_checks_running": self._task is not None and not self._task.done(),
+            **self.counters,
+            "backends": [backend.stats() for backend in self.backends]
+        }
+
+    def pick(self, exclude: Optional[OllamaBackend] = None) -> OllamaBackend:
+        """Least-outstanding healthy backend, avoiding `exclude` if possible."""
+        candidates = [b for b in self.backends if b.healthy and b is not exclude]
+        if not candidates:
+            candidates = [b for b in self.backends if b.healthy]
+        if not candidates:
+            self.counters["all_ejected"] += 1
+            candidates = self.backends
+        return min(candidates, key=lambda b: (b.outstanding, b.ewma_latency or 0.0))
+
+    def task_stats(self) -> Dict[str, Any]:
+        """Per-task latency and token counters."""
+        return {task: stats.stats() for task, stats in self.tasks.items()}
+
+    def _has_room(self, backend: OllamaBackend) -> bool:
+        return self.max_concurrency is None or backend.outstanding < self.max_concurrency
+
+    async def _acquire(self, exclude: Optional[OllamaBackend] = None) -> OllamaBackend:
+        """Pick a backend and take one of its slots, waiting while all are busy."""
+        while True:
+            backend = self.pick(exclude)
+            if self._has_room(backend):
+                backend.outstanding += 1
+                return backend
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Woken for a slot we no longer want; pass it on
+                    self._wake()
+                raise
+
+    def _release(self, backend: OllamaBackend):
+        backend.outstanding -= 1
+        self._wake()
+
+    def _wake(self, count: int = 1):
+        while count > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                count -= 1
+
+    @asynccontextmanager
+    async def _use(self, task: Optional[str],
+                   exclude: Optional[OllamaBackend] = None) -> AsyncIterator[Tuple[OllamaBackend, Dict[str, int]]]:
+        """
+        Run one generation on a backend slot; the caller fills in token usage.
+
+        The chosen backend is yielded with the usage dict so a failed call
+        can be retried elsewhere.
+        """
+        task_stats = self.tasks.setdefault(task or "default", TaskStats())
+        usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        backend = await self._acquire(exclude)
+        backend.counters["requests"] += 1
+        start = time.perf_counter()
+        try:
+            yield backend, usage
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            task_stats.record_failure()
+            if backend.record_failure(self.eject_after, self.eject_seconds):
+                logger.warning("Ejected Ollama backend %s after %d failures",
+                               backend.url, backend.consecutive_failures)
+            raise
+        else:
+            seconds = time.perf_counter() - start
+            backend.record_success(seconds)
+            task_stats.record(seconds, usage)
+        finally:
+            self._release(backend)
+
+    def _can_retry(self, failed: OllamaBackend) -> bool:
+        return any(b.healthy and b is not failed for b in self.backends)
+
+    async def _generate(self, prompt: str, task: Optional[str], settings: Optional[Dict[str, Any]],
+                        attempt: Dict[str, Any], exclude: Optional[OllamaBackend] = None) -> str:
+        async with self._use(task, exclude) as (backend, usage):
+            attempt["backend"] = backend
+            client = backend.client_for(settings)
+            if not hasattr(client, "agenerate"):
+                return await client.ainvoke(prompt)
+            # agenerate (rather than ainvoke) exposes Ollama's token counts
+            generation = (await client.agenerate([prompt])).generations[0][0]
+            info = generation.generation_info or {}
+            usage["prompt_tokens"] = info.get("prompt_eval_count") or 0
+            usage["completion_tokens"] = info.get("eval_count") or 0
+            return generation.text
+
+    async def ainvoke(self, prompt: str, task: Optional[str] = None,
+                      settings: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate on the least-loaded backend, hedging slow calls and retrying
+        once elsewhere on failure.
+        """
+        attempt: Dict[str, Any] = {}
+        try:
+            return await self._hedged(prompt, task, settings, attempt)
+        except Exception:
+            failed = attempt.get("backend")
+            if failed is None or not self._can_retry(failed):
+                raise
+        self.counters["retries"] += 1
+        return await self._generate(prompt, task, settings, {}, exclude=failed)
+
+    def _hedge_delay(self, task: Optional[str]) -> Optional[float]:
+        if not self.hedge_after or len(self.backends) < 2:
+            return None
+        task_stats = self.tasks.get(task or "default")
+        p95 = task_stats.percentile(95) if task_stats else None
+        return max(self.hedge_after, p95 or 0.0)
+
+    def _has_spare(self, exclude: OllamaBackend) -> bool:
+        """Whether a healthy backend other than `exclude` has a free slot (is idle, without a limit)."""
+        return any(b.healthy and b is not exclude and self._has_room(b)
+                   and (self.max_concurrency is not None or b.outstanding == 0)
+                   for b in self.backends)
+
+    async def _hedged(self, prompt: str, task: Optional[str], settings: Optional[Dict[str, Any]],
+                      attempt: Dict[str, Any]) -> str:
+        """
+        Generate once; if that is still running after the hedge delay and
+        another backend has a free slot, race a duplicate there.
+
+        Args:
+            prompt: Prompt text
+            task: Task name for per-task stats
+            settings: Model settings
+            attempt: Filled with the first generation's backend
+
+        Returns:
+            The first successful answer (the first generation's error if both fail)
+        """
+        primary = asyncio.ensure_future(self._generate(prompt, task, settings, attempt))
+        pending = {primary}
+        try:
+            delay = self._hedge_delay(task)
+            if delay is not None:
+                await asyncio.wait(pending, timeout=delay)
+            first = attempt.get("backend")
+            if primary.done() or first is None or not self._has_spare(first):
+                return await primary
+
+            self.counters["hedges"] += 1
+            hedge = asyncio.ensure_future(
+                self._generate(prompt, task, settings, {}, exclude=first))
+            pending.add(hedge)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    if finished.exception() is None:
+                        if finished is hedge:
+                            self.counters["hedge_wins"] += 1
+                        return finished.result()
+            return primary.result()
+        finally:
+            for call in pending:
+                call.cancel()
+
+    async def astream(self, prompt: str, task: Optional[str] = None,
+                      settings: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream from the least-loaded backend.
+
+        A backend that fails before its first chunk is retried once on
+        another backend; after that, errors reach the caller. Ollama streams
+        one token per chunk, so chunks are counted as completion tokens.
+        """
+        failed = None
+        started = False
+        try:
+            async with self._use(task) as (backend, usage):
+                failed = backend
+                async for chunk in backend.client_for(settings).astream(prompt):
+                    started = True
+                    usage["completion_tokens"] += 1
+                    yield chunk
+            return
+        except Exception:
+            if started or failed is None or not self._can_retry(failed):
+                raise
+        self.counters["retries"] += 1
+        async with self._use(task, exclude=failed) as (backend, usage):
+            async for chunk in backend.client_for(settings).astream(prompt):
+                usage["completion_tokens"] += 1
+                yield chunk
+
+    def invoke(self, prompt: str, task: Optional[str] = None, settings: Optional[Dict[str, Any]] = None) -> str:
+        """Blocking generation on the least-loaded backend (no retry, token counts or slot limit)."""
+        backend = self.pick()
+        task_stats = self.tasks.setdefault(task or "default", TaskStats())
+        backend.outstanding += 1
+        backend.counters["requests"] += 1
+        start = time.perf_counter()
+        try:
+            result = backend.client_for(settings).invoke(prompt)
+        except Exception:
+            task_stats.record_failure()
+            backend.record_failure(self.eject_after, self.eject_seconds)
+            raise
+        finally:
+            backend.outstanding -= 1
+        seconds = time.perf_counter() - start
+        backend.record_success(seconds)
+        task_stats.record(seconds, {"prompt_tokens": 0, "completion_tokens": 0})
+        return result
+
+    async def warm(self, models: List[str], keep_alive: Optional[str] = None):
+        """
+        Load models into memory on every backend.
+
+        The models are remembered and loaded again on backends that get
+        re-admitted after an outage.
+
+        Args:
+            models: Model names to load
+            keep_alive: How long Ollama keeps each model loaded (e.g. "30m")
+        """
+        self.warm_models = list(models)
+        self.keep_alive = keep_alive
+        await asyncio.gather(*[self._warm_backend(backend) for backend in self.backends])
+
+    async def _warm_backend(self, backend: OllamaBackend):
+        for model in self.warm_models:
+            # A generate request without a prompt only loads the model
+            body = {"model": model, "stream": False}
+            if self.keep_alive is not None:
+                body["keep_alive"] = self.keep_alive
+            start = time.perf_counter()
+            try:
+                response = await get_client().post(f"{backend.url}/api/generate", json=body,
+                                                   timeout=LLM_POOL_WARM_TIMEOUT)
+                response.raise_for_status()
+            except Exception as e:
+                backend.warmed[model] = f"failed: {e}"
+                logger.warning("Could not load %s on Ollama backend %s: %s", model, backend.url, e)
+                continue
+            backend.warmed[model] = round(time.perf_counter() - start, 3)
+
+    async def check(self, backend: OllamaBackend) -> bool:
+        """
+        Poll one backend's /api/tags, ejecting it or starting its re-admission.
+
+        Returns:
+            True if the backend answered
+        """
+        try:
+            response = await get_client().get(f"{backend.url}/api/tags", timeout=self.health_timeout)
+            response.raise_for_status()
+        except Exception as e:
+            if backend.record_failed_check(self.eject_after, self.eject_seconds):
+                logger.warning("Ejected Ollama backend %s after %d failed health checks (%s)",
+                               backend.url, backend.consecutive_failed_checks, e)
+            return False
+
+        backend.consecutive_failed_checks = 0
+        if not backend.healthy and not backend.warming:
+            # Warming can take minutes, so it runs outside the health loop
+            backend.warming = True
+            task = asyncio.ensure_future(self._readmit(backend))
+            self._readmitting.add(task)
+            task.add_done_callback(self._readmitting.discard)
+        return True
+
+    async def _readmit(self, backend: OllamaBackend):
+        """Reload the models on a recovered backend, then let traffic back in."""
+        try:
+            # A restarted server comes back with its models unloaded
+            await self._warm_backend(backend)
+        finally:
+            backend.warming = False
+        if backend.consecutive_failed_checks:
+            # It went down again while warming; stay ejected
+            return
+        backend.ejected_until = 0.0
+        backend.consecutive_failures = 0
+        self.counters["readmissions"] += 1
+        logger.info("Re-admitted Ollama backend %s", backend.url)
+        self._wake(len(self._waiters))
+
+    async def check_all(self):
+        """Health-check every backend concurrently."""
+        await asyncio.gather(*[self.check(backend) for backend in self.backends])
+
+    async def _run(self):
+        while True:
+            try:
+                await self.check_all()
+            except Exception:
+                logger.exception("Ollama health check failed")
+            await asyncio.sleep(self.health_interval)
+
+    def start(self):
+        """Start the background health checks (call from the app lifespan)."""
+        if len(self.backends) > 1 and (self._task is None or self._task.done()):
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """Stop the background health checks and any re-admission in progress."""
+        for task in list(self._readmitting):
+            task.cancel()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
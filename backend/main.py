@@ -1,10 +1,14 @@
 import os
-import time
+import json
 import sys
+import asyncio
+import logging
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI, HTTPException, Query, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 
 # Add backend to path for imports
@@ -14,23 +18,68 @@ from auth import generate_auth_url, exchange_code_for_tokens, refresh_access_tok
 from spotify import (
     get_user_profile, get_user_top_tracks, get_user_top_artists,
     get_user_playlists, create_playlist, get_recommendations, 
-    add_tracks_to_playlist, get_playlist_tracks
+    add_tracks_to_playlist, get_playlist_tracks, add_tracks_bulk,
+    create_playlist_with_tracks
 )
 from ai import SpotifyAIAssistant
-from db import init_db, get_user, get_user_by_spotify_id, create_or_update_user, cache_user_stats, get_cached_stats
+from http_client import open_client, close_client, get_payload_stats
+from scheduler import scheduler, RateLimitedError
+from response_cache import response_cache
+from user_cache import user_cache
+from tokens import token_manager, TokenExpiredError
+from maintenance import stats_compactor
+import spotify
+from db import close_connections, write_queue, WriteQueueFullError
+from async_db import get_user, get_user_by_spotify_id, create_or_update_user, cache_user_stats, get_cached_stats
+import async_db
 from models.user import TokenResponse, PlaylistCreate, BlendRequest, AIRequest
 from utils.stats import extract_genres_from_artists, calculate_similarity_score, deduplicate_tracks, merge_playlists, calculate_listening_stats
+from utils.concurrency import gather_or_cancel
+from singleflight import SingleFlight
 
 load_dotenv()
 
-# Initialize database
-init_db()
+logger = logging.getLogger(__name__)
+
+# Strong references to fire-and-forget tasks until they finish
+_background_tasks = set()
+
+# Cached profile stats younger than this are served without calling Spotify;
+# older copies are served while a refresh runs in the background
+PROFILE_STATS_TTL = float(os.getenv("PROFILE_STATS_TTL", "900"))
+# Load the LLM stack right after startup instead of on the first AI request
+AI_WARM_ON_STARTUP = os.getenv("AI_WARM_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources on startup and release them on shutdown."""
+    await async_db.init_db()
+    await open_client()
+    if AI_WARM_ON_STARTUP:
+        # Loads LangChain in the background so startup does not wait for it
+        warm_task = asyncio.ensure_future(ai_assistant.warm())
+        _background_tasks.add(warm_task)
+        warm_task.add_done_callback(_background_tasks.discard)
+    token_manager.start()
+    stats_compactor.start()
+    try:
+        yield
+    finally:
+        await stats_compactor.stop()
+        await ai_assistant.close()
+        await token_manager.stop()
+        await scheduler.close()
+        await close_client()
+        async_db.shutdown()
+        write_queue.close()
+        close_connections()
 
 # FastAPI app
 app = FastAPI(
     title="Spotify AI Assistant",
     description="Spotify-connected AI assistant with LLaMA 3.2",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -45,6 +94,25 @@ app.add_middleware(
 # Initialize AI assistant
 ai_assistant = SpotifyAIAssistant()
 
+def upstream_error(e: Exception) -> HTTPException:
+    """
+    Map an unexpected error from an endpoint to an HTTPException.
+    Spotify rate limiting is surfaced as 429 with Retry-After, tokens
+    that can no longer be refreshed as 401 and a full database write
+    queue as 503, instead of 500.
+    """
+    if isinstance(e, TokenExpiredError):
+        return HTTPException(status_code=401, detail=str(e))
+    if isinstance(e, RateLimitedError):
+        return HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(int(e.retry_after + 0.999))}
+        )
+    if isinstance(e, WriteQueueFullError):
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    return HTTPException(status_code=500, detail=str(e))
+
 # ============================================================================
 # AUTH ENDPOINTS
 # ============================================================================
@@ -66,7 +134,7 @@ async def login():
             "state": state
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise upstream_error(e)
 
 @app.get("/auth/callback")
 async def callback(code: str = Query(...), state: str = Query(...)):
@@ -106,7 +174,7 @@ async def callback(code: str = Query(...), state: str = Query(...)):
             "plan_type": profile["plan_type"]
         }
         
-        user_id = create_or_update_user(user_data)
+        user_id = await create_or_update_user(user_data)
         
         return {
             "access_token": tokens["access_token"],
@@ -115,6 +183,8 @@ async def callback(code: str = Query(...), state: str = Query(...)):
             "expires_in": tokens.get("expires_in", 3600),
             "token_type": "Bearer"
         }
+    except WriteQueueFullError as e:
+        raise upstream_error(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Authentication failed: {str(e)}")
 
@@ -145,48 +215,99 @@ async def refresh(refresh_token: str = Body(..., embed=True)):
 # USER ENDPOINTS
 # ============================================================================
 
+# One stats refresh per user at a time, shared by foreground and background callers
+profile_refreshes = SingleFlight()
+
+def _stats_age_seconds(cached_at: str) -> float:
+    """Seconds since a user_stats row was written (cached_at is SQLite UTC time)."""
+    written = datetime.strptime(cached_at, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    return max(0.0, (datetime.now(timezone.utc) - written).total_seconds())
+
+async def refresh_profile_stats(user_id: str, user: dict) -> dict:
+    """
+    Fetch a user's top tracks and artists from Spotify and cache the stats.
+    
+    Args:
+        user_id: User ID from our database
+        user: User row from the database
+        
+    Returns:
+        Stats dict as stored by cache_user_stats
+    """
+    user = await token_manager.ensure_fresh(user)
+    top_tracks, top_artists = await gather_or_cancel(
+        get_user_top_tracks(user["access_token"], limit=20, user_key=user["id"]),
+        get_user_top_artists(user["access_token"], limit=20, user_key=user["id"])
+    )
+    genres_with_counts = extract_genres_from_artists(top_artists)
+    
+    stats = {
+        "top_tracks": top_tracks,
+        "top_artists": top_artists,
+        "top_genres": [genre for genre, _ in genres_with_counts],
+        "listening_stats": calculate_listening_stats(top_tracks)
+    }
+    await cache_user_stats(user_id, stats)
+    return stats
+
+def refresh_profile_stats_in_background(user_id: str, user: dict):
+    """Start a stats refresh unless one is already running for this user."""
+    task = asyncio.ensure_future(
+        profile_refreshes.do(user_id, lambda: refresh_profile_stats(user_id, user))
+    )
+    _background_tasks.add(task)
+    
+    def _done(done: asyncio.Task):
+        _background_tasks.discard(done)
+        if not done.cancelled() and done.exception() is not None:
+            logger.warning("Background stats refresh for user %s failed: %s", user_id, done.exception())
+    
+    task.add_done_callback(_done)
+
 @app.get("/user/profile")
-async def get_profile(user_id: str = Query(...)):
+async def get_profile(user_id: str = Query(...), refresh: bool = Query(False)):
     """
     Get user profile and stats.
     Aggregates: profile info, top tracks, top artists, top genres, listening stats
     
+    Cached stats younger than PROFILE_STATS_TTL are returned without calling
+    Spotify. Older stats are returned immediately while a refresh runs in
+    the background.
+    
     Query Parameters:
         user_id: User ID from our database
+        refresh: Skip the cache and fetch fresh stats from Spotify
         
     Returns:
-        User profile with all stats
+        User profile with all stats, plus stats_source, stats_cached_at,
+        stats_age_seconds and stats_stale describing how old the stats are
     """
     try:
-        user = get_user(user_id)
+        user = await get_user(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Check if access token is expired
-        if user["token_expires_at"] and user["token_expires_at"] < time.time():
-            if user["refresh_token"]:
-                tokens = await refresh_access_token(user["refresh_token"])
-                user["access_token"] = tokens["access_token"]
-                user["token_expires_at"] = tokens.get("expires_at")
-            else:
-                raise HTTPException(status_code=401, detail="Token expired, please login again")
-        
-        # Fetch fresh stats from Spotify
-        top_tracks = await get_user_top_tracks(user["access_token"], limit=20)
-        top_artists = await get_user_top_artists(user["access_token"], limit=20)
-        genres_with_counts = extract_genres_from_artists(top_artists)
-        top_genres = [genre for genre, _ in genres_with_counts]
-        
-        listening_stats = calculate_listening_stats(top_tracks)
-        
-        # Cache stats
-        stats = {
-            "top_tracks": top_tracks,
-            "top_artists": top_artists,
-            "top_genres": top_genres,
-            "listening_stats": listening_stats
-        }
-        cache_user_stats(user_id, stats)
+        cached = None if refresh else await get_cached_stats(user_id)
+        if cached:
+            stats = cached
+            age = _stats_age_seconds(cached["cached_at"])
+            stale = age > PROFILE_STATS_TTL
+            if stale:
+                refresh_profile_stats_in_background(user_id, user)
+            freshness = {
+                "stats_source": "cache",
+                "stats_cached_at": cached["cached_at"],
+                "stats_age_seconds": round(age, 1),
+                "stats_stale": stale
+            }
+        else:
+            stats = await profile_refreshes.do(user_id, lambda: refresh_profile_stats(user_id, user))
+            freshness = {
+                "stats_source": "spotify",
+                "stats_cached_at": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+                "stats_age_seconds": 0.0,
+                "stats_stale": False
+            }
         
         return {
             "id": user["id"],
@@ -197,15 +318,16 @@ async def get_profile(user_id: str = Query(...)):
             "profile_url": user["profile_url"],
             "image_url": user["image_url"],
             "plan_type": user["plan_type"],
-            "top_tracks": top_tracks,
-            "top_artists": top_artists,
-            "top_genres": top_genres,
-            "listening_stats": listening_stats
+            "top_tracks": stats["top_tracks"],
+            "top_artists": stats["top_artists"],
+            "top_genres": stats["top_genres"],
+            "listening_stats": stats["listening_stats"],
+            **freshness
         }
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise upstream_error(e)
 
 # ============================================================================
 # PLAYLIST ENDPOINTS
@@ -223,16 +345,17 @@ async def list_playlists(user_id: str = Query(...)):
         List of user's playlists with metadata
     """
     try:
-        user = get_user(user_id)
+        user = await get_user(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
+        user = await token_manager.ensure_fresh(user)
         
-        playlists = await get_user_playlists(user["access_token"])
+        playlists = await get_user_playlists(user["access_token"], user_key=user["id"])
         return {"playlists": playlists}
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise upstream_error(e)
 
 @app.post("/playlists/create")
 async def create_new_playlist(user_id: str = Query(...), playlist: PlaylistCreate = Body(...)):
@@ -246,14 +369,27 @@ async def create_new_playlist(user_id: str = Query(...), playlist: PlaylistCreat
         name: Playlist name
         description: Optional description
         public: Whether playlist is public
+        track_uris: Optional tracks to fill the new playlist with
         
     Returns:
         Created playlist data
     """
     try:
-        user = get_user(user_id)
+        user = await get_user(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
+        user = await token_manager.ensure_fresh(user)
+        
+        if playlist.track_uris:
+            return await create_playlist_with_tracks(
+                user["access_token"],
+                user["spotify_id"],
+                playlist.name,
+                playlist.track_uris,
+                playlist.description or "",
+                playlist.public,
+                user_key=user["id"]
+            )
         
         new_playlist = await create_playlist(
             user["access_token"],
@@ -266,7 +402,7 @@ async def create_new_playlist(user_id: str = Query(...), playlist: PlaylistCreat
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise upstream_error(e)
 
 @app.get("/playlists/{playlist_id}/tracks")
 async def get_tracks(playlist_id: str, user_id: str = Query(...)):
@@ -283,16 +419,17 @@ async def get_tracks(playlist_id: str, user_id: str = Query(...)):
         List of tracks in playlist
     """
     try:
-        user = get_user(user_id)
+        user = await get_user(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
+        user = await token_manager.ensure_fresh(user)
         
-        tracks = await get_playlist_tracks(user["access_token"], playlist_id)
+        tracks = await get_playlist_tracks(user["access_token"], playlist_id, user_key=user["id"])
         return {"tracks": tracks}
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise upstream_error(e)
 
 @app.post("/playlists/{playlist_id}/add-tracks")
 async def add_tracks(
@@ -313,19 +450,25 @@ async def add_tracks(
         track_uris: List of Spotify track URIs
         
     Returns:
-        Success status
+        Success status, tracks added and any chunks that failed
     """
     try:
-        user = get_user(user_id)
+        user = await get_user(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
+        user = await token_manager.ensure_fresh(user)
         
-        await add_tracks_to_playlist(user["access_token"], playlist_id, track_uris)
-        return {"success": True, "message": f"Added {len(track_uris)} tracks"}
+        result = await add_tracks_bulk(user["access_token"], playlist_id, track_uris, user_key=user["id"])
+        return {
+            "success": not result["failed_chunks"],
+            "message": f"Added {result['added']} of {result['total']} tracks",
+            "added": result["added"],
+            "failed_chunks": result["failed_chunks"]
+        }
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise upstream_error(e)
 
 # ============================================================================
 # BLEND ENDPOINTS (Multi-user)
@@ -346,15 +489,23 @@ async def create_blend(blend_request: BlendRequest = Body(...)):
         Similarity score, overlap analysis, and recommendations
     """
     try:
-        user1 = get_user(blend_request.user_id1)
-        user2 = get_user(blend_request.user_id2)
+        user1, user2 = await gather_or_cancel(
+            get_user(blend_request.user_id1),
+            get_user(blend_request.user_id2)
+        )
         
         if not user1 or not user2:
             raise HTTPException(status_code=404, detail="One or both users not found")
+        user1, user2 = await gather_or_cancel(
+            token_manager.ensure_fresh(user1),
+            token_manager.ensure_fresh(user2)
+        )
         
         # Get top artists for both users
-        artists1 = await get_user_top_artists(user1["access_token"], limit=20)
-        artists2 = await get_user_top_artists(user2["access_token"], limit=20)
+        artists1, artists2 = await gather_or_cancel(
+            get_user_top_artists(user1["access_token"], limit=20, user_key=user1["id"]),
+            get_user_top_artists(user2["access_token"], limit=20, user_key=user2["id"])
+        )
         
         genres1 = extract_genres_from_artists(artists1)
         genres2 = extract_genres_from_artists(artists2)
@@ -374,7 +525,8 @@ async def create_blend(blend_request: BlendRequest = Body(...)):
             user1["access_token"],
             seed_artists=seed_artists1 + seed_artists2,
             seed_genres=seed_genres,
-            limit=30
+            limit=30,
+            user_key=user1["id"]
         )
         
         return {
@@ -389,7 +541,7 @@ async def create_blend(blend_request: BlendRequest = Body(...)):
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise upstream_error(e)
 
 # ============================================================================
 # AI ENDPOINTS
@@ -409,30 +561,29 @@ async def generate_playlist(ai_request: AIRequest = Body(...)):
         Generated playlist name and track recommendations
     """
     try:
-        user = get_user(ai_request.user_id)
+        user = await get_user(ai_request.user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
+        user = await token_manager.ensure_fresh(user)
         
         # Get user's top artists for seed data
-        artists = await get_user_top_artists(user["access_token"], limit=10)
+        artists = await get_user_top_artists(user["access_token"], limit=10, user_key=user["id"])
         genres = extract_genres_from_artists(artists)
         
-        # Generate playlist name using AI
+        # Generate playlist name using AI while fetching recommendations
         mood = ai_request.context.get("mood") if ai_request.context else None
-        playlist_name = await ai_assistant.generate_playlist_name(
-            [g[0] for g in genres[:5]],
-            mood
-        )
-        
-        # Get recommendations
         seed_artists = [a["id"] for a in artists[:5]]
         seed_genres = [g[0] for g in genres[:5]]
         
-        recommendations = await get_recommendations(
-            user["access_token"],
-            seed_artists=seed_artists,
-            seed_genres=seed_genres,
-            limit=30
+        playlist_name, recommendations = await gather_or_cancel(
+            ai_assistant.generate_playlist_name(seed_genres, mood),
+            get_recommendations(
+                user["access_token"],
+                seed_artists=seed_artists,
+                seed_genres=seed_genres,
+                limit=30,
+                user_key=user["id"]
+            )
         )
         
         return {
@@ -445,7 +596,7 @@ async def generate_playlist(ai_request: AIRequest = Body(...)):
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise upstream_error(e)
 
 @app.post("/ai/mood")
 async def analyze_mood(ai_request: AIRequest = Body(...)):
@@ -460,13 +611,16 @@ async def analyze_mood(ai_request: AIRequest = Body(...)):
         Mood analysis from AI
     """
     try:
-        user = get_user(ai_request.user_id)
+        user = await get_user(ai_request.user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
+        user = await token_manager.ensure_fresh(user)
         
         # Get user's top data
-        top_tracks = await get_user_top_tracks(user["access_token"], limit=10)
-        top_artists = await get_user_top_artists(user["access_token"], limit=10)
+        top_tracks, top_artists = await gather_or_cancel(
+            get_user_top_tracks(user["access_token"], limit=10, user_key=user["id"]),
+            get_user_top_artists(user["access_token"], limit=10, user_key=user["id"])
+        )
         
         # Analyze mood with AI
         mood_analysis = await ai_assistant.analyze_mood(top_tracks, top_artists)
@@ -479,7 +633,7 @@ async def analyze_mood(ai_request: AIRequest = Body(...)):
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise upstream_error(e)
 
 @app.post("/ai/fix")
 async def fix_playlist(ai_request: AIRequest = Body(...)):
@@ -494,15 +648,16 @@ async def fix_playlist(ai_request: AIRequest = Body(...)):
         Playlist analysis and improvement suggestions
     """
     try:
-        user = get_user(ai_request.user_id)
+        user = await get_user(ai_request.user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
+        user = await token_manager.ensure_fresh(user)
         
         # Use prompt as playlist name to look up
         playlist_name = ai_request.prompt
         
         # Get user's playlists to find the one
-        playlists = await get_user_playlists(user["access_token"])
+        playlists = await get_user_playlists(user["access_token"], limit=None, user_key=user["id"])
         matching_playlist = next(
             (p for p in playlists if p["name"].lower() == playlist_name.lower()),
             None
@@ -512,7 +667,7 @@ async def fix_playlist(ai_request: AIRequest = Body(...)):
             raise HTTPException(status_code=404, detail=f"Playlist '{playlist_name}' not found")
         
         # Get playlist tracks
-        tracks = await get_playlist_tracks(user["access_token"], matching_playlist["id"])
+        tracks = await get_playlist_tracks(user["access_token"], matching_playlist["id"], user_key=user["id"])
         
         # Analyze with AI
         analysis = await ai_assistant.fix_playlist(playlist_name, tracks)
@@ -521,7 +676,7 @@ async def fix_playlist(ai_request: AIRequest = Body(...)):
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise upstream_error(e)
 
 @app.post("/ai/summary")
 async def generate_summary(ai_request: AIRequest = Body(...)):
@@ -535,13 +690,16 @@ async def generate_summary(ai_request: AIRequest = Body(...)):
         Personalized music taste summary
     """
     try:
-        user = get_user(ai_request.user_id)
+        user = await get_user(ai_request.user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
+        user = await token_manager.ensure_fresh(user)
         
         # Get user's top data
-        top_tracks = await get_user_top_tracks(user["access_token"], limit=15)
-        top_artists = await get_user_top_artists(user["access_token"], limit=15)
+        top_tracks, top_artists = await gather_or_cancel(
+            get_user_top_tracks(user["access_token"], limit=15, user_key=user["id"]),
+            get_user_top_artists(user["access_token"], limit=15, user_key=user["id"])
+        )
         genres = extract_genres_from_artists(top_artists)
         top_genres = [g[0] for g in genres]
         
@@ -561,7 +719,152 @@ async def generate_summary(ai_request: AIRequest = Body(...)):
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise upstream_error(e)
+
+# ============================================================================
+# AI STREAMING ENDPOINTS
+# ============================================================================
+#
+# Server-Sent Events variants of the AI endpoints. Spotify data is fetched
+# before the response starts, so lookup failures keep their HTTP status.
+# The stream then sends one "meta" event with the Spotify-derived fields,
+# a "token" event per generated chunk and a final "done" event with the
+# complete result ("error" instead if generation broke off midway).
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_ai_response(meta: dict, llm_stream, result_key: str) -> StreamingResponse:
+    """
+    Build an SSE response that sends meta first and then the LLM text.
+    
+    Args:
+        meta: Spotify-derived fields, sent before generation starts
+        llm_stream: LLMStream from the AI assistant
+        result_key: Key the final result is sent under in the "done" event
+    """
+    async def events():
+        yield sse_event("meta", meta)
+        async for chunk in llm_stream:
+            yield sse_event("token", {"text": chunk})
+        if llm_stream.error is not None and not llm_stream.used_fallback:
+            yield sse_event("error", {"detail": str(llm_stream.error), "partial": llm_stream.text})
+            return
+        yield sse_event("done", {result_key: llm_stream.result, "fallback": llm_stream.used_fallback})
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/ai/mood/stream")
+async def stream_mood(ai_request: AIRequest = Body(...)):
+    """
+    Streaming variant of /ai/mood (Server-Sent Events).
+    
+    Body:
+        user_id: User ID
+        
+    Returns:
+        SSE stream: meta (top tracks/artists), token..., done (mood)
+    """
+    try:
+        user = await get_user(ai_request.user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        user = await token_manager.ensure_fresh(user)
+        
+        top_tracks, top_artists = await gather_or_cancel(
+            get_user_top_tracks(user["access_token"], limit=10, user_key=user["id"]),
+            get_user_top_artists(user["access_token"], limit=10, user_key=user["id"])
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_error(e)
+    
+    meta = {
+        "top_tracks": top_tracks[:5],
+        "top_artists": [a["name"] for a in top_artists[:5]]
+    }
+    return stream_ai_response(meta, ai_assistant.stream_mood(top_tracks, top_artists), "mood")
+
+@app.post("/ai/fix/stream")
+async def stream_fix_playlist(ai_request: AIRequest = Body(...)):
+    """
+    Streaming variant of /ai/fix (Server-Sent Events).
+    
+    Body:
+        user_id: User ID
+        prompt: Playlist name to analyze
+        
+    Returns:
+        SSE stream: meta (playlist, track count), token..., done (analysis)
+    """
+    try:
+        user = await get_user(ai_request.user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        user = await token_manager.ensure_fresh(user)
+        
+        playlist_name = ai_request.prompt
+        playlists = await get_user_playlists(user["access_token"], limit=None, user_key=user["id"])
+        matching_playlist = next(
+            (p for p in playlists if p["name"].lower() == playlist_name.lower()),
+            None
+        )
+        
+        if not matching_playlist:
+            raise HTTPException(status_code=404, detail=f"Playlist '{playlist_name}' not found")
+        
+        tracks = await get_playlist_tracks(user["access_token"], matching_playlist["id"], user_key=user["id"])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_error(e)
+    
+    meta = {"playlist": playlist_name, "track_count": len(tracks)}
+    return stream_ai_response(meta, ai_assistant.stream_fix_playlist(playlist_name, tracks), "analysis")
+
+@app.post("/ai/summary/stream")
+async def stream_summary(ai_request: AIRequest = Body(...)):
+    """
+    Streaming variant of /ai/summary (Server-Sent Events).
+    
+    Body:
+        user_id: User ID
+        
+    Returns:
+        SSE stream: meta (top artists, genres, taste profile), token..., done (summary)
+    """
+    try:
+        user = await get_user(ai_request.user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        user = await token_manager.ensure_fresh(user)
+        
+        top_tracks, top_artists = await gather_or_cancel(
+            get_user_top_tracks(user["access_token"], limit=15, user_key=user["id"]),
+            get_user_top_artists(user["access_token"], limit=15, user_key=user["id"])
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_error(e)
+    
+    genres = extract_genres_from_artists(top_artists)
+    top_genres = [g[0] for g in genres]
+    meta = {
+        "top_artists": [a["name"] for a in top_artists[:5]],
+        "top_genres": top_genres[:10],
+        "taste_profile": {
+            "diversity": len(set(top_genres)),
+            "top_track": top_tracks[0]["name"] if top_tracks else "N/A",
+            "top_artist": top_artists[0]["name"] if top_artists else "N/A"
+        }
+    }
+    llm_stream = ai_assistant.stream_taste_summary(top_tracks, top_artists, top_genres)
+    return stream_ai_response(meta, llm_stream, "summary")
 
 # ============================================================================
 # HEALTH CHECK
@@ -576,6 +879,27 @@ async def health():
         "version": "1.0.0"
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters for the outgoing request pipeline."""
+    return {
+        "spotify_scheduler": scheduler.stats(),
+        "spotify_response_cache": response_cache.stats() if response_cache else None,
+        "spotify_singleflight": spotify.inflight.stats(),
+        "spotify_payloads": get_payload_stats(),
+        "token_manager": token_manager.stats(),
+        "stats_compaction": stats_compactor.stats(),
+        "db_write_queue": write_queue.stats(),
+        "user_cache": user_cache.stats() if user_cache else None,
+        "llm": ai_assistant.limiter.stats(),
+        "llm_pool": ai_assistant.pool.stats() if ai_assistant.pool else None,
+        "llm_tasks": ai_assistant.task_stats(),
+        "llm_cache": ai_assistant.cache.stats() if ai_assistant.cache else None,
+        "llm_batch": ai_assistant.name_batcher.stats() if ai_assistant.name_batcher else None,
+        "llm_breaker": ai_assistant.breaker.stats() if ai_assistant.breaker else None,
+        "llm_budgets": ai_assistant.budget_stats()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000)
@@ -0,0 +1,101 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+import async_db
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# How often the user_stats retention policy is applied (seconds)
+STATS_COMPACT_INTERVAL = float(os.getenv("STATS_COMPACT_INTERVAL", "3600"))
+
+class StatsCompactor:
+    """
+    Periodically trims user_stats history down to the retention policy.
+
+    A pass runs on async_db's maintenance thread with its own connection,
+    as a series of short jobs: one per batch of users, then the
+    user_invalidations purge, then an incremental vacuum of at most
+    STATS_VACUUM_PAGES pages. Request writes never queue behind it; they
+    only contend for SQLite's write lock, which each job holds for one
+    batch of deletes at most, and the write-behind queue retries commits
+    that find the lock taken.
+    """
+
+    def __init__(self, interval: float = STATS_COMPACT_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {
+            "runs": 0,
+            "failures": 0,
+            "rows_deleted": 0,
+            "pages_vacuumed": 0
+        }
+        self.last_run_seconds: Optional[float] = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of compaction counters."""
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "last_run_seconds": self.last_run_seconds,
+            **self.counters
+        }
+
+    async def compact(self) -> Dict[str, int]:
+        """
+        Run one compaction pass.
+
+        Returns:
+            Dict with rows deleted and pages vacuumed
+        """
+        start = time.perf_counter()
+        now = datetime.utcnow()
+        result = {"rows_deleted": 0, "pages_vacuumed": 0}
+        try:
+            last_user: Optional[str] = ""
+            while last_user is not None:
+                last_user, deleted = await async_db.compact_user_stats_batch(last_user, now)
+                result["rows_deleted"] += deleted
+            await async_db.purge_user_invalidations()
+            result["pages_vacuumed"] = await async_db.vacuum_free_pages()
+        except Exception:
+            self.counters["failures"] += 1
+            raise
+        self.last_run_seconds = round(time.perf_counter() - start, 3)
+        self.counters["runs"] += 1
+        self.counters["rows_deleted"] += result["rows_deleted"]
+        self.counters["pages_vacuumed"] += result["pages_vacuumed"]
+        return result
+
+    async def _run(self):
+        while True:
+            try:
+                result = await self.compact()
+                if result["rows_deleted"]:
+                    logger.info("Compacted user_stats: %s", result)
+            except Exception:
+                logger.exception("user_stats compaction failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start the background compaction task (call from the app lifespan)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """Stop the background task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+stats_compactor = StatsCompactor()
@@ -30,6 +30,7 @@ class PlaylistCreate(BaseModel):
     name: str
     description: Optional[str] = None
     public: bool = False
+    track_uris: Optional[List[str]] = None
 
 class PlaylistUpdate(BaseModel):
     name: Optional[str] = None
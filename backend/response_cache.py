@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+from http_client import loads
+
+load_dotenv()
+
+SPOTIFY_CACHE_ENABLED = os.getenv("SPOTIFY_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SPOTIFY_CACHE_MAX_BYTES = int(os.getenv("SPOTIFY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+SPOTIFY_CACHE_DB = os.getenv("SPOTIFY_CACHE_DB", "")
+SPOTIFY_CACHE_DB_MAX_ROWS = int(os.getenv("SPOTIFY_CACHE_DB_MAX_ROWS", "50000"))
+
+class CacheEntry:
+    """A cached response body: validator, decoded payload and its wire size."""
+
+    __slots__ = ("etag", "data", "size")
+
+    def __init__(self, etag: str, data: Any, size: int):
+        self.etag = etag
+        self.data = data
+        self.size = size
+
+class ResponseCache:
+    """
+    ETag-validated cache of decoded Spotify GET responses.
+
+    Entries live in an in-memory LRU bounded by total body size. When a
+    SQLite path is given, entries are also written there so the cache
+    survives restarts; entries evicted from memory are reloaded from disk
+    on the next lookup.
+    """
+
+    def __init__(self, max_bytes: int = SPOTIFY_CACHE_MAX_BYTES, db_path: Optional[str] = None,
+                 max_db_rows: int = SPOTIFY_CACHE_DB_MAX_ROWS):
+        self.max_bytes = max_bytes
+        self.db_path = db_path or None
+        self.max_db_rows = max_db_rows
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self.counters = {
+            "lookups": 0,
+            "not_modified": 0,
+            "stored": 0,
+            "evictions": 0,
+            "disk_loads": 0
+        }
+
+        if self.db_path:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                key TEXT PRIMARY KEY,
+                etag TEXT NOT NULL,
+                body TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL
+            )
+            """)
+            self._db.commit()
+
+    @staticmethod
+    def make_key(user_key: str, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Build a cache key from the caller identity, URL and query params.
+
+        Args:
+            user_key: Identifies whose data this is (our user ID)
+            url: Request URL
+            params: Query parameters
+
+        Returns:
+            Hex digest key
+        """
+        canonical = json.dumps([user_key, url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of cache size and hit counters."""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "persistent": self._db is not None,
+            **self.counters
+        }
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Look up an entry, promoting it to most-recently-used."""
+        self.counters["lookups"] += 1
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        if self._db is None:
+            return None
+
+        row = self._db.execute(
+            "SELECT etag, body, size FROM http_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return None
+
+        entry = CacheEntry(row[0], loads(row[1]), row[2])
+        self.counters["disk_loads"] += 1
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, etag: str, data: Any, body: str):
+        """
+        Store a response.
+
+        Args:
+            key: Cache key from make_key()
+            etag: ETag returned by Spotify
+            data: Decoded JSON payload
+            body: Raw response text (used for sizing and persistence)
+        """
+        entry = CacheEntry(etag, data, len(body))
+        self._remember(key, entry)
+        self.counters["stored"] += 1
+
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO http_cache (key, etag, body, size, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (key, etag, body, entry.size, time.time())
+            )
+            if self.counters["stored"] % 1000 == 0:
+                self._prune_db()
+            self._db.commit()
+
+    def mark_not_modified(self, key: str):
+        """Record a 304 revalidation hit."""
+        self.counters["not_modified"] += 1
+
+    def _remember(self, key: str, entry: CacheEntry):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+
+        if entry.size > self.max_bytes:
+            return
+
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.counters["evictions"] += 1
+
+    def _prune_db(self):
+        self._db.execute("""
+        DELETE FROM http_cache WHERE key IN (
+            SELECT key FROM http_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?
+        )
+        """, (self.max_db_rows,))
+
+    def clear(self):
+        """Drop all in-memory entries (the SQLite copy is kept)."""
+        self._entries.clear()
+        self._bytes = 0
+
+response_cache: Optional[ResponseCache] = ResponseCache(db_path=SPOTIFY_CACHE_DB) if SPOTIFY_CACHE_ENABLED else None
@@ -0,0 +1,251 @@
+import os
+import time
+import random
+import asyncio
+import heapq
+import itertools
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from dotenv import load_dotenv
+
+from http_client import get_client
+
+load_dotenv()
+
+SPOTIFY_RATE_LIMIT_RPS = float(os.getenv("SPOTIFY_RATE_LIMIT_RPS", "10"))
+SPOTIFY_RATE_LIMIT_BURST = int(os.getenv("SPOTIFY_RATE_LIMIT_BURST", "20"))
+SPOTIFY_MAX_RETRIES = int(os.getenv("SPOTIFY_MAX_RETRIES", "3"))
+SPOTIFY_BACKOFF_BASE = float(os.getenv("SPOTIFY_BACKOFF_BASE", "0.5"))
+SPOTIFY_BACKOFF_MAX = float(os.getenv("SPOTIFY_BACKOFF_MAX", "30"))
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+# Only these methods are retried after a 5xx or transport error, since a
+# failed POST may still have been applied upstream. 429s are always safe
+# to retry because Spotify rejected the request outright.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+class RateLimitedError(Exception):
+    """Raised when Spotify keeps answering 429 after all retries."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Spotify rate limit exceeded, retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """
+    Classic token bucket: ``rate`` tokens per second, up to ``capacity``.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_take(self) -> bool:
+        """Take one token if available."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_available(self) -> float:
+        """Seconds until the next token can be taken."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header (delta-seconds or HTTP date).
+
+    Args:
+        value: Raw header value
+
+    Returns:
+        Delay in seconds, or None if missing/unparseable
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RequestScheduler:
+    """
+    Central scheduler for outgoing Spotify API calls.
+
+    Every request takes a token from an app-wide bucket. When tokens run out,
+    callers wait in a priority queue so interactive requests are released
+    before bulk work. A 429 pauses the whole scheduler for ``Retry-After``
+    seconds and the request is retried; 5xx and transport errors on
+    idempotent requests are retried with exponential backoff and full jitter.
+    """
+
+    def __init__(self, rate: float = SPOTIFY_RATE_LIMIT_RPS, burst: int = SPOTIFY_RATE_LIMIT_BURST,
+                 max_retries: int = SPOTIFY_MAX_RETRIES, backoff_base: float = SPOTIFY_BACKOFF_BASE,
+                 backoff_max: float = SPOTIFY_BACKOFF_MAX):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.in_flight = 0
+        self.counters = {
+            "requests": 0,
+            "throttled": 0,
+            "retries": 0,
+            "rate_limit_exhausted": 0,
+            "queued": 0
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth and throttle counters."""
+        return {
+            "queue_depth": sum(1 for _, _, fut in self._waiters if not fut.done()),
+            "in_flight": self.in_flight,
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            **self.counters
+        }
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _ensure_dispatcher(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Scripts may run several event loops in sequence; start fresh
+            self._loop = loop
+            self._waiters = []
+            self._wakeup = asyncio.Event()
+            self._dispatcher = None
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        """Release queued callers in priority order as tokens become available."""
+        while True:
+            while self._waiters and self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+
+            if not self._waiters:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            paused_for = self._paused_until - time.monotonic()
+            if paused_for > 0:
+                await asyncio.sleep(paused_for)
+                continue
+
+            delay = self.bucket.time_until_available()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            self.bucket.try_take()
+            _, _, fut = heapq.heappop(self._waiters)
+            fut.set_result(None)
+
+    async def _acquire(self, priority: int):
+        """Wait for permission to send one request."""
+        self._ensure_dispatcher()
+
+        # Fast path: nobody queued, not paused, token available
+        if not self._waiters and self._paused_until <= time.monotonic() and self.bucket.try_take():
+            return
+
+        fut = self._loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        self.counters["queued"] += 1
+        self._wakeup.set()
+        await fut
+
+    async def request(self, method: str, url: str, priority: int = PRIORITY_INTERACTIVE,
+                      **kwargs) -> httpx.Response:
+        """
+        Send a request through the scheduler.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BULK (lower goes first)
+            **kwargs: Passed through to httpx.AsyncClient.request
+
+        Returns:
+            Successful (2xx or 304) response
+        """
+        method = method.upper()
+        retryable = method in IDEMPOTENT_METHODS
+
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(priority)
+            self.counters["requests"] += 1
+            self.in_flight += 1
+            try:
+                response = await get_client().request(method, url, **kwargs)
+            except httpx.TransportError:
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                self.counters["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            finally:
+                self.in_flight -= 1
+
+            if response.status_code == 429:
+                self.counters["throttled"] += 1
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is None:
+                    retry_after = self._backoff(attempt)
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                if attempt >= self.max_retries:
+                    self.counters["rate_limit_exhausted"] += 1
+                    raise RateLimitedError(retry_after)
+                self.counters["retries"] += 1
+                continue
+
+            if response.status_code >= 500 and retryable and attempt < self.max_retries:
+                self.counters["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            # 304 is the expected answer to a conditional GET, not an error
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
+
+    async def close(self):
+        """Stop the dispatcher task."""
+        if self._dispatcher is not None and not self._dispatcher.done():
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+        self._dispatcher = None
+
+scheduler = RequestScheduler()
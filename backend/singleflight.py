@@ -0,0 +1,73 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls into one upstream request.
+
+    Callers with the same key share the result of the call already in
+    flight, so the key must include every parameter that changes the
+    result. Calls can also carry a ``limit`` (left out of the key): an
+    in-flight call fetching at least as many items satisfies a caller
+    asking for fewer, who is expected to slice the shared result down to
+    its own limit. A call without a limit only shares with calls that have
+    none either.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, List[Tuple[Optional[int], asyncio.Future]]] = {}
+        self.counters = {
+            "leaders": 0,
+            "shared": 0
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of in-flight keys and coalescing counters."""
+        return {
+            "in_flight": sum(len(calls) for calls in self._calls.values()),
+            **self.counters
+        }
+
+    def _find(self, key: Hashable, limit: Optional[int]) -> Optional[asyncio.Future]:
+        for call_limit, task in self._calls.get(key, []):
+            if task.done():
+                continue
+            if call_limit == limit or (limit is not None and call_limit is not None and call_limit >= limit):
+                return task
+        return None
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], limit: Optional[int] = None) -> Any:
+        """
+        Run ``fn`` unless an equivalent call is already in flight.
+
+        Args:
+            key: Identity of the call (user, endpoint, normalized params
+                other than the limit)
+            fn: Zero-argument coroutine function performing the call
+            limit: Number of items requested, or None if not applicable
+
+        Returns:
+            Result of the shared call, possibly holding more than ``limit`` items
+        """
+        task = self._find(key, limit)
+        if task is not None:
+            self.counters["shared"] += 1
+            return await asyncio.shield(task)
+
+        self.counters["leaders"] += 1
+        # Run as its own task so one caller being cancelled does not
+        # cancel the request for everyone sharing it
+        task = asyncio.ensure_future(fn())
+        calls = self._calls.setdefault(key, [])
+        entry = (limit, task)
+        calls.append(entry)
+
+        def _forget(done: asyncio.Future):
+            if not done.cancelled():
+                done.exception()  # mark retrieved even if every caller went away
+            calls.remove(entry)
+            if not calls and self._calls.get(key) is calls:
+                del self._calls[key]
+
+        task.add_done_callback(_forget)
+        return await asyncio.shield(task)
@@ -1,32 +1,206 @@
-import httpx
+import os
 import time
 import sys
+import asyncio
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from urllib.parse import urlparse
+from typing import Callable, Dict, List, Optional, Any
+import httpx
 
 # Add backend to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
 import db
+from http_client import decode_response
+from scheduler import scheduler, RateLimitedError, PRIORITY_INTERACTIVE, PRIORITY_BULK
+from response_cache import response_cache
+from singleflight import SingleFlight
+from utils.concurrency import gather_or_cancel
+
+SPOTIFY_API_BASE = os.getenv("SPOTIFY_API_BASE", "https://api.spotify.com/v1")
+
+# Largest page size each paginated endpoint accepts
+PLAYLISTS_PAGE_SIZE = 50
+PLAYLIST_TRACKS_PAGE_SIZE = 100
+
+# Only the fields get_playlist_tracks keeps (plus paging info); skips
+# available_markets, album images etc. that dominate the payload
+PLAYLIST_TRACK_FIELDS = "items(track(id,name,uri,artists(name))),total,next"
+
+# Spotify accepts at most 100 URIs per insert
+TRACKS_PER_INSERT = 100
+BULK_INSERT_MAX_ATTEMPTS = int(os.getenv("SPOTIFY_BULK_INSERT_MAX_ATTEMPTS", "3"))
+
+# Maximum number of pages fetched in parallel for one paginated call
+PAGE_FETCH_CONCURRENCY = int(os.getenv("SPOTIFY_PAGE_CONCURRENCY", "8"))
+
+# Shared by all GETs so concurrent identical calls hit Spotify once
+inflight = SingleFlight()
+
+async def _get_json(url: str, headers: Dict[str, str], params: Optional[Dict[str, Any]] = None,
+                    priority: int = PRIORITY_INTERACTIVE, user_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Issue a GET against the Spotify API and return the decoded body.
+    
+    Concurrent GETs for the same user and query parameters share one
+    upstream request. A call in flight with a larger ``limit`` also serves
+    callers asking for fewer items, who get its page sliced down (with
+    ``limit`` and ``next`` rewritten to match). Only a known integer limit
+    covers others; every other parameter has to match exactly.
+    
+    ``user_key`` (our user ID) keys the coalescing and the response cache,
+    so entries survive token refreshes; the token itself only travels in
+    ``headers``. Without a user key the request goes straight to Spotify.
+    """
+    params = params or {}
+    if user_key is None:
+        response = await scheduler.request("GET", url, priority=priority, headers=headers, params=params)
+        return decode_response(response, _endpoint_label(url))
+    
+    limit = _page_limit(params.get("limit"))
+    key = (user_key, url, tuple(sorted(
+        (k, str(v)) for k, v in params.items() if k != "limit" or limit is None
+    )))
+    data = await inflight.do(key, lambda: _fetch_json(url, headers, params, priority, user_key), limit=limit)
+    
+    items = data.get("items") if isinstance(data, dict) else None
+    if limit is not None and isinstance(items, list) and len(items) > limit:
+        data = {**data, "items": items[:limit], "limit": limit}
+        if "next" in data:
+            offset = _page_limit(params.get("offset")) or 0
+            data["next"] = str(httpx.URL(url, params={**params, "offset": offset + limit, "limit": limit}))
+    return data
+
+def _page_limit(value: Any) -> Optional[int]:
+    """A limit/offset query value as an int, or None if it is not a plain number."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if value >= 0 else None
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+async def _fetch_json(url: str, headers: Dict[str, str], params: Dict[str, Any],
+                      priority: int, user_key: str) -> Dict[str, Any]:
+    """
+    Perform the GET for _get_json.
+    
+    When the response cache is enabled, the stored ETag is sent as
+    If-None-Match and a 304 reuses the previously decoded payload.
+    """
+    endpoint = _endpoint_label(url)
+    if response_cache is None:
+        response = await scheduler.request("GET", url, priority=priority, headers=headers, params=params)
+        return decode_response(response, endpoint)
+    
+    key = response_cache.make_key(user_key, url, params)
+    cached = response_cache.get(key)
+    
+    request_headers = headers
+    if cached is not None:
+        request_headers = {**headers, "If-None-Match": cached.etag}
+    
+    response = await scheduler.request("GET", url, priority=priority, headers=request_headers, params=params)
+    if response.status_code == 304 and cached is not None:
+        response_cache.mark_not_modified(key)
+        return cached.data
+    
+    data = decode_response(response, endpoint)
+    etag = response.headers.get("ETag")
+    if etag:
+        response_cache.put(key, etag, data, response.text)
+    return data
+
+def _endpoint_label(url: str) -> str:
+    """Collapse IDs in a Spotify URL path so metrics group by endpoint."""
+    parts = urlparse(url).path.split("/")
+    for i in range(1, len(parts)):
+        if parts[i - 1] in ("playlists", "users", "albums", "artists", "tracks") and parts[i]:
+            parts[i] = "{id}"
+    return "/".join(parts)
+
+async def fetch_all_pages(url: str, headers: Dict[str, str], page_size: int,
+                          params: Optional[Dict[str, Any]] = None,
+                          max_items: Optional[int] = None,
+                          priority: int = PRIORITY_BULK,
+                          user_key: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch every item of an offset-paginated Spotify endpoint.
+    
+    The first page is fetched on its own to learn ``total``; the remaining
+    offsets are then requested in parallel (bounded by
+    PAGE_FETCH_CONCURRENCY) and stitched back together in offset order.
+    
+    Args:
+        url: Endpoint URL
+        headers: Request headers (authorization)
+        page_size: Largest page size the endpoint accepts
+        params: Extra query parameters sent with every page
+        max_items: Stop after this many items (None for all)
+        priority: Scheduler priority for the page requests
+        user_key: Our user ID, keys the response cache (None to bypass it)
+        
+    Returns:
+        Raw page items in playlist/library order
+    """
+    params = dict(params or {})
+    first_limit = page_size if max_items is None else min(page_size, max_items)
+    if first_limit <= 0:
+        return []
+    
+    first = await _get_json(url, headers, {**params, "offset": 0, "limit": first_limit}, priority, user_key)
+    items = list(first.get("items", []))
+    
+    total = first.get("total")
+    if total is None:
+        return await _follow_next_pages(first, headers, items, max_items, priority, user_key)
+    if max_items is not None:
+        total = min(total, max_items)
+    
+    offsets = list(range(len(items), total, page_size)) if items else []
+    if not offsets:
+        return items[:total]
+    
+    semaphore = asyncio.Semaphore(PAGE_FETCH_CONCURRENCY)
+    
+    async def fetch_page(offset: int) -> List[Dict[str, Any]]:
+        async with semaphore:
+            page_params = {**params, "offset": offset, "limit": min(page_size, total - offset)}
+            data = await _get_json(url, headers, page_params, priority, user_key)
+            return data.get("items", [])
+    
+    pages = await gather_or_cancel(*[fetch_page(offset) for offset in offsets])
+    
+    for page in pages:
+        items.extend(page)
+    
+    return items[:total]
 
-SPOTIFY_API_BASE = "https://api.spotify.com/v1"
+async def _follow_next_pages(data: Dict[str, Any], headers: Dict[str, str],
+                             items: List[Dict[str, Any]], max_items: Optional[int],
+                             priority: int, user_key: Optional[str]) -> List[Dict[str, Any]]:
+    """Sequential fallback for responses that do not report a total."""
+    while data.get("next") and (max_items is None or len(items) < max_items):
+        data = await _get_json(data["next"], headers, priority=priority, user_key=user_key)
+        items.extend(data.get("items", []))
+    
+    return items if max_items is None else items[:max_items]
 
-async def get_user_profile(access_token: str) -> Dict[str, Any]:
+async def get_user_profile(access_token: str, user_key: Optional[str] = None) -> Dict[str, Any]:
     """
     Fetch user profile from Spotify API.
     
     Args:
         access_token: Valid Spotify access token
+        user_key: Our user ID; keys the response cache (None to bypass it)
         
     Returns:
         User profile dictionary
     """
     headers = {"Authorization": f"Bearer {access_token}"}
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{SPOTIFY_API_BASE}/me", headers=headers)
-        response.raise_for_status()
-        profile = response.json()
+    profile = await _get_json(f"{SPOTIFY_API_BASE}/me", headers, user_key=user_key)
     
     image_url = None
     if profile.get("images") and len(profile["images"]) > 0:
@@ -42,7 +216,8 @@ async def get_user_profile(access_token: str) -> Dict[str, Any]:
         "plan_type": profile.get("product", "free")
     }
 
-async def get_user_top_tracks(access_token: str, limit: int = 20, time_range: str = "medium_term") -> List[Dict[str, Any]]:
+async def get_user_top_tracks(access_token: str, limit: int = 20, time_range: str = "medium_term",
+                              user_key: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Fetch user's top tracks from Spotify.
     
@@ -50,6 +225,7 @@ async def get_user_top_tracks(access_token: str, limit: int = 20, time_range: st
         access_token: Valid Spotify access token
         limit: Number of tracks to fetch (max 50)
         time_range: Time range ('short_term', 'medium_term', 'long_term')
+        user_key: Our user ID; keys the response cache (None to bypass it)
         
     Returns:
         List of top tracks
@@ -57,14 +233,7 @@ async def get_user_top_tracks(access_token: str, limit: int = 20, time_range: st
     headers = {"Authorization": f"Bearer {access_token}"}
     params = {"limit": min(limit, 50), "time_range": time_range}
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{SPOTIFY_API_BASE}/me/top/tracks",
-            headers=headers,
-            params=params
-        )
-        response.raise_for_status()
-        data = response.json()
+    data = await _get_json(f"{SPOTIFY_API_BASE}/me/top/tracks", headers, params, user_key=user_key)
     
     tracks = []
     for item in data.get("items", []):
@@ -72,6 +241,7 @@ async def get_user_top_tracks(access_token: str, limit: int = 20, time_range: st
             "id": item["id"],
             "name": item["name"],
             "artists": [artist["name"] for artist in item.get("artists", [])],
+            "artist_ids": [artist.get("id") for artist in item.get("artists", [])],
             "album": item.get("album", {}).get("name", ""),
             "popularity": item.get("popularity", 0),
             "uri": item["uri"]
@@ -79,7 +249,8 @@ async def get_user_top_tracks(access_token: str, limit: int = 20, time_range: st
     
     return tracks
 
-async def get_user_top_artists(access_token: str, limit: int = 20, time_range: str = "medium_term") -> List[Dict[str, Any]]:
+async def get_user_top_artists(access_token: str, limit: int = 20, time_range: str = "medium_term",
+                               user_key: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Fetch user's top artists from Spotify.
     
@@ -87,6 +258,7 @@ async def get_user_top_artists(access_token: str, limit: int = 20, time_range: s
         access_token: Valid Spotify access token
         limit: Number of artists to fetch (max 50)
         time_range: Time range ('short_term', 'medium_term', 'long_term')
+        user_key: Our user ID; keys the response cache (None to bypass it)
         
     Returns:
         List of top artists with genres
@@ -94,14 +266,7 @@ async def get_user_top_artists(access_token: str, limit: int = 20, time_range: s
     headers = {"Authorization": f"Bearer {access_token}"}
     params = {"limit": min(limit, 50), "time_range": time_range}
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{SPOTIFY_API_BASE}/me/top/artists",
-            headers=headers,
-            params=params
-        )
-        response.raise_for_status()
-        data = response.json()
+    data = await _get_json(f"{SPOTIFY_API_BASE}/me/top/artists", headers, params, user_key=user_key)
     
     artists = []
     for item in data.get("items", []):
@@ -115,45 +280,38 @@ async def get_user_top_artists(access_token: str, limit: int = 20, time_range: s
     
     return artists
 
-async def get_user_playlists(access_token: str, limit: int = 50) -> List[Dict[str, Any]]:
+async def get_user_playlists(access_token: str, limit: Optional[int] = 50,
+                             user_key: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Fetch user's playlists from Spotify.
     
     Args:
         access_token: Valid Spotify access token
-        limit: Number of playlists to fetch (max 50)
+        limit: Number of playlists to fetch, or None for all of them
+        user_key: Our user ID; keys the response cache (None to bypass it)
         
     Returns:
         List of user playlists
     """
     headers = {"Authorization": f"Bearer {access_token}"}
+    items = await fetch_all_pages(
+        f"{SPOTIFY_API_BASE}/me/playlists",
+        headers,
+        page_size=PLAYLISTS_PAGE_SIZE,
+        max_items=limit,
+        user_key=user_key
+    )
+    
     playlists = []
-    offset = 0
-    
-    async with httpx.AsyncClient() as client:
-        while offset < limit:
-            params = {"offset": offset, "limit": min(limit - offset, 50)}
-            response = await client.get(
-                f"{SPOTIFY_API_BASE}/me/playlists",
-                headers=headers,
-                params=params
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            for item in data.get("items", []):
-                playlists.append({
-                    "id": item["id"],
-                    "name": item["name"],
-                    "description": item.get("description", ""),
-                    "track_count": item.get("tracks", {}).get("total", 0),
-                    "public": item.get("public", False),
-                    "uri": item["uri"]
-                })
-            
-            offset += len(data.get("items", []))
-            if not data.get("next"):
-                break
+    for item in items:
+        playlists.append({
+            "id": item["id"],
+            "name": item["name"],
+            "description": item.get("description", ""),
+            "track_count": item.get("tracks", {}).get("total", 0),
+            "public": item.get("public", False),
+            "uri": item["uri"]
+        })
     
     return playlists
 
@@ -178,14 +336,13 @@ async def create_playlist(access_token: str, user_id: str, name: str, descriptio
         "description": description
     }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{SPOTIFY_API_BASE}/users/{user_id}/playlists",
-            headers=headers,
-            json=payload
-        )
-        response.raise_for_status()
-        playlist = response.json()
+    response = await scheduler.request(
+        "POST",
+        f"{SPOTIFY_API_BASE}/users/{user_id}/playlists",
+        headers=headers,
+        json=payload
+    )
+    playlist = response.json()
     
     return {
         "id": playlist["id"],
@@ -194,7 +351,8 @@ async def create_playlist(access_token: str, user_id: str, name: str, descriptio
         "uri": playlist["uri"]
     }
 
-async def get_recommendations(access_token: str, seed_artists: List[str] = None, seed_genres: List[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+async def get_recommendations(access_token: str, seed_artists: List[str] = None, seed_genres: List[str] = None, limit: int = 20,
+                              user_key: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Get Spotify recommendations based on seeds.
     
@@ -203,6 +361,7 @@ async def get_recommendations(access_token: str, seed_artists: List[str] = None,
         seed_artists: List of artist IDs (max 5)
         seed_genres: List of genres (max 5)
         limit: Number of recommendations (max 100)
+        user_key: Our user ID; keys the response cache (None to bypass it)
         
     Returns:
         List of recommended tracks
@@ -217,14 +376,7 @@ async def get_recommendations(access_token: str, seed_artists: List[str] = None,
         "limit": min(limit, 100)
     }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{SPOTIFY_API_BASE}/recommendations",
-            headers=headers,
-            params=params
-        )
-        response.raise_for_status()
-        data = response.json()
+    data = await _get_json(f"{SPOTIFY_API_BASE}/recommendations", headers, params, user_key=user_key)
     
     tracks = []
     for item in data.get("tracks", []):
@@ -252,56 +404,202 @@ async def add_tracks_to_playlist(access_token: str, playlist_id: str, track_uris
     """
     headers = {"Authorization": f"Bearer {access_token}"}
     
-    async with httpx.AsyncClient() as client:
-        for i in range(0, len(track_uris), 100):
-            batch = track_uris[i:i+100]
-            response = await client.post(
-                f"{SPOTIFY_API_BASE}/playlists/{playlist_id}/tracks",
-                headers=headers,
-                json={"uris": batch}
-            )
-            response.raise_for_status()
+    for i in range(0, len(track_uris), 100):
+        batch = track_uris[i:i+100]
+        await scheduler.request(
+            "POST",
+            f"{SPOTIFY_API_BASE}/playlists/{playlist_id}/tracks",
+            priority=PRIORITY_BULK,
+            headers=headers,
+            json={"uris": batch}
+        )
     
     return True
 
-async def get_playlist_tracks(access_token: str, playlist_id: str) -> List[Dict[str, Any]]:
+async def get_playlist_track_count(access_token: str, playlist_id: str, user_key: Optional[str] = None) -> int:
+    """
+    Get the number of tracks in a playlist without fetching them.
+    
+    Args:
+        access_token: Valid Spotify access token
+        playlist_id: Spotify playlist ID
+        user_key: Our user ID; keys the response cache (None to bypass it)
+        
+    Returns:
+        Track count
+    """
+    headers = {"Authorization": f"Bearer {access_token}"}
+    data = await _get_json(
+        f"{SPOTIFY_API_BASE}/playlists/{playlist_id}",
+        headers,
+        {"fields": "tracks.total"},
+        user_key=user_key
+    )
+    return data.get("tracks", {}).get("total", 0)
+
+async def add_tracks_bulk(access_token: str, playlist_id: str, track_uris: List[str],
+                          start_position: Optional[int] = None,
+                          on_progress: Optional[Callable[[int, int], None]] = None,
+                          user_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Add many tracks to a playlist in order, one 100-URI chunk at a time.
+    
+    Each chunk is sent with the ``position`` right after the tracks already
+    inserted, and only once the chunk before it has landed: Spotify rejects
+    a position past the current end of the playlist, and inserts arriving
+    out of order would shift each other. Chunks that failed ambiguously
+    (5xx, network error) are checked against the playlist before being
+    retried, so nothing is added twice; a rejected chunk (4xx other than
+    429) is not retried. A failed chunk is reported and the rest are still
+    inserted, in order, after the tracks that did land.
+    
+    Args:
+        access_token: Valid Spotify access token
+        playlist_id: Spotify playlist ID
+        track_uris: Track URIs in the desired order
+        start_position: Where to insert the first track (default: append)
+        on_progress: Called with (tracks_added, total) after each chunk lands
+        user_key: Our user ID; keys the response cache (None to bypass it)
+        
+    Returns:
+        Dictionary with added count, total, failed chunks and last snapshot_id
+    """
+    headers = {"Authorization": f"Bearer {access_token}"}
+    url = f"{SPOTIFY_API_BASE}/playlists/{playlist_id}/tracks"
+    
+    if start_position is None:
+        start_position = await get_playlist_track_count(access_token, playlist_id, user_key)
+    
+    result = {"added": 0, "total": len(track_uris), "failed_chunks": [], "snapshot_id": None}
+    
+    async def already_inserted(chunk: List[str], position: int) -> bool:
+        params = {
+            "offset": position,
+            "limit": len(chunk),
+            "fields": "items(track(uri))"
+        }
+        data = await _get_json(url, headers, params, PRIORITY_BULK, user_key)
+        uris = [(item.get("track") or {}).get("uri") for item in data.get("items", [])]
+        return uris == chunk
+    
+    for offset in range(0, len(track_uris), TRACKS_PER_INSERT):
+        chunk = track_uris[offset:offset + TRACKS_PER_INSERT]
+        position = start_position + result["added"]
+        error: Optional[Exception] = None
+        
+        for attempt in range(BULK_INSERT_MAX_ATTEMPTS):
+            if attempt > 0:
+                if not _is_transient(error):
+                    break
+                if not isinstance(error, RateLimitedError):
+                    # The insert may have been applied before the error
+                    try:
+                        if await already_inserted(chunk, position):
+                            error = None
+                            break
+                    except (httpx.HTTPError, RateLimitedError) as e:
+                        error = e
+                        continue
+            try:
+                response = await scheduler.request(
+                    "POST",
+                    url,
+                    priority=PRIORITY_BULK,
+                    headers=headers,
+                    json={"uris": chunk, "position": position}
+                )
+                result["snapshot_id"] = response.json().get("snapshot_id")
+                error = None
+                break
+            except (httpx.HTTPError, RateLimitedError) as e:
+                error = e
+        
+        if error is not None:
+            result["failed_chunks"].append({"offset": offset, "count": len(chunk), "error": str(error)})
+            continue
+        
+        result["added"] += len(chunk)
+        if on_progress:
+            on_progress(result["added"], result["total"])
+    
+    return result
+
+def _is_transient(error: Optional[Exception]) -> bool:
+    """True for failures worth retrying: network errors, 5xx and 429."""
+    if isinstance(error, (httpx.TransportError, RateLimitedError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return False
+
+async def create_playlist_with_tracks(access_token: str, user_id: str, name: str, track_uris: List[str],
+                                      description: str = "", public: bool = False,
+                                      on_progress: Optional[Callable[[int, int], None]] = None,
+                                      user_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Create a playlist and fill it with tracks in one pipeline.
+    
+    Args:
+        access_token: Valid Spotify access token
+        user_id: Spotify user ID
+        name: Playlist name
+        track_uris: Track URIs in the desired order
+        description: Playlist description
+        public: Whether playlist is public
+        on_progress: Called with (tracks_added, total) after each chunk lands
+        user_key: Our user ID; keys the response cache (None to bypass it)
+        
+    Returns:
+        Created playlist data with tracks_added and failed_chunks
+    """
+    playlist = await create_playlist(access_token, user_id, name, description, public)
+    
+    # A new playlist is empty, so the insert positions are known up front
+    insert_result = await add_tracks_bulk(
+        access_token,
+        playlist["id"],
+        track_uris,
+        start_position=0,
+        on_progress=on_progress,
+        user_key=user_key
+    )
+    
+    return {
+        **playlist,
+        "tracks_added": insert_result["added"],
+        "failed_chunks": insert_result["failed_chunks"]
+    }
+
+async def get_playlist_tracks(access_token: str, playlist_id: str, user_key: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Get all tracks from a playlist.
     
     Args:
         access_token: Valid Spotify access token
         playlist_id: Spotify playlist ID
+        user_key: Our user ID; keys the response cache (None to bypass it)
         
     Returns:
         List of tracks in playlist
     """
     headers = {"Authorization": f"Bearer {access_token}"}
+    items = await fetch_all_pages(
+        f"{SPOTIFY_API_BASE}/playlists/{playlist_id}/tracks",
+        headers,
+        page_size=PLAYLIST_TRACKS_PAGE_SIZE,
+        params={"fields": PLAYLIST_TRACK_FIELDS},
+        user_key=user_key
+    )
+    
     tracks = []
-    offset = 0
-    
-    async with httpx.AsyncClient() as client:
-        while True:
-            params = {"offset": offset, "limit": 50}
-            response = await client.get(
-                f"{SPOTIFY_API_BASE}/playlists/{playlist_id}/tracks",
-                headers=headers,
-                params=params
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            for item in data.get("items", []):
-                track = item.get("track")
-                if track:
-                    tracks.append({
-                        "id": track["id"],
-                        "name": track["name"],
-                        "artists": [artist["name"] for artist in track.get("artists", [])],
-                        "uri": track["uri"]
-                    })
-            
-            offset += len(data.get("items", []))
-            if not data.get("next"):
-                break
+    for item in items:
+        track = item.get("track")
+        if track:
+            tracks.append({
+                "id": track["id"],
+                "name": track["name"],
+                "artists": [artist["name"] for artist in track.get("artists", [])],
+                "uri": track["uri"]
+            })
     
     return tracks
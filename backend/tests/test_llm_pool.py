@@ -0,0 +1,132 @@
+"""
+OllamaPool against real HTTP: each backend is a mock_server.py process
+serving fake Ollama generations.
+"""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("langchain_ollama")
+
+import http_client
+from bench_llm_pool import start_mock
+from llm_pool import OllamaPool
+from load_test import free_port
+
+def make_client(url, **settings):
+    from langchain_ollama import OllamaLLM
+    return OllamaLLM(base_url=url, **{"model": "llama3.2", **settings})
+
+@pytest.fixture
+def mocks():
+    """Start mock Ollama servers on demand; all are stopped after the test."""
+    processes = []
+
+    def start(port: int, latency_ms: float = 0, parallel: int = 0) -> str:
+        processes.append(start_mock(port, latency_ms, parallel))
+        return f"http://127.0.0.1:{port}"
+
+    yield start
+    for process in processes:
+        process.terminate()
+        process.wait()
+
+def run(coro):
+    """Run on a fresh event loop with its own shared HTTP client."""
+    async def main():
+        http_client.set_client(None)
+        try:
+            return await coro
+        finally:
+            await http_client.close_client()
+    return asyncio.run(main())
+
+def test_spreads_by_least_outstanding_within_per_backend_limit(mocks):
+    urls = [mocks(free_port(), latency_ms=300), mocks(free_port(), latency_ms=300)]
+    pool = OllamaPool(urls, make_client, max_concurrency=2, hedge_after=0)
+
+    async def scenario():
+        peaks = [0, 0]
+        calls = [asyncio.ensure_future(pool.ainvoke("describe my mood")) for _ in range(6)]
+        await asyncio.sleep(0.1)
+        in_flight = [backend.outstanding for backend in pool.backends]
+        waiting = pool.stats()["waiting"]
+        while not all(call.done() for call in calls):
+            peaks = [max(peak, backend.outstanding) for peak, backend in zip(peaks, pool.backends)]
+            await asyncio.sleep(0.01)
+        return in_flight, waiting, peaks, [call.result() for call in calls]
+
+    in_flight, waiting, peaks, results = run(scenario())
+    assert in_flight == [2, 2]
+    assert waiting == 2
+    assert peaks == [2, 2]
+    assert all(result.startswith("word") for result in results)
+    assert sum(backend.counters["requests"] for backend in pool.backends) == 6
+    assert pool.stats()["waiting"] == 0
+
+def test_retries_on_another_backend(mocks):
+    dead = f"http://127.0.0.1:{free_port()}"
+    live = mocks(free_port())
+    pool = OllamaPool([dead, live], make_client, eject_after=1)
+
+    result = run(pool.ainvoke("describe my mood"))
+
+    assert result.startswith("word")
+    assert pool.counters["retries"] == 1
+    dead_backend, live_backend = pool.backends
+    assert dead_backend.counters["failures"] == 1
+    assert not dead_backend.healthy
+    assert live_backend.counters["requests"] == 1
+    assert pool.pick() is live_backend
+
+def test_ejects_after_consecutive_failed_checks_and_readmits(mocks):
+    live = mocks(free_port())
+    port = free_port()
+    pool = OllamaPool([live, f"http://127.0.0.1:{port}"], make_client, eject_after=2, health_timeout=1)
+    backend = pool.backends[1]
+
+    run(pool.check_all())
+    assert backend.healthy
+    assert backend.consecutive_failed_checks == 1
+
+    run(pool.check_all())
+    assert not backend.healthy
+    assert backend.counters["ejections"] == 1
+
+    mocks(port, latency_ms=500)
+    pool.warm_models = ["llama3.2"]
+
+    async def recover():
+        start = time.perf_counter()
+        await pool.check_all()
+        checked = time.perf_counter() - start
+        # The model is loaded before traffic is let back in
+        warming = backend.warming and not backend.healthy
+        while not backend.healthy:
+            await asyncio.sleep(0.05)
+        return checked, warming
+
+    checked, warming = run(recover())
+    assert checked < 0.4
+    assert warming
+    assert isinstance(backend.warmed["llama3.2"], float)
+    assert backend.consecutive_failed_checks == 0
+    assert pool.counters["readmissions"] == 1
+    assert run(pool.ainvoke("describe my mood")).startswith("word")
+
+def test_hedges_slow_generation_on_idle_backend(mocks):
+    urls = [mocks(free_port(), latency_ms=3000), mocks(free_port(), latency_ms=50)]
+    pool = OllamaPool(urls, make_client, max_concurrency=2, hedge_after=0.2)
+
+    async def scenario():
+        start = time.perf_counter()
+        result = await pool.ainvoke("describe my mood")
+        return result, time.perf_counter() - start
+
+    result, elapsed = run(scenario())
+    assert result.startswith("word")
+    assert elapsed < 1.5
+    assert pool.counters["hedges"] == 1
+    assert pool.counters["hedge_wins"] == 1
+    assert [backend.outstanding for backend in pool.backends] == [0, 0]
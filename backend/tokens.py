@@ -0,0 +1,198 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+import httpx
+from dotenv import load_dotenv
+
+from auth import refresh_access_token
+import async_db
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Refresh tokens this many seconds before they expire
+TOKEN_REFRESH_MARGIN = float(os.getenv("TOKEN_REFRESH_MARGIN", "300"))
+# How often the background task looks for tokens about to expire
+TOKEN_REFRESH_INTERVAL = float(os.getenv("TOKEN_REFRESH_INTERVAL", "60"))
+
+class TokenExpiredError(Exception):
+    """Raised when a user's token is expired and cannot be refreshed."""
+
+class TokenManager:
+    """
+    Keeps users' Spotify access tokens valid.
+
+    A background task refreshes tokens shortly before they expire and saves
+    them with create_or_update_user, so request handlers normally find a
+    valid token in the database. Concurrent refreshes for the same user
+    share one call to the token endpoint. A refresh token Spotify rejects
+    with ``invalid_grant`` is remembered and not retried until the user
+    logs in again and gets a new one.
+    """
+
+    def __init__(self, margin: float = TOKEN_REFRESH_MARGIN, interval: float = TOKEN_REFRESH_INTERVAL):
+        self.margin = margin
+        self.interval = interval
+        self._refreshes: Dict[str, asyncio.Task] = {}
+        # user_id -> refresh token Spotify answered invalid_grant for
+        self._revoked: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {
+            "refreshed": 0,
+            "background_refreshes": 0,
+            "inline_refreshes": 0,
+            "shared_refreshes": 0,
+            "failures": 0,
+            "revoked": 0
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of refresh counters."""
+        return {
+            "refreshing": len(self._refreshes),
+            "revoked_users": len(self._revoked),
+            "running": self._task is not None and not self._task.done(),
+            **self.counters
+        }
+
+    async def ensure_fresh(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return the user with a usable access token.
+
+        Tokens inside the refresh margin are still valid, so they are
+        returned as-is while a refresh is started in the background. Only a
+        token that has actually expired is refreshed inline.
+
+        Args:
+            user: User row from the database
+
+        Returns:
+            User dict with a valid access_token
+        """
+        expires_at = user.get("token_expires_at")
+        now = time.time()
+        if not expires_at or expires_at - now > self.margin:
+            return user
+
+        if not user.get("refresh_token") or self._is_revoked(user):
+            if expires_at > now:
+                return user
+            raise TokenExpiredError("Token expired, please login again")
+
+        if expires_at > now:
+            self._start_refresh(user, background=True)
+            return user
+
+        self.counters["inline_refreshes"] += 1
+        return await self.refresh(user)
+
+    async def refresh(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Refresh a user's token, joining a refresh already in progress.
+
+        Args:
+            user: User row from the database
+
+        Returns:
+            Updated user dict
+        """
+        task = self._start_refresh(user)
+        return await asyncio.shield(task)
+
+    def _is_revoked(self, user: Dict[str, Any]) -> bool:
+        revoked = self._revoked.get(user["id"])
+        if revoked is None:
+            return False
+        if revoked != user.get("refresh_token"):
+            # The user logged in again since the refresh was rejected
+            del self._revoked[user["id"]]
+            return False
+        return True
+
+    def _start_refresh(self, user: Dict[str, Any], background: bool = False) -> asyncio.Task:
+        user_id = user["id"]
+        task = self._refreshes.get(user_id)
+        if task is not None and not task.done():
+            self.counters["shared_refreshes"] += 1
+            return task
+
+        if background:
+            self.counters["background_refreshes"] += 1
+        task = asyncio.ensure_future(self._do_refresh(user))
+        self._refreshes[user_id] = task
+
+        def _forget(done: asyncio.Task):
+            if self._refreshes.get(user_id) is done:
+                del self._refreshes[user_id]
+            if not done.cancelled() and done.exception() is not None:
+                logger.warning("Token refresh for user %s failed: %s", user_id, done.exception())
+
+        task.add_done_callback(_forget)
+        return task
+
+    async def _do_refresh(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            tokens = await refresh_access_token(user["refresh_token"])
+        except httpx.HTTPStatusError as e:
+            self.counters["failures"] += 1
+            if _is_invalid_grant(e.response):
+                self._revoked[user["id"]] = user["refresh_token"]
+                self.counters["revoked"] += 1
+            if e.response.status_code in (400, 401):
+                raise TokenExpiredError("Token expired, please login again") from e
+            raise
+        except Exception:
+            self.counters["failures"] += 1
+            raise
+
+        updated = dict(user)
+        updated["access_token"] = tokens["access_token"]
+        updated["token_expires_at"] = tokens.get("expires_at")
+        if tokens.get("refresh_token"):
+            updated["refresh_token"] = tokens["refresh_token"]
+
+        await async_db.create_or_update_user(updated)
+        self.counters["refreshed"] += 1
+        return updated
+
+    async def _run(self):
+        while True:
+            try:
+                for user in await async_db.get_users_expiring_before(time.time() + self.margin):
+                    if not self._is_revoked(user):
+                        self._start_refresh(user, background=True)
+            except Exception:
+                logger.exception("Background token refresh sweep failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start the background refresh task (call from the app lifespan)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """Stop the background task and wait for refreshes in progress."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._refreshes:
+            await asyncio.gather(*self._refreshes.values(), return_exceptions=True)
+
+def _is_invalid_grant(response: httpx.Response) -> bool:
+    """True if the token endpoint rejected the refresh token itself."""
+    if response.status_code != 400:
+        return False
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    return isinstance(body, dict) and body.get("error") == "invalid_grant"
+
+token_manager = TokenManager()
@@ -0,0 +1,161 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+USER_CACHE_ENABLED = os.getenv("USER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+# Other processes writing the same database are picked up through the
+# user_invalidations table, checked at most this often (seconds)
+USER_CACHE_INVALIDATION = os.getenv("USER_CACHE_INVALIDATION", "true").lower() in ("1", "true", "yes")
+USER_CACHE_POLL_INTERVAL = float(os.getenv("USER_CACHE_POLL_INTERVAL", "1"))
+
+# Identifies this process in user_invalidations so it skips its own writes
+PROCESS_ID = uuid.uuid4().hex
+
+class UserCache:
+    """
+    In-process LRU/TTL cache of user rows.
+
+    Rows are keyed by user ID, with a secondary Spotify ID index. Writes in
+    this process update cached rows directly; writes from other processes
+    arrive through a change feed that is polled at most every
+    poll_interval seconds. Safe to use from several threads.
+    """
+
+    def __init__(self, max_entries: int = USER_CACHE_MAX_ENTRIES, ttl: float = USER_CACHE_TTL,
+                 poll_interval: float = USER_CACHE_POLL_INTERVAL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._spotify_ids: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._last_seq: Optional[int] = None
+        self._next_poll = 0.0
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "writes": 0,
+            "remote_invalidations": 0
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of cache size and hit-rate counters."""
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+            **self.counters
+        }
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Cached row for a user ID, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._drop(user_id)
+                self.counters["expired"] += 1
+                entry = None
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.counters["hits"] += 1
+            return dict(entry[1])
+
+    def get_by_spotify_id(self, spotify_id: str) -> Optional[Dict[str, Any]]:
+        """Cached row for a Spotify ID, or None on a miss."""
+        user_id = self._spotify_ids.get(spotify_id)
+        if user_id is None:
+            with self._lock:
+                self.counters["misses"] += 1
+            return None
+        return self.get(user_id)
+
+    def add(self, user: Dict[str, Any]):
+        """
+        Cache a row read from the database, unless the user is already cached.
+
+        A write that lands while the row was being read has already stored
+        the newer row, so it is never replaced by the older read.
+        """
+        with self._lock:
+            if user["id"] not in self._entries:
+                self._store(user)
+
+    def write_through(self, user_id: str, columns: Dict[str, Any]):
+        """
+        Apply a write to the cache.
+
+        Args:
+            user_id: User being written
+            columns: Column values being written
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            self.counters["writes"] += 1
+            self._store({**(entry[1] if entry else {}), **columns, "id": user_id})
+
+    def invalidate(self, user_id: str):
+        """Drop a user from the cache."""
+        with self._lock:
+            self._drop(user_id)
+
+    def clear(self):
+        """Drop every cached row."""
+        with self._lock:
+            self._entries.clear()
+            self._spotify_ids.clear()
+
+    def sync(self, fetch_changes: Callable[[Optional[int]], Tuple[int, List[str]]]):
+        """
+        Evict users changed by other processes, at most every poll_interval.
+
+        Args:
+            fetch_changes: Called with the last seen sequence number (None on
+                the first call); returns the newest sequence number and the
+                user IDs changed after the given one by other processes
+        """
+        now = time.monotonic()
+        if now < self._next_poll:
+            return
+        self._next_poll = now + self.poll_interval
+
+        last_seq, changed = fetch_changes(self._last_seq)
+        with self._lock:
+            if self._last_seq is not None:
+                for user_id in changed:
+                    if user_id in self._entries:
+                        self._drop(user_id)
+                        self.counters["remote_invalidations"] += 1
+            self._last_seq = last_seq
+
+    def _store(self, user: Dict[str, Any]):
+        user_id = user["id"]
+        self._drop(user_id)
+        self._entries[user_id] = (time.monotonic() + self.ttl, dict(user))
+        if user.get("spotify_id"):
+            self._spotify_ids[user["spotify_id"]] = user_id
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.counters["evictions"] += 1
+
+    def _drop(self, user_id: str):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            spotify_id = entry[1].get("spotify_id")
+            if spotify_id and self._spotify_ids.get(spotify_id) == user_id:
+                del self._spotify_ids[spotify_id]
+
+user_cache = UserCache() if USER_CACHE_ENABLED else None
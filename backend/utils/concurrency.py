@@ -0,0 +1,33 @@
+import asyncio
+from typing import Any, Awaitable, List
+
+async def gather_or_cancel(*aws: Awaitable[Any]) -> List[Any]:
+    """
+    Run awaitables concurrently and return their results in order.
+    
+    Unlike a bare asyncio.gather, the first failure cancels the remaining
+    calls before the exception is re-raised, so a failed endpoint does not
+    leave upstream requests running in the background.
+    
+    Args:
+        *aws: Coroutines or futures to run
+        
+    Returns:
+        List of results, in the order the awaitables were given
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    
+    for task in tasks:
+        if task.done() and not task.cancelled() and task.exception() is not None:
+            for other in tasks:
+                other.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise task.exception()
+    
+    return [task.result() for task in tasks]